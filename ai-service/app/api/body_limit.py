@@ -0,0 +1,82 @@
+import json
+from typing import Dict
+
+REJECTED_BODY = json.dumps({
+    "success": False,
+    "error": "Request body too large",
+    "status_code": 413
+}).encode()
+
+class BodySizeLimitMiddleware:
+    """Reject request bodies over a per-path byte limit with 413
+
+    Starlette spools a whole multipart body to disk before the route sees
+    it, so a size check in the route comes after the upload. Here a
+    Content-Length over the limit is refused before any byte is read, and
+    bodies without one (chunked) are counted as they arrive and cut off at
+    the limit.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if not value.isdigit() or int(value) > limit:
+                    await self._reject(send)
+                    return
+                break
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            if exceeded:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # The route sees a client that went away; its answer to
+                    # that is replaced by the 413 below
+                    exceeded = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            if exceeded and not started:
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded or started:
+                raise
+        if exceeded and not started:
+            await self._reject(send)
+
+    @staticmethod
+    async def _reject(send):
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(REJECTED_BODY)).encode()),
+                (b"connection", b"close")
+            ]
+        })
+        await send({"type": "http.response.body", "body": REJECTED_BODY})
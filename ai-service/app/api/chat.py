@@ -1,12 +1,18 @@
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any, Annotated
 import asyncio
+import json
+import time
 import uuid
 from datetime import datetime
 import logging
 
 from ..services.ai_service import AIService
+from ..services.health import HealthMonitor
+from ..services.instrumentation import metric_context
+from .dependencies import get_ai_service, get_health_monitor, require_admin
 from ..core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -18,6 +24,7 @@ class ChatMessage(BaseModel):
     conversation_id: Optional[str] = Field(None, description="Conversation ID for context")
     context: str = Field("portfolio", description="Context for the conversation")
     user_id: Optional[str] = Field(None, description="User identifier")
+    slo_seconds: Optional[float] = Field(None, ge=0, le=30, description="Latency target; past it a local answer is served, 0 always waits")
 
 class ChatResponse(BaseModel):
     response: str
@@ -27,47 +34,54 @@ class ChatResponse(BaseModel):
     tokens_used: Optional[int] = None
     response_time: Optional[float] = None
     suggestions: Optional[List[str]] = None
+    served_by: Optional[str] = None
+    fallback_reason: Optional[str] = None
+
+class IntentRequest(BaseModel):
+    messages: List[Annotated[str, Field(min_length=1, max_length=1000)]] = Field(..., min_length=1, max_length=256)
 
 class ChatHistory(BaseModel):
     role: str
     content: str
     timestamp: datetime
 
-# Global AI service instance
-ai_service = AIService()
-
 @router.post("/chat", response_model=Dict[str, Any])
 async def chat_with_ai(
     message_data: ChatMessage,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    ai_service: AIService = Depends(get_ai_service)
 ):
     """
     Chat with AI Assistant
     """
+    metrics = ai_service.metrics
     try:
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         
         # Generate conversation ID if not provided
         conversation_id = message_data.conversation_id or f"conv_{uuid.uuid4().hex[:8]}"
         
-        logger.info(f"Processing chat message for conversation: {conversation_id}")
+        logger.info("Processing chat message for conversation: %s", conversation_id)
         
         # Get AI response
         response_data = await ai_service.get_ai_response(
             message=message_data.message,
             conversation_id=conversation_id,
             context=message_data.context,
-            user_id=message_data.user_id
+            user_id=message_data.user_id,
+            slo=message_data.slo_seconds
         )
         
-        # Calculate response time
-        response_time = (datetime.now() - start_time).total_seconds()
-        
         # Get conversation suggestions
+        started = time.perf_counter()
         suggestions = await ai_service.get_suggestions(
             context=message_data.context,
             conversation_id=conversation_id
         )
+        started = metrics.stage("suggestions", started)
+        
+        # Calculate response time
+        response_time = started - start_time
         
         # Prepare response
         chat_response = {
@@ -77,7 +91,9 @@ async def chat_with_ai(
             "timestamp": datetime.now().isoformat(),
             "tokens_used": response_data.get("tokens_used"),
             "response_time": response_time,
-            "suggestions": suggestions[:5] if suggestions else None
+            "suggestions": suggestions[:5] if suggestions else None,
+            "served_by": response_data.get("served_by"),
+            "fallback_reason": response_data.get("fallback_reason")
         }
         
         # Background task to save conversation
@@ -86,15 +102,22 @@ async def chat_with_ai(
             conversation_id,
             message_data.message,
             response_data["response"],
-            message_data.context
+            message_data.context,
+            user_id=message_data.user_id
         )
         
-        logger.info(f"Chat response generated in {response_time:.2f}s")
+        # Rendered here rather than by FastAPI so serialization shows up as a stage
+        response = JSONResponse(chat_response)
+        finished = metrics.stage("serialize", started)
+        metrics.request("chat", message_data.context, response_data.get("served_by"), finished - start_time)
+        
+        logger.info("Chat response generated in %.2fs", response_time)
         
-        return chat_response
+        return response
         
     except Exception as e:
-        logger.error(f"Chat error: {str(e)}")
+        logger.error("Chat error: %s", e)
+        metrics.error("chat", e)
         
         # Return fallback response
         return {
@@ -106,10 +129,95 @@ async def chat_with_ai(
             "fallback": True
         }
 
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/chat/stream")
+async def stream_chat_with_ai(
+    message_data: ChatMessage,
+    ai_service: AIService = Depends(get_ai_service)
+):
+    """
+    Chat with AI Assistant, streaming tokens as server-sent events
+    """
+    conversation_id = message_data.conversation_id or f"conv_{uuid.uuid4().hex[:8]}"
+    
+    logger.info("Processing streaming chat message for conversation: %s", conversation_id)
+    
+    async def event_stream():
+        start_time = time.perf_counter()
+        time_to_first_token = None
+        chunks = []
+        outcome = {}
+        failed = False
+        
+        yield _sse_event("start", {
+            "conversation_id": conversation_id,
+            "context": message_data.context
+        })
+        
+        try:
+            async for chunk in ai_service.stream_ai_response(
+                message=message_data.message,
+                conversation_id=conversation_id,
+                context=message_data.context,
+                user_id=message_data.user_id,
+                outcome=outcome
+            ):
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - start_time
+                chunks.append(chunk)
+                yield _sse_event("token", {"content": chunk})
+                
+        except Exception as e:
+            logger.error("Chat stream error: %s", e)
+            ai_service.metrics.error("chat_stream", e)
+            outcome["served_by"] = "error"
+            failed = True
+            yield _sse_event("error", {
+                "error": "I'm sorry, I'm having trouble processing your request right now. Please try again or contact me directly at huynhducanh.ai@gmail.com"
+            })
+        
+        response_time = time.perf_counter() - start_time
+        response_text = "".join(chunks)
+        path = outcome.get("served_by")
+        ai_service.metrics.request("chat_stream", message_data.context, path, response_time)
+        if time_to_first_token is not None:
+            ai_service.metrics.first_token.observe((metric_context(message_data.context), path or "unknown"), time_to_first_token)
+        
+        # Save history once the full answer is known; a cut-off answer is not kept
+        if response_text and not failed:
+            await ai_service.save_conversation_message(
+                conversation_id,
+                message_data.message,
+                response_text,
+                message_data.context,
+                user_id=message_data.user_id
+            )
+        
+        yield _sse_event("done", {
+            "conversation_id": conversation_id,
+            "context": message_data.context,
+            "timestamp": datetime.now().isoformat(),
+            "time_to_first_token": time_to_first_token,
+            "response_time": response_time
+        })
+        
+        logger.info("Chat stream completed in %.2fs (first token %s)", response_time,
+                    "n/a" if time_to_first_token is None else "%.2fs" % time_to_first_token)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/chat/suggestions")
 async def get_chat_suggestions(
     context: str = "portfolio",
-    topic: Optional[str] = None
+    topic: Optional[str] = None,
+    ai_service: AIService = Depends(get_ai_service)
 ):
     """
     Get conversation suggestions
@@ -142,11 +250,30 @@ async def get_chat_suggestions(
             "fallback": True
         }
 
+@router.post("/chat/intents")
+async def classify_intents(
+    request: IntentRequest,
+    ai_service: AIService = Depends(get_ai_service)
+):
+    """
+    Classify the intent of a batch of messages with the local model
+    """
+    try:
+        return {
+            "success": True,
+            "results": ai_service.classify_intents(request.messages)
+        }
+        
+    except Exception as e:
+        logger.error(f"Intent classification error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to classify messages")
+
 @router.post("/chat/feedback")
 async def submit_feedback(
     conversation_id: str,
     rating: Annotated[int, Query(ge=1, le=5)],
-    feedback: Optional[str] = None
+    feedback: Optional[str] = None,
+    ai_service: AIService = Depends(get_ai_service)
 ):
     """
     Submit feedback for a conversation
@@ -165,8 +292,55 @@ async def submit_feedback(
         logger.error(f"Feedback error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to submit feedback")
 
+@router.get("/chat/cache")
+async def get_cache_stats(
+    ai_service: AIService = Depends(get_ai_service)
+):
+    """
+    Get response cache statistics
+    """
+    return {
+        "success": True,
+        "data": ai_service.cache_stats()
+    }
+
+@router.delete("/chat/cache", dependencies=[Depends(require_admin)])
+async def invalidate_cache(
+    ai_service: AIService = Depends(get_ai_service)
+):
+    """
+    Invalidate the response cache
+    """
+    ai_service.invalidate_response_cache()
+    
+    return {
+        "success": True,
+        "message": "Response cache invalidated"
+    }
+
+@router.get("/chat/upstream")
+async def get_upstream_stats(
+    ai_service: AIService = Depends(get_ai_service)
+):
+    """
+    Get upstream statistics: scheduler slots, queue depth and wait-time
+    histograms, circuit breaker state, retries and deadline fallbacks
+    """
+    return {
+        "success": True,
+        "data": {
+            **ai_service.scheduler.stats(),
+            "circuit_breaker": ai_service.circuit_breaker.stats(),
+            "retries": ai_service.retry_policy.stats(),
+            "response_slo": ai_service.slo_stats()
+        }
+    }
+
 @router.get("/chat/health")
-async def chat_health_check():
+async def chat_health_check(
+    ai_service: AIService = Depends(get_ai_service),
+    health: HealthMonitor = Depends(get_health_monitor)
+):
     """
     Health check for chat service
     """
@@ -176,6 +350,7 @@ async def chat_health_check():
         return {
             "status": "healthy",
             "ai_service": health_status,
+            "readiness": health.report(),
             "timestamp": datetime.now().isoformat()
         }
         
@@ -5,6 +5,7 @@ from datetime import datetime
 import logging
 
 from ..services.ai_service import AIService
+from .dependencies import get_ai_service, require_admin
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -27,11 +28,11 @@ class ConversationMessage(BaseModel):
     content: str
     timestamp: datetime
 
-# Global AI service instance
-ai_service = AIService()
-
 @router.post("/conversations", response_model=Dict[str, Any])
-async def create_conversation(conversation_data: ConversationCreate):
+async def create_conversation(
+    conversation_data: ConversationCreate,
+    ai_service: AIService = Depends(get_ai_service)
+):
     """
     Create a new conversation
     """
@@ -54,7 +55,10 @@ async def create_conversation(conversation_data: ConversationCreate):
         raise HTTPException(status_code=500, detail="Failed to create conversation")
 
 @router.get("/conversations/{conversation_id}")
-async def get_conversation(conversation_id: str):
+async def get_conversation(
+    conversation_id: str,
+    ai_service: AIService = Depends(get_ai_service)
+):
     """
     Get conversation by ID
     """
@@ -79,7 +83,8 @@ async def get_conversation(conversation_id: str):
 async def get_conversation_messages(
     conversation_id: str,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    ai_service: AIService = Depends(get_ai_service)
 ):
     """
     Get conversation messages
@@ -105,12 +110,14 @@ async def get_conversation_messages(
         logger.error(f"Get conversation messages error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch conversation messages")
 
-@router.get("/conversations")
+# Lists and exports span every visitor's persisted history, so they are admin-only
+@router.get("/conversations", dependencies=[Depends(require_admin)])
 async def list_conversations(
     user_id: Optional[str] = None,
     context: Optional[str] = None,
     limit: int = 20,
-    offset: int = 0
+    offset: int = 0,
+    ai_service: AIService = Depends(get_ai_service)
 ):
     """
     List conversations with optional filtering
@@ -138,7 +145,10 @@ async def list_conversations(
         raise HTTPException(status_code=500, detail="Failed to fetch conversations")
 
 @router.delete("/conversations/{conversation_id}")
-async def delete_conversation(conversation_id: str):
+async def delete_conversation(
+    conversation_id: str,
+    ai_service: AIService = Depends(get_ai_service)
+):
     """
     Delete a conversation
     """
@@ -167,7 +177,8 @@ class UpdateTitleRequest(BaseModel):
 @router.put("/conversations/{conversation_id}/title")
 async def update_conversation_title(
     conversation_id: Annotated[str, Path(description="Conversation ID")],
-    request: UpdateTitleRequest
+    request: UpdateTitleRequest,
+    ai_service: AIService = Depends(get_ai_service)
 ):
     """
     Update conversation title
@@ -192,7 +203,10 @@ async def update_conversation_title(
         raise HTTPException(status_code=500, detail="Failed to update conversation title")
 
 @router.post("/conversations/{conversation_id}/archive")
-async def archive_conversation(conversation_id: str):
+async def archive_conversation(
+    conversation_id: str,
+    ai_service: AIService = Depends(get_ai_service)
+):
     """
     Archive a conversation
     """
@@ -215,8 +229,12 @@ async def archive_conversation(conversation_id: str):
         logger.error(f"Archive conversation error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to archive conversation")
 
-@router.get("/conversations/{conversation_id}/export")
-async def export_conversation(conversation_id: str, format: str = "json"):
+@router.get("/conversations/{conversation_id}/export", dependencies=[Depends(require_admin)])
+async def export_conversation(
+    conversation_id: str,
+    format: str = "json",
+    ai_service: AIService = Depends(get_ai_service)
+):
     """
     Export conversation data
     """
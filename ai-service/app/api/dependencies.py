@@ -0,0 +1,39 @@
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException, Request
+
+from ..core.config import settings
+
+from ..services.ai_service import AIService
+from ..services.container import ServiceContainer
+from ..services.health import HealthMonitor
+from ..services.ingestion import IngestionService
+from ..services.knowledge_store import KnowledgeSnapshot
+
+def get_services(request: Request) -> ServiceContainer:
+    """Get the process-wide service container"""
+    return request.app.state.services
+
+def get_ai_service(request: Request) -> AIService:
+    """Get the shared AI service"""
+    return request.app.state.services.ai_service
+
+def get_knowledge(request: Request) -> KnowledgeSnapshot:
+    """Get the current knowledge snapshot"""
+    return request.app.state.services.ai_service.knowledge
+
+def get_ingestion(request: Request) -> Optional[IngestionService]:
+    """Get the document ingestion service, None when retrieval is disabled"""
+    return request.app.state.services.ingestion
+
+def get_health_monitor(request: Request) -> HealthMonitor:
+    """Get the background health monitor"""
+    return request.app.state.services.health
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Allow only callers presenting ADMIN_TOKEN; admin routes are off while it is unset"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Query
+from fastapi.responses import Response
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Annotated
 import logging
 
+from ..services.ingestion import IngestionService, UnsupportedFileError, UploadTooLargeError
+from ..services.knowledge_store import KnowledgeSnapshot
+from .dependencies import get_ingestion, get_knowledge, require_admin
+
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
@@ -16,166 +21,92 @@ class KnowledgeItem(BaseModel):
     updated_at: str
 
 @router.get("/knowledge")
-async def get_knowledge_base():
+async def get_knowledge_base(
+    knowledge: KnowledgeSnapshot = Depends(get_knowledge)
+):
     """
     Get portfolio knowledge base
     """
     try:
-        # Portfolio knowledge base
-        knowledge_base = {
-            "personal": {
-                "name": "Huynh Duc Anh",
-                "title": "AI Engineer",
-                "bio": "An AI engineer with expertise in Python, Machine Learning, Deep Learning and Computer Vision. Passionate about creating intelligent solutions that solve real-world problems.",
-                "location": "Ho Chi Minh City, Vietnam",
-                "email": "huynhducanh.ai@gmail.com",
-                "experience_years": 5
-            },
-            "skills": [
-                {"name": "Python", "level": "Expert", "years": 5},
-                {"name": "Machine Learning", "level": "Expert", "years": 4},
-                {"name": "Computer Vision", "level": "Advanced", "years": 3},
-                {"name": "Deep Learning", "level": "Advanced", "years": 3},
-                {"name": "TensorFlow", "level": "Advanced", "years": 3},
-                {"name": "PyTorch", "level": "Intermediate", "years": 2},
-                {"name": "FastAPI", "level": "Advanced", "years": 2},
-                {"name": "React.js", "level": "Intermediate", "years": 2}
-            ],
-            "experience": [
-                {
-                    "position": "Senior AI Engineer",
-                    "company": "TechCorp Vietnam",
-                    "period": "2023 - Present",
-                    "description": "Leading AI projects focusing on computer vision and natural language processing solutions."
-                },
-                {
-                    "position": "Machine Learning Engineer", 
-                    "company": "DataTech Solutions",
-                    "period": "2021 - 2023",
-                    "description": "Developed and deployed ML models for various business applications."
-                }
-            ],
-            "projects": [
-                {
-                    "name": "AI-Powered Image Recognition System",
-                    "description": "Computer vision system for automated quality control in manufacturing",
-                    "technologies": ["Python", "OpenCV", "TensorFlow", "FastAPI"]
-                },
-                {
-                    "name": "Natural Language Processing Chatbot",
-                    "description": "Intelligent chatbot for customer service automation",
-                    "technologies": ["Python", "NLTK", "Transformers", "Flask"]
-                }
-            ],
-            "education": [
-                {
-                    "degree": "Bachelor of Computer Science",
-                    "school": "University of Technology",
-                    "period": "2016 - 2020",
-                    "specialization": "Artificial Intelligence and Machine Learning"
-                }
-            ],
-            "certifications": [
-                "AI Foundation Certificate - TechCorp Academy",
-                "Data Science Professional - DataScience Institute", 
-                "Machine Learning Specialist - ML Academy"
-            ],
-            "services": [
-                {
-                    "title": "AI Consultation",
-                    "description": "Expert consultation on AI strategy and implementation"
-                },
-                {
-                    "title": "Machine Learning Development", 
-                    "description": "Custom ML model development and deployment"
-                },
-                {
-                    "title": "Computer Vision Solutions",
-                    "description": "Advanced computer vision applications"
-                }
-            ]
-        }
-        
-        return {
-            "success": True,
-            "data": knowledge_base
-        }
+        # Serialized once per knowledge snapshot
+        return Response(content=knowledge.response_bytes, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Knowledge base error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch knowledge base")
 
 @router.get("/knowledge/search")
-async def search_knowledge(query: str, category: Optional[str] = None):
+async def search_knowledge(
+    query: str,
+    category: Optional[str] = None,
+    limit: Annotated[int, Query(ge=1, le=50)] = 10,
+    knowledge: KnowledgeSnapshot = Depends(get_knowledge)
+):
     """
     Search knowledge base
     """
     try:
-        # Simple search implementation
-        knowledge = await get_knowledge_base()
-        knowledge_data = knowledge["data"]
-        
-        results = []
-        query_lower = query.lower()
-        
-        # Search in personal info
-        personal = knowledge_data["personal"]
-        if any(query_lower in str(v).lower() for v in personal.values()):
-            results.append({
-                "type": "personal",
-                "title": "Personal Information",
-                "content": personal,
-                "relevance": 0.9
-            })
-        
-        # Search in skills
-        for skill in knowledge_data["skills"]:
-            if query_lower in skill["name"].lower():
-                results.append({
-                    "type": "skill", 
-                    "title": f"Skill: {skill['name']}",
-                    "content": skill,
-                    "relevance": 0.8
-                })
-        
-        # Search in projects
-        for project in knowledge_data["projects"]:
-            if (query_lower in project["name"].lower() or 
-                query_lower in project["description"].lower()):
-                results.append({
-                    "type": "project",
-                    "title": project["name"],
-                    "content": project,
-                    "relevance": 0.7
-                })
-        
-        # Sort by relevance
-        results.sort(key=lambda x: x["relevance"], reverse=True)
+        results, total = knowledge.search_index.search(query, category=category, limit=limit)
         
         return {
             "success": True,
             "query": query,
-            "results": results[:10],  # Top 10 results
-            "total": len(results)
+            "category": category,
+            "results": results,
+            "total": total
         }
         
     except Exception as e:
         logger.error(f"Knowledge search error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to search knowledge base")
 
-@router.post("/knowledge/upload")
-async def upload_knowledge(file: UploadFile = File(...)):
+# Uploaded text is retrieved into the system prompt, so only admins may add it
+@router.post("/knowledge/upload", dependencies=[Depends(require_admin)])
+async def upload_knowledge(
+    file: UploadFile = File(...),
+    ingestion: Optional[IngestionService] = Depends(get_ingestion)
+):
     """
-    Upload knowledge file (for future expansion)
+    Upload a PDF, Markdown or text file into the knowledge base
     """
     try:
-        # Placeholder for file upload functionality
+        if ingestion is None:
+            raise HTTPException(status_code=503, detail="Document ingestion is disabled")
+        
+        job = await ingestion.receive(file)
+        
+        logger.info(f"Knowledge upload {job['id']} ({job['filename']}): {job['status']}")
+        
         return {
             "success": True,
-            "message": "File upload feature coming soon",
-            "filename": file.filename
+            "message": "File already indexed" if job["status"] == "duplicate" else "File queued for indexing",
+            "data": job
         }
         
+    except HTTPException:
+        raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedFileError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Knowledge upload error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to upload knowledge file")
+
+@router.get("/knowledge/upload/{job_id}", dependencies=[Depends(require_admin)])
+async def get_upload_status(
+    job_id: str,
+    ingestion: Optional[IngestionService] = Depends(get_ingestion)
+):
+    """
+    Get the ingestion status of an uploaded file
+    """
+    job = ingestion.get_job(job_id) if ingestion is not None else None
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    
+    return {
+        "success": True,
+        "data": job
+    }
@@ -0,0 +1,92 @@
+import ipaddress
+import json
+import math
+from typing import Iterable, List
+
+REJECTED_BODY = json.dumps({
+    "success": False,
+    "error": "Rate limit exceeded",
+    "status_code": 429
+}).encode()
+
+class RateLimitMiddleware:
+    """Reject clients over their token bucket with 429 and Retry-After
+
+    A plain ASGI middleware rather than a BaseHTTPMiddleware, so unlimited
+    routes pay one set lookup. Every request is charged to the bucket of its
+    client address. Identity headers are only believed from trusted_proxies
+    (addresses or networks): behind one, the client address is taken from
+    X-Forwarded-For, and an X-User-ID is charged to a per-user bucket as
+    well, never instead of the address. The limiter is looked up on the
+    service container at request time since it is created in the lifespan.
+    """
+
+    def __init__(self, app, paths: Iterable[str], methods: Iterable[str] = ("POST",),
+                 trusted_proxies: Iterable[str] = ()):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.methods = frozenset(methods)
+        self.trusted_proxies = tuple(ipaddress.ip_network(proxy, strict=False) for proxy in trusted_proxies)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths or scope["method"] not in self.methods:
+            await self.app(scope, receive, send)
+            return
+
+        services = getattr(scope["app"].state, "services", None)
+        limiter = services.rate_limiter if services is not None else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Every bucket is checked before any is charged
+        wait = await limiter.check(*self._keys(scope))
+        if wait > 0:
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(REJECTED_BODY)).encode()),
+                    (b"retry-after", str(max(math.ceil(wait), 1)).encode())
+                ]
+            })
+            await send({"type": "http.response.body", "body": REJECTED_BODY})
+            return
+        await self.app(scope, receive, send)
+
+    def _trusted(self, address: str) -> bool:
+        if not self.trusted_proxies:
+            return False
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        # Node reports IPv4 peers as ::ffff:a.b.c.d
+        if ip.version == 6 and ip.ipv4_mapped is not None:
+            ip = ip.ipv4_mapped
+        return any(ip in network for network in self.trusted_proxies)
+
+    def _keys(self, scope) -> List[str]:
+        """Buckets to charge: the client address, then the user a trusted proxy vouches for"""
+        client = scope.get("client")
+        address = client[0] if client else "unknown"
+        if not self._trusted(address):
+            return ["ip:" + address]
+
+        forwarded, user_id = [], None
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                forwarded.extend(part.strip() for part in value.decode("latin-1").split(","))
+            elif name == b"x-user-id" and value:
+                user_id = value[:200].decode("latin-1")
+        # The nearest hop not run by us is the client; earlier entries can be forged
+        for hop in reversed(forwarded):
+            if hop and not self._trusted(hop):
+                address = hop
+                break
+
+        keys = ["ip:" + address]
+        if user_id:
+            keys.append("user:" + user_id)
+        return keys
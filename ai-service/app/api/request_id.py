@@ -0,0 +1,38 @@
+import os
+
+from ..core.logger import request_id
+
+class RequestIdMiddleware:
+    """Give every HTTP request an id for its log records and the X-Request-ID header
+
+    A client-supplied X-Request-ID is kept (up to 64 characters) so ids can
+    be followed across services; otherwise a random one is generated.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rid = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id" and value:
+                rid = value[:64].decode("latin-1")
+                break
+        if rid is None:
+            rid = os.urandom(8).hex()
+        header = (b"x-request-id", rid.encode("latin-1"))
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), header]
+            await send(message)
+
+        token = request_id.set(rid)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id.reset(token)
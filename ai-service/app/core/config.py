@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -11,45 +11,134 @@ class Settings(BaseSettings):
     VERSION: str = "1.0.0"
     API_PREFIX: str = "/api"
     
+    # Production Server (python -m app.server)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    WORKERS: int = 0  # 0 = one per CPU when all state is shared (Redis backends), else 1
+    SERVER_BACKLOG: int = 2048  # Pending connections queued by the kernel
+    SERVER_KEEPALIVE: int = 5  # Seconds an idle keep-alive connection stays open
+    SERVER_MAX_REQUESTS: int = 10000  # Recycle a worker after this many requests, 0 disables
+    SERVER_MAX_REQUESTS_JITTER: int = 1000
+    SERVER_GRACEFUL_TIMEOUT: int = 30  # Seconds a recycled worker gets to finish requests
+    SERVER_TIMEOUT: int = 120  # Seconds before a silent worker is killed
+    
     # OpenAI Configuration
     OPENAI_API_KEY: str = ""
     OPENAI_MODEL: str = "gpt-3.5-turbo"
     OPENAI_MAX_TOKENS: int = 150
     OPENAI_TEMPERATURE: float = 0.7
+    PROMPT_TOKEN_BUDGET: int = 3000  # Max prompt tokens; history is filled newest first up to it
+    OPENAI_BASE_URL: str = ""  # Empty = official OpenAI endpoint
+    OPENAI_POOL_SIZE: int = 20  # Max concurrent upstream connections
+    OPENAI_KEEPALIVE_CONNECTIONS: int = 10
+    OPENAI_KEEPALIVE_EXPIRY: float = 30.0  # Seconds
+    UPSTREAM_MAX_CONCURRENCY: int = 8  # Upstream calls in flight per worker
+    UPSTREAM_QUEUE_SIZE: int = 64  # Calls waiting for a slot before new ones are rejected
+    UPSTREAM_QUEUE_TIMEOUT: float = 5.0  # Seconds a chat request may wait before using the fallback
+    UPSTREAM_BACKGROUND_CONCURRENCY: int = 2  # Slots background work such as summaries may use
+    UPSTREAM_MAX_RETRIES: int = 2  # Extra attempts after a transient upstream error
+    UPSTREAM_RETRY_BASE_DELAY: float = 0.2  # Seconds; backoff doubles per attempt, with full jitter
+    UPSTREAM_RETRY_MAX_DELAY: float = 2.0
+    UPSTREAM_RETRY_BUDGET: float = 0.2  # Retries allowed per upstream request, averaged over time
+    CIRCUIT_WINDOW_SECONDS: float = 30.0  # Sliding window of upstream outcomes
+    CIRCUIT_MIN_CALLS: int = 10  # Calls in the window before the circuit may open
+    CIRCUIT_FAILURE_RATE: float = 0.5  # Failure ratio that opens the circuit
+    CIRCUIT_SLOW_CALL_SECONDS: float = 10.0  # Calls slower than this count as slow
+    CIRCUIT_SLOW_CALL_RATE: float = 0.8  # Slow ratio that opens the circuit
+    CIRCUIT_OPEN_SECONDS: float = 5.0  # First open period; doubles while probes keep failing
+    CIRCUIT_MAX_OPEN_SECONDS: float = 60.0
+    CIRCUIT_HALF_OPEN_PROBES: int = 2  # Trial calls that must succeed to close the circuit
     
     # Database Configuration
     DATABASE_URL: str = "sqlite:///./ai_assistant.db"
+    CONVERSATION_BACKEND: str = "sqlite"  # memory | sqlite | redis
+    CONVERSATION_WRITE_BATCH_SIZE: int = 500  # Max queued writes per transaction
+    CONVERSATION_FLUSH_INTERVAL: float = 0.05  # Seconds a write waits to batch with others
     
     # Redis Configuration
     REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_POOL_SIZE: int = 20  # Max pooled connections per worker
+    REDIS_KEY_PREFIX: str = "ai"
+    REDIS_LOCAL_CACHE_SIZE: int = 256  # Per-worker read-through entries
+    REDIS_LOCAL_CACHE_TTL: float = 2.0  # Seconds a worker may serve a local copy
+    
+    # Knowledge Base
+    KNOWLEDGE_FILE: str = "app/data/knowledge.json"
+    KNOWLEDGE_RELOAD_INTERVAL: float = 2.0  # Seconds between file checks, 0 disables hot reload
+    INTENTS_FILE: str = "app/data/intents.json"  # Keyword intents for fallback answers
+    INTENT_QUESTIONS_FILE: str = "app/data/intent_questions.json"  # Labeled questions for the classifier
+    INTENT_MODEL_FILE: str = "./models/intent_classifier.npz"  # Trained offline or at startup
+    INTENT_CLASSIFIER_ENABLED: bool = True
+    INTENT_CONFIDENCE_THRESHOLD: float = 0.3  # Below this the keyword matcher decides
     
     # Vector Database Configuration
-    CHROMA_PERSIST_DIRECTORY: str = "./chroma_db"
+    CHROMA_PERSIST_DIRECTORY: str = "./chroma_db"  # Persisted knowledge vector index
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    RAG_ENABLED: bool = True  # Send only retrieved knowledge chunks in the prompt
+    RAG_TOP_K: int = 4
     
     # CORS Configuration
     ALLOWED_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:5000"]
     
+    # Response Cache
+    RESPONSE_CACHE_SIZE: int = 1000  # 0 disables caching
+    RESPONSE_CACHE_TTL: int = 3600  # Seconds
+    RESPONSE_CACHE_BACKEND: str = "memory"  # memory | redis (shared by all workers)
+    
+    # Semantic Cache (embedding similarity over cached questions)
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_SIZE: int = 10000
+    SEMANTIC_CACHE_THRESHOLD: float = 0.9  # Cosine similarity
+    SEMANTIC_CACHE_THRESHOLDS: Dict[str, float] = {}  # Per-context overrides
+    
     # Rate Limiting
-    RATE_LIMIT_CALLS: int = 100
-    RATE_LIMIT_PERIOD: int = 3600
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_CALLS: int = 100  # Bucket size: burst allowed per client
+    RATE_LIMIT_PERIOD: int = 3600  # Seconds to refill an empty bucket
+    RATE_LIMIT_BACKEND: str = "memory"  # memory | redis (shared by all workers)
+    RATE_LIMIT_PATHS: List[str] = ["/api/chat", "/api/chat/stream"]  # POST routes that call the upstream
+    RATE_LIMIT_TRUSTED_PROXIES: List[str] = []  # Addresses/networks whose X-Forwarded-For and X-User-ID are believed
+    
+    # Health checks
+    HEALTH_CHECK_INTERVAL: float = 15.0  # Seconds between background dependency probes
+    HEALTH_MAX_STALENESS: float = 60.0  # Older probe results report not ready
+    HEALTH_PROBE_TIMEOUT: float = 2.0  # Seconds per dependency probe
     
     # Logging
     LOG_LEVEL: str = "INFO"
-    LOG_FILE: str = "logs/ai_service.log"
+    LOG_FILE: str = "logs/ai_service.log"  # Empty logs to the console only
+    LOG_FORMAT: str = "text"  # text | json (one object per line, with request ids)
+    LOG_QUEUE_SIZE: int = 10000  # Records waiting for the writer thread; more are dropped
+    LOG_SAMPLE_RATE: float = 1.0  # Share of requests whose info logs are kept
+    LOG_SAMPLED_LOGGERS: List[str] = ["app.api.chat", "app.services.ai_service"]  # Per-request info logs
     
     # Security
     SECRET_KEY: str = "your_secret_key_here_change_in_production"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    ADMIN_TOKEN: str = ""  # X-Admin-Token for admin routes (cache flush, uploads, conversation lists); empty disables them
     
     # File Upload
     MAX_FILE_SIZE: int = 10485760  # 10MB
+    UPLOAD_FORM_OVERHEAD: int = 65536  # Multipart framing allowed on top of MAX_FILE_SIZE
     UPLOAD_DIR: str = "./uploads"
+    UPLOAD_READ_CHUNK_SIZE: int = 65536  # Bytes read per upload chunk
+    INGESTION_ENABLED: bool = True  # Uploads are tracked per process; disable to run several workers
+    INGESTION_WORKERS: int = 2  # Processes for text extraction and embedding
+    INGESTION_CHUNK_WORDS: int = 200
+    INGESTION_CHUNK_OVERLAP: int = 40
     
     # AI Assistant Configuration
-    MAX_CONVERSATION_HISTORY: int = 10
+    MAX_CONVERSATION_HISTORY: int = 10  # User/assistant exchanges kept per conversation
+    MAX_CONVERSATIONS: int = 10000  # Least recently active evicted beyond this
+    CONVERSATION_IDLE_TTL: int = 3600  # Seconds, 0 disables idle expiry
+    CONVERSATION_SWEEP_INTERVAL: int = 60  # Seconds between idle sweeps
+    SUMMARY_ENABLED: bool = True  # Fold older turns into a rolling summary in the background
+    SUMMARY_TRIGGER_MESSAGES: int = 12  # Unsummarized messages that trigger folding
+    SUMMARY_KEEP_MESSAGES: int = 4  # Newest messages kept verbatim after folding
+    SUMMARY_MAX_TOKENS: int = 200
     DEFAULT_CONTEXT: str = "portfolio"
     RESPONSE_TIMEOUT: int = 30
+    RESPONSE_SLO_SECONDS: float = 0.0  # Past this, a recognised question gets the local answer; 0 always waits
     
     class Config:
         env_file = ".env"
@@ -1,32 +1,161 @@
+import atexit
+import copy
+import json
 import logging
 import os
-from datetime import datetime
-from logging.handlers import RotatingFileHandler
+import queue
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Iterable, Optional
+
+from .config import settings
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Id of the request being handled, set by the request id middleware
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+_handler: Optional["NonBlockingQueueHandler"] = None
+_listener: Optional[QueueListener] = None
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the request id when there is one"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+class RequestContextFilter(logging.Filter):
+    """Tag records with the current request id and sample high-volume info logs
+
+    Runs on the logging thread of the caller, where the request context is
+    still visible. Records at INFO and below from the sampled loggers are
+    kept for sample_rate of requests; the decision hashes the request id so
+    a kept request keeps all of its lines. Warnings and errors always pass.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, sampled_loggers: Iterable[str] = ()):
+        super().__init__()
+        self.threshold = int(min(max(sample_rate, 0.0), 1.0) * 0x10000)
+        self.sampled_loggers = tuple(sampled_loggers)
+        self._sequence = 0  # Spreads records outside a request evenly over the range
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rid = request_id.get()
+        record.request_id = rid
+        if (self.threshold < 0x10000 and record.levelno <= logging.INFO
+                and record.name.startswith(self.sampled_loggers)):
+            if rid:
+                position = hash(rid) & 0xFFFF
+            else:
+                position = self._sequence = (self._sequence + 40503) & 0xFFFF
+            if position >= self.threshold:
+                self.dropped += 1
+                return False
+        return True
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hand records to the listener thread without blocking the caller
+
+    Like the stock prepare(), the message is rendered here, since arguments
+    may be mutated before the listener gets to them, and a traceback is
+    reduced to its text. Unlike it, the record keeps its own fields instead
+    of becoming one preformatted line, so the listener applies the text or
+    JSON formatter and does all the I/O. When the queue is full records are
+    dropped and counted rather than blocking the loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._exception_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            # The traceback holds frames the listener thread must not touch
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def _file_handler(path: str) -> RotatingFileHandler:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return RotatingFileHandler(
+        path,
+        maxBytes=10*1024*1024,  # 10MB
+        backupCount=5,
+        delay=True
+    )
+
+def _start_listener(targets):
+    global _listener
+    _listener = QueueListener(_handler.queue, *targets, respect_handler_level=True)
+    _listener.start()
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
 def setup_logging():
-    """Setup logging configuration"""
-    
-    # Create logs directory if it doesn't exist
-    log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-    
+    """Setup logging configuration
+
+    Loggers only enqueue records; a listener thread formats them and writes
+    the console and LOG_FILE handlers, so no log I/O or rotation happens on
+    the event loop.
+    """
+    global _handler
+    formatter = JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+    targets = [logging.StreamHandler()]
+    if settings.LOG_FILE:
+        targets.append(_file_handler(settings.LOG_FILE))
+    for target in targets:
+        target.setFormatter(formatter)
+
+    first_setup = _handler is None
+    stop_logging()
+    _handler = NonBlockingQueueHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+    _handler.addFilter(RequestContextFilter(settings.LOG_SAMPLE_RATE, settings.LOG_SAMPLED_LOGGERS))
+
     # Configure root logger
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            # Console handler
-            logging.StreamHandler(),
-            # File handler with rotation
-            RotatingFileHandler(
-                f"{log_dir}/ai_service.log",
-                maxBytes=10*1024*1024,  # 10MB
-                backupCount=5
-            )
-        ]
-    )
-    
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(_handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    _start_listener(targets)
+    if first_setup:
+        atexit.register(stop_logging)
+        # Threads do not survive fork: gunicorn workers forked from a preloaded
+        # master need their own queue and listener
+        os.register_at_fork(after_in_child=_restart_in_child)
+
     # Set specific loggers
     loggers = {
         'uvicorn.access': logging.WARNING,
@@ -35,10 +164,18 @@ def setup_logging():
         'httpx': logging.WARNING,
         'chromadb': logging.WARNING,
     }
-    
+
     for logger_name, level in loggers.items():
         logging.getLogger(logger_name).setLevel(level)
 
+def _restart_in_child():
+    if _listener is None:
+        return
+    # The inherited queue may hold records the parent still writes, and its
+    # lock may have been taken mid-put: start over with a fresh one
+    _handler.queue = queue.Queue(settings.LOG_QUEUE_SIZE)
+    _start_listener(_listener.handlers)
+
 def get_logger(name: str):
     """Get logger instance"""
     return logging.getLogger(name)
@@ -0,0 +1,99 @@
+"""Production server entry point
+
+Runs the API under gunicorn with uvicorn workers:
+
+    python -m app.server [--workers N] [--bind HOST:PORT] ...
+
+Options default to the SERVER_* / WORKERS settings. Use `python main.py`
+for development with auto-reload.
+"""
+import argparse
+import os
+from typing import Any, Dict, List, Optional
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker as BaseUvicornWorker
+
+from .core.config import settings
+
+class UvicornWorker(BaseUvicornWorker):
+    """Uvicorn worker pinned to the uvloop event loop and httptools parser"""
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
+
+class ServerApplication(BaseApplication):
+    def __init__(self, options: Dict[str, Any]):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from main import app
+        return app
+
+def process_local_state() -> List[str]:
+    """State each worker would keep to itself, which breaks with more than one worker"""
+    state = []
+    if settings.CONVERSATION_BACKEND != "redis":
+        state.append(f"conversation history (CONVERSATION_BACKEND={settings.CONVERSATION_BACKEND}; use redis)")
+    if settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_BACKEND != "redis":
+        state.append("rate limits, multiplied by the worker count (RATE_LIMIT_BACKEND=memory; use redis)")
+    if settings.RAG_ENABLED and settings.INGESTION_ENABLED:
+        state.append("upload jobs and the document index (set INGESTION_ENABLED=false)")
+    if settings.LOG_FILE:
+        state.append("LOG_FILE, rotated by every worker on its own (leave it empty to log to the console)")
+    return state
+
+def default_workers() -> int:
+    """WORKERS, or with 0 one per CPU when no state is process-local and one otherwise"""
+    if settings.WORKERS > 0:
+        return settings.WORKERS
+    return 1 if process_local_state() else (os.cpu_count() or 1)
+
+def build_options(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "bind": args.bind,
+        "workers": args.workers,
+        "worker_class": "app.server.UvicornWorker",
+        # Import the app once in the master so workers fork with it loaded
+        "preload_app": True,
+        "backlog": args.backlog,
+        "keepalive": args.keepalive,
+        # Recycle workers gracefully to cap memory creep; jitter avoids restarting them all at once
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests_jitter,
+        "graceful_timeout": args.graceful_timeout,
+        "timeout": args.timeout,
+        "accesslog": "-" if args.access_log else None,
+        "loglevel": settings.LOG_LEVEL.lower()
+    }
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.server", description="Run the AI service in production mode")
+    parser.add_argument("--bind", default=f"{settings.SERVER_HOST}:{settings.SERVER_PORT}")
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="defaults to the CPU count when all state is shared, else 1")
+    parser.add_argument("--backlog", type=int, default=settings.SERVER_BACKLOG)
+    parser.add_argument("--keepalive", type=int, default=settings.SERVER_KEEPALIVE, help="seconds")
+    parser.add_argument("--max-requests", type=int, default=settings.SERVER_MAX_REQUESTS, help="0 disables recycling")
+    parser.add_argument("--max-requests-jitter", type=int, default=settings.SERVER_MAX_REQUESTS_JITTER)
+    parser.add_argument("--graceful-timeout", type=int, default=settings.SERVER_GRACEFUL_TIMEOUT, help="seconds")
+    parser.add_argument("--timeout", type=int, default=settings.SERVER_TIMEOUT, help="seconds")
+    parser.add_argument("--access-log", action="store_true", help="log every request")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    state = process_local_state() if args.workers > 1 else []
+    if state:
+        raise SystemExit(
+            f"Refusing to start {args.workers} workers, each would keep its own:\n"
+            + "\n".join(f"  - {item}" for item in state)
+        )
+    ServerApplication(build_options(args)).run()
+
+if __name__ == "__main__":
+    main()
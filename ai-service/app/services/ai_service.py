@@ -1,29 +1,190 @@
 import openai
+import httpx
 import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, AsyncIterator
 from datetime import datetime
 import uuid
 import json
+import os
+import re
+import time
 from ..core.config import settings
+from .embeddings import Embedder
+from .intent_classifier import IntentClassifier
+from .instrumentation import ServiceMetrics
+from .intents import IntentMatcher, template_fields
+from .response_cache import ResponseCache
+from .knowledge_store import KnowledgeStore
+from .retrieval import DocumentStore
+from .prompt_builder import BuiltPrompt, PromptBuilder, TokenCounter
+from .prompts import retrieved_knowledge_prompt
+from .resilience import CLIENT_ERRORS, CircuitBreaker, CircuitOpenError, RetryBudget, RetryPolicy
+from .scheduler import BACKGROUND, INTERACTIVE, SchedulerRejected, UpstreamScheduler
+from .semantic_cache import SemanticCache
+from .summarizer import SUMMARY_HEADER, ConversationSummarizer, summary_request
+from .conversation_store import ConversationStore
+from .sqlite_store import SQLiteConversationStore, sqlite_path
+from .single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 class AIService:
     def __init__(self):
         self.client = None
-        self.conversations = {}  # In-memory storage for demo
-        self.knowledge_base = {}
+        self.http_client = None
+        self.redis = None
+        if "redis" in (settings.CONVERSATION_BACKEND, settings.RESPONSE_CACHE_BACKEND, settings.RATE_LIMIT_BACKEND):
+            from .redis_store import create_redis_client
+            self.redis = create_redis_client(settings.REDIS_URL, settings.REDIS_POOL_SIZE)
+        self.conversation_store = self._create_conversation_store()
+        self.knowledge_store = None
+        self.document_store = None
+        self.response_cache = self._create_response_cache()
+        self.embedder = None
+        self.semantic_cache = None
+        self.single_flight = SingleFlight()
+        self.scheduler = UpstreamScheduler(
+            max_concurrency=settings.UPSTREAM_MAX_CONCURRENCY,
+            queue_size=settings.UPSTREAM_QUEUE_SIZE,
+            queue_timeout=settings.UPSTREAM_QUEUE_TIMEOUT,
+            background_concurrency=settings.UPSTREAM_BACKGROUND_CONCURRENCY
+        )
+        self.circuit_breaker = CircuitBreaker(
+            window=settings.CIRCUIT_WINDOW_SECONDS,
+            min_calls=settings.CIRCUIT_MIN_CALLS,
+            failure_rate=settings.CIRCUIT_FAILURE_RATE,
+            slow_call_seconds=settings.CIRCUIT_SLOW_CALL_SECONDS,
+            slow_call_rate=settings.CIRCUIT_SLOW_CALL_RATE,
+            open_seconds=settings.CIRCUIT_OPEN_SECONDS,
+            max_open_seconds=settings.CIRCUIT_MAX_OPEN_SECONDS,
+            half_open_probes=settings.CIRCUIT_HALF_OPEN_PROBES
+        )
+        self.retry_policy = RetryPolicy(
+            max_retries=settings.UPSTREAM_MAX_RETRIES,
+            base_delay=settings.UPSTREAM_RETRY_BASE_DELAY,
+            max_delay=settings.UPSTREAM_RETRY_MAX_DELAY,
+            budget=RetryBudget(settings.UPSTREAM_RETRY_BUDGET)
+        )
+        self.metrics = ServiceMetrics()
+        self.metrics.track_upstream(self.scheduler, self.circuit_breaker)
+        self.late_answers = set()  # Upstream calls still running after a deadline fallback
+        self.deadline_misses = 0
+        self.intent_matcher = IntentMatcher.from_file(settings.INTENTS_FILE)
+        self.intent_classifier = None
+        self.prompt_builder = None
+        self.summarizer = None
         
+    def _create_response_cache(self) -> ResponseCache:
+        if settings.RESPONSE_CACHE_BACKEND == "redis" and settings.RESPONSE_CACHE_SIZE > 0:
+            from .redis_store import RedisResponseCache
+            return RedisResponseCache(
+                self.redis,
+                settings.REDIS_KEY_PREFIX,
+                ttl=settings.RESPONSE_CACHE_TTL,
+                local_size=settings.REDIS_LOCAL_CACHE_SIZE,
+                local_ttl=settings.REDIS_LOCAL_CACHE_TTL
+            )
+        return ResponseCache(
+            max_size=settings.RESPONSE_CACHE_SIZE,
+            ttl=settings.RESPONSE_CACHE_TTL
+        )
+
+    def _create_conversation_store(self):
+        if settings.CONVERSATION_BACKEND == "redis":
+            from .redis_store import RedisConversationStore
+            return RedisConversationStore(
+                self.redis,
+                settings.REDIS_KEY_PREFIX,
+                history_size=settings.MAX_CONVERSATION_HISTORY * 2,
+                idle_ttl=settings.CONVERSATION_IDLE_TTL,
+                local_size=settings.REDIS_LOCAL_CACHE_SIZE,
+                local_ttl=settings.REDIS_LOCAL_CACHE_TTL
+            )
+
+        memory_store = ConversationStore(
+            max_conversations=settings.MAX_CONVERSATIONS,
+            # MAX_CONVERSATION_HISTORY counts user/assistant exchanges
+            history_size=settings.MAX_CONVERSATION_HISTORY * 2,
+            idle_ttl=settings.CONVERSATION_IDLE_TTL,
+            sweep_interval=settings.CONVERSATION_SWEEP_INTERVAL
+        )
+        if settings.CONVERSATION_BACKEND == "sqlite":
+            # The memory store becomes the hot read cache in front of SQLite
+            return SQLiteConversationStore(
+                sqlite_path(settings.DATABASE_URL),
+                memory_store,
+                batch_size=settings.CONVERSATION_WRITE_BATCH_SIZE,
+                flush_interval=settings.CONVERSATION_FLUSH_INTERVAL
+            )
+        return memory_store
+
     async def initialize(self):
         """Initialize AI service"""
         try:
+            await self.conversation_store.start()
+            
             if settings.OPENAI_API_KEY:
                 openai.api_key = settings.OPENAI_API_KEY
-                self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-                logger.info("OpenAI client initialized")
+                # One pooled keep-alive HTTP client shared by every upstream call
+                self.http_client = httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=settings.OPENAI_POOL_SIZE,
+                        max_keepalive_connections=settings.OPENAI_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY
+                    ),
+                    timeout=httpx.Timeout(settings.RESPONSE_TIMEOUT)
+                )
+                self.client = openai.AsyncOpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    base_url=settings.OPENAI_BASE_URL or None,
+                    timeout=settings.RESPONSE_TIMEOUT,
+                    max_retries=0,
+                    http_client=self.http_client
+                )
+                logger.info("OpenAI async client initialized")
             else:
                 logger.warning("OpenAI API key not provided - using fallback responses")
+            
+            if settings.SEMANTIC_CACHE_ENABLED or settings.RAG_ENABLED:
+                # Model loading is slow, keep it off the event loop
+                self.embedder = await asyncio.to_thread(Embedder, settings.EMBEDDING_MODEL)
+            
+            if settings.SEMANTIC_CACHE_ENABLED and self.embedder.model is None:
+                # Hashed bag-of-words vectors score "python" and "java" questions
+                # as near duplicates; they are only good enough for retrieval
+                logger.warning("Semantic cache disabled - needs a sentence embedding model")
+            elif settings.SEMANTIC_CACHE_ENABLED:
+                self.semantic_cache = SemanticCache(
+                    dim=self.embedder.dim,
+                    capacity=settings.SEMANTIC_CACHE_SIZE,
+                    threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+                    context_thresholds=settings.SEMANTIC_CACHE_THRESHOLDS
+                )
+                logger.info(f"Semantic cache enabled ({self.embedder.backend})")
+            
+            # tiktoken may read its encoding files from disk
+            counter = await asyncio.to_thread(TokenCounter, settings.OPENAI_MODEL)
+            self.prompt_builder = PromptBuilder(counter, settings.PROMPT_TOKEN_BUDGET)
+            
+            if settings.SUMMARY_ENABLED:
+                self.summarizer = ConversationSummarizer(
+                    self.conversation_store,
+                    counter,
+                    trigger=settings.SUMMARY_TRIGGER_MESSAGES,
+                    keep=settings.SUMMARY_KEEP_MESSAGES,
+                    max_tokens=settings.SUMMARY_MAX_TOKENS,
+                    upstream=self._summarize_with_openai if self.client else None
+                )
+                await self.summarizer.start()
+            
+            if settings.INTENT_CLASSIFIER_ENABLED:
+                self.intent_classifier = await asyncio.to_thread(
+                    IntentClassifier.load_or_train,
+                    settings.INTENT_MODEL_FILE,
+                    settings.INTENT_QUESTIONS_FILE,
+                    self.intent_matcher.keyword_phrases()
+                )
                 
         except Exception as e:
             logger.error(f"AI service initialization error: {str(e)}")
@@ -32,208 +193,507 @@ class AIService:
     async def initialize_knowledge_base(self):
         """Initialize portfolio knowledge base"""
         try:
-            self.knowledge_base = {
-                "personal": {
-                    "name": "Huynh Duc Anh",
-                    "title": "AI Engineer", 
-                    "bio": "An AI engineer with expertise in Python, Machine Learning, Deep Learning and Computer Vision. Passionate about creating intelligent solutions that solve real-world problems.",
-                    "location": "Ho Chi Minh City, Vietnam",
-                    "email": "huynhducanh.ai@gmail.com",
-                    "experience_years": 5,
-                    "specialties": ["Artificial Intelligence", "Machine Learning", "Computer Vision", "Data Science"]
-                },
-                "skills": {
-                    "programming": ["Python", "JavaScript", "SQL"],
-                    "ai_ml": ["TensorFlow", "PyTorch", "Scikit-learn", "OpenCV"],
-                    "frameworks": ["FastAPI", "React.js", "Node.js", "Flask"],
-                    "tools": ["Docker", "Git", "AWS", "Google Cloud"]
-                },
-                "projects": [
-                    {
-                        "name": "AI-Powered Image Recognition System",
-                        "description": "Computer vision system for automated quality control in manufacturing using deep learning",
-                        "technologies": ["Python", "OpenCV", "TensorFlow", "FastAPI", "Docker"],
-                        "category": "Computer Vision"
-                    },
-                    {
-                        "name": "Natural Language Processing Chatbot", 
-                        "description": "Intelligent chatbot for customer service automation with sentiment analysis",
-                        "technologies": ["Python", "NLTK", "Transformers", "Flask", "Redis"],
-                        "category": "NLP"
-                    },
-                    {
-                        "name": "Portfolio Website with AI Assistant",
-                        "description": "Modern portfolio website with integrated AI assistant for real-time interaction",
-                        "technologies": ["React.js", "Node.js", "FastAPI", "Socket.io", "OpenAI"],
-                        "category": "Web Development"
-                    }
-                ],
-                "services": [
-                    "AI Strategy Consultation",
-                    "Machine Learning Model Development", 
-                    "Computer Vision Solutions",
-                    "Data Science & Analytics",
-                    "AI System Integration"
-                ]
-            }
-            logger.info("Knowledge base initialized")
+            self.knowledge_store = KnowledgeStore(
+                settings.KNOWLEDGE_FILE,
+                embedder=self.embedder if settings.RAG_ENABLED else None,
+                index_directory=settings.CHROMA_PERSIST_DIRECTORY,
+                reload_interval=settings.KNOWLEDGE_RELOAD_INTERVAL
+            )
+            # Cached answers were built from the previous knowledge
+            self.knowledge_store.on_reload(lambda snapshot: self.invalidate_response_cache())
+            
+            snapshot = await self.knowledge_store.load()
+            self.knowledge_store.start_watching()
+            
+            if settings.RAG_ENABLED and self.embedder is not None:
+                # Chunks of uploaded documents, searched alongside the knowledge base
+                self.document_store = DocumentStore(
+                    self.embedder,
+                    os.path.join(settings.CHROMA_PERSIST_DIRECTORY, "documents")
+                )
+                await asyncio.to_thread(self.document_store.load)
+            logger.info(f"Knowledge base initialized (version {snapshot.version})")
             
         except Exception as e:
             logger.error(f"Knowledge base initialization error: {str(e)}")
             raise
 
-    async def get_ai_response(self, message: str, conversation_id: str, context: str = "portfolio", user_id: str = None) -> Dict[str, Any]:
-        """Get AI response for user message"""
+    @property
+    def knowledge(self):
+        """Current knowledge snapshot"""
+        return self.knowledge_store.snapshot if self.knowledge_store else None
+
+    @property
+    def knowledge_base(self) -> Dict[str, Any]:
+        snapshot = self.knowledge
+        return snapshot.data if snapshot else {}
+
+    async def get_ai_response(self, message: str, conversation_id: str, context: str = "portfolio", user_id: str = None,
+                              slo: Optional[float] = None) -> Dict[str, Any]:
+        """Get AI response for user message
+
+        slo is the latency target in seconds (RESPONSE_SLO_SECONDS when None,
+        0 to always wait for the upstream). The result's served_by says whether
+        the answer came from the upstream, the local responder or a cache.
+        """
+        slo = settings.RESPONSE_SLO_SECONDS if slo is None else slo
+        deadline = time.monotonic() + slo if slo > 0 else None
+        metrics = self.metrics
         try:
-            # Create system prompt based on context
-            system_prompt = self._create_system_prompt(context)
-            
             # Get conversation history
-            conversation_history = self._get_conversation_history(conversation_id)
+            started = time.perf_counter()
+            conversation_history = await self._get_conversation_history(conversation_id)
+            started = metrics.stage("history", started)
             
-            # If OpenAI is available, use it
-            if self.client and settings.OPENAI_API_KEY:
-                return await self._get_openai_response(message, system_prompt, conversation_history)
-            else:
-                # Use fallback response system
-                return await self._get_fallback_response(message, context)
+            # Serve repeated questions from the response cache
+            history_fingerprint = ResponseCache.history_fingerprint(conversation_history)
+            cache_key = self.response_cache.make_key(message, context, history_fingerprint)
+            cached = await self.response_cache.fetch(cache_key)
+            started = metrics.stage("cache_lookup", started)
+            if cached is not None:
+                return {**cached, "cached": True, "served_by": "cache"}
+            
+            # Then paraphrases of already answered questions
+            query_vector = None
+            if self.semantic_cache is not None:
+                query_vector = await self._embed_message(message)
+                similar = self.semantic_cache.lookup(query_vector, context, history_fingerprint)
+                metrics.stage("semantic_lookup", started)
+                if similar is not None:
+                    await self.response_cache.store(cache_key, similar)
+                    return {**similar, "cached": True, "semantic": True, "served_by": "cache"}
+            
+            # Identical concurrent requests share one upstream call
+            return await self.single_flight.do(
+                cache_key,
+                lambda: self._generate_response(
+                    message, context, conversation_id, conversation_history,
+                    cache_key, history_fingerprint, query_vector, deadline
+                )
+            )
                 
         except Exception as e:
-            logger.error(f"AI response error: {str(e)}")
+            logger.error("AI response error: %s", e)
+            metrics.error("ai_response", e)
             return {
                 "response": "I'm sorry, I'm experiencing some technical difficulties. Please try again or contact me directly at huynhducanh.ai@gmail.com",
                 "tokens_used": 0,
-                "error": True
+                "error": True,
+                "served_by": "error"
             }
 
-    async def _get_openai_response(self, message: str, system_prompt: str, conversation_history: List) -> Dict[str, Any]:
-        """Get response from OpenAI"""
+    async def _generate_response(self, message: str, context: str, conversation_id: str, conversation_history: List,
+                                 cache_key: str, history_fingerprint: str, query_vector,
+                                 deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Generate a response and store it in the caches
+
+        With a deadline (a time.monotonic() instant) the upstream call races the
+        local responder. If the upstream has not answered by then and the local
+        responder recognised the intent, the local answer is returned and the
+        upstream answer, once it arrives, is cached for the next identical question.
+        """
+        # Without OpenAI the local responder is the only path
+        if not (self.client and settings.OPENAI_API_KEY):
+            result = {**(await self._get_fallback_response(message, context)), "served_by": "fallback"}
+            await self._store_response(cache_key, context, history_fingerprint, query_vector, result)
+            return result
+        
+        started = time.perf_counter()
+        snapshot = self.knowledge
+        if query_vector is None and snapshot and snapshot.vector_index is not None:
+            query_vector = await self._embed_message(message)
+        prompt = self._build_prompt(message, context, conversation_history, query_vector, snapshot)
+        self.metrics.stage("prompt_build", started)
+        upstream = asyncio.ensure_future(self._get_upstream_answer(
+            conversation_id, prompt.messages, cache_key, context, history_fingerprint, query_vector
+        ))
+        local = None
+        if deadline is not None:
+            local = await self._get_fallback_response(message, context)
+            # An unrecognised question only has the generic reply, worth waiting longer than that
+            if local["intent"] is not None:
+                try:
+                    done, _ = await asyncio.wait({upstream}, timeout=max(deadline - time.monotonic(), 0))
+                except asyncio.CancelledError:
+                    upstream.cancel()
+                    raise
+                if not done:
+                    self._finish_in_background(upstream)
+                    self.deadline_misses += 1
+                    self.metrics.fallbacks.inc(("deadline",))
+                    return {**local, "served_by": "fallback", "fallback_reason": "deadline"}
+        
         try:
-            messages = [{"role": "system", "content": system_prompt}]
-            messages.extend(conversation_history[-10:])  # Last 10 messages for context
-            messages.append({"role": "user", "content": message})
+            return await upstream
+        except Exception as e:
+            # Not cached: the next ask should get a real answer once the upstream recovers
+            reason = self._fallback_reason(e)
+            logger.warning("Upstream unavailable (%s), using fallback response: %s", reason, e)
+            self.metrics.fallbacks.inc((reason,))
+            local = local or await self._get_fallback_response(message, context)
+            return {**local, "served_by": "fallback", "fallback_reason": reason}
+
+    async def _get_upstream_answer(self, conversation_id: str, messages: List[Dict[str, str]], cache_key: str,
+                                   context: str, history_fingerprint: str, query_vector) -> Dict[str, Any]:
+        result = await self._call_upstream(
+            conversation_id,
+            lambda timeout: self._get_openai_response(messages, timeout)
+        )
+        result = {**result, "served_by": "upstream"}
+        await self._store_response(cache_key, context, history_fingerprint, query_vector, result)
+        return result
+
+    async def _store_response(self, cache_key: str, context: str, history_fingerprint: str, query_vector,
+                              result: Dict[str, Any]):
+        await self.response_cache.store(cache_key, result)
+        if query_vector is not None and self.semantic_cache is not None:
+            self.semantic_cache.add(query_vector, context, history_fingerprint, result)
+
+    def _finish_in_background(self, task: asyncio.Task):
+        """Keep a raced upstream call alive after its request was answered locally"""
+        self.late_answers.add(task)
+        task.add_done_callback(self._late_answer_done)
+
+    def _late_answer_done(self, task: asyncio.Task):
+        self.late_answers.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            logger.warning("Upstream answer after deadline failed: %r", error)
+
+    async def stream_ai_response(self, message: str, conversation_id: str, context: str = "portfolio", user_id: str = None,
+                                 outcome: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Stream AI response as text chunks
+
+        outcome, when given, is filled with served_by and fallback_reason.
+        """
+        metrics = self.metrics
+        started = time.perf_counter()
+        conversation_history = await self._get_conversation_history(conversation_id)
+        started = metrics.stage("history", started)
+        
+        if self.client and settings.OPENAI_API_KEY:
+            snapshot = self.knowledge
+            query_vector = None
+            if snapshot and snapshot.vector_index is not None:
+                query_vector = await self._embed_message(message)
+            prompt = self._build_prompt(message, context, conversation_history, query_vector, snapshot)
+            started = metrics.stage("prompt_build", started)
+            if outcome is not None:
+                outcome["served_by"] = "upstream"
+            first_token = None  # Latency of the first chunk, once one has reached the client
+            pending = False  # Let through by the breaker, outcome not yet recorded
+            try:
+                if not self.circuit_breaker.allow():
+                    raise CircuitOpenError("upstream circuit open")
+                pending = True
+                # The slot is held until the stream ends
+                async with self.scheduler.slot(conversation_id):
+                    started = metrics.stage("upstream_queue", started)
+                    async for chunk in self._stream_openai_response(prompt.messages):
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                        yield chunk
+                    ended = metrics.stage("upstream", started)
+                # One outcome per call, recorded when the stream has ended; time to
+                # the first token is what the visitor waits on
+                self.circuit_breaker.record_success(first_token if first_token is not None else ended - started)
+                pending = False
+                return
+            except (SchedulerRejected, CircuitOpenError) as e:
+                logger.warning("%s - streaming fallback response", e)
+                reason = self._fallback_reason(e)
+            except Exception as e:
+                self._record_upstream_error(e, metrics.stage("upstream", started) - started)
+                pending = False
+                metrics.error("upstream", e)
+                # Once tokens have reached the client we cannot switch answers
+                if first_token is not None:
+                    logger.error("OpenAI stream failed mid-answer: %s", e)
+                    raise
+                logger.error("OpenAI stream error, using fallback: %s", e)
+                reason = self._fallback_reason(e)
+            finally:
+                # Rejected in the queue or cancelled before any outcome: free a half-open probe
+                if pending:
+                    self.circuit_breaker.release()
             
-            response = self.client.chat.completions.create(
+            metrics.fallbacks.inc((reason,))
+            if outcome is not None:
+                outcome["fallback_reason"] = reason
+        
+        # Fallback text is streamed in chunks so clients see a single interface
+        if outcome is not None:
+            outcome["served_by"] = "fallback"
+        fallback = await self._get_fallback_response(message, context)
+        for chunk in re.findall(r"\S+\s*", fallback["response"]):
+            yield chunk
+            await asyncio.sleep(0)
+
+    async def _stream_openai_response(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """Stream response tokens from OpenAI"""
+        stream = await asyncio.wait_for(
+            self.client.chat.completions.create(
                 model=settings.OPENAI_MODEL,
                 messages=messages,
                 max_tokens=settings.OPENAI_MAX_TOKENS,
-                temperature=settings.OPENAI_TEMPERATURE
+                temperature=settings.OPENAI_TEMPERATURE,
+                timeout=settings.RESPONSE_TIMEOUT,
+                stream=True
+            ),
+            timeout=settings.RESPONSE_TIMEOUT
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def _get_openai_response(self, messages: List[Dict[str, str]], timeout: float = None) -> Dict[str, Any]:
+        """Get response from OpenAI
+
+        timeout is what is left of the response deadline; None means a full
+        RESPONSE_TIMEOUT.
+        """
+        if timeout is None:
+            timeout = settings.RESPONSE_TIMEOUT
+        elif timeout <= 0:
+            # The deadline passed while queued; the upstream cannot answer in time
+            raise asyncio.TimeoutError("response deadline passed before the upstream call")
+        try:
+            response = await asyncio.wait_for(
+                self.client.chat.completions.create(
+                    model=settings.OPENAI_MODEL,
+                    messages=messages,
+                    max_tokens=settings.OPENAI_MAX_TOKENS,
+                    temperature=settings.OPENAI_TEMPERATURE,
+                    timeout=timeout
+                ),
+                timeout=timeout
             )
             
+            self._count_tokens(response.usage)
             return {
                 "response": response.choices[0].message.content,
                 "tokens_used": response.usage.total_tokens if response.usage else 0
             }
             
         except Exception as e:
-            logger.error(f"OpenAI API error: {str(e)}")
+            logger.error("OpenAI API error: %s", e)
             raise
 
+    async def _summarize_with_openai(self, conversation_id: str, previous: Optional[str], messages: List[Dict]) -> str:
+        """Merge older turns into the rolling summary with the upstream model"""
+        async def complete(timeout: float):
+            return await asyncio.wait_for(
+                self.client.chat.completions.create(
+                    model=settings.OPENAI_MODEL,
+                    messages=summary_request(previous, messages),
+                    max_tokens=settings.SUMMARY_MAX_TOKENS,
+                    temperature=0.3,
+                    timeout=timeout
+                ),
+                timeout=timeout
+            )
+
+        # Background work: only takes a slot no chat request is waiting for, and
+        # is not retried since the extractive summary is a fine stand-in
+        response = await self._call_upstream(conversation_id, complete, priority=BACKGROUND, retry=False)
+        self._count_tokens(response.usage)
+        return response.choices[0].message.content
+
+    def _count_tokens(self, usage):
+        if usage is not None:
+            self.metrics.tokens.inc(("prompt",), usage.prompt_tokens)
+            self.metrics.tokens.inc(("completion",), usage.completion_tokens)
+
+    async def _call_upstream(self, conversation_id: str, call, priority: int = INTERACTIVE, retry: bool = True):
+        """Run an upstream call through the circuit breaker, the scheduler and the retry policy
+
+        call receives the seconds left before the response deadline, which
+        starts when the first attempt gets its slot and covers every retry.
+        """
+        self.retry_policy.budget.deposit()
+        deadline = None
+        attempt = 0
+        while True:
+            if not self.circuit_breaker.allow():
+                raise CircuitOpenError("upstream circuit open")
+            queued = time.perf_counter()
+            started = None
+            try:
+                async with self.scheduler.slot(conversation_id, priority):
+                    started = self.metrics.stage("upstream_queue", queued)
+                    if deadline is None:
+                        deadline = started + settings.RESPONSE_TIMEOUT
+                    result = await call(deadline - started)
+            except Exception as e:
+                if started is None:
+                    # Never reached the upstream
+                    self.circuit_breaker.release()
+                    raise
+                self._record_upstream_error(e, self.metrics.stage("upstream", started) - started)
+                self.metrics.error("upstream", e)
+                delay = self.retry_policy.delay(attempt, e, deadline - time.perf_counter()) if retry else None
+                if delay is None:
+                    raise
+                attempt += 1
+                logger.warning("Upstream attempt %d failed, retrying in %.2fs: %r", attempt, delay, e)
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled: no outcome to record
+                self.circuit_breaker.release()
+                raise
+            self.circuit_breaker.record_success(self.metrics.stage("upstream", started) - started)
+            return result
+
+    def _record_upstream_error(self, error: Exception, latency: float):
+        if isinstance(error, CLIENT_ERRORS):
+            # The upstream is up and answered; the request itself was refused
+            self.circuit_breaker.record_success(latency)
+        else:
+            self.circuit_breaker.record_failure(latency)
+
+    @staticmethod
+    def _fallback_reason(error: Exception) -> str:
+        if isinstance(error, CircuitOpenError):
+            return "circuit_open"
+        if isinstance(error, SchedulerRejected):
+            return "overloaded"
+        return "upstream_error"
+
     async def _get_fallback_response(self, message: str, context: str) -> Dict[str, Any]:
         """Generate fallback response without OpenAI"""
-        message_lower = message.lower()
-        
-        # Simple keyword-based responses
-        if any(word in message_lower for word in ["skill", "technology", "programming"]):
-            response = "I specialize in Python, Machine Learning, Computer Vision, and AI development. My core technologies include TensorFlow, PyTorch, FastAPI, and React.js. I have 5+ years of experience in AI engineering."
-            
-        elif any(word in message_lower for word in ["project", "work", "portfolio"]):
-            response = "I've worked on various AI projects including an Image Recognition System for manufacturing, NLP Chatbots for customer service, and this portfolio website with AI assistant integration. Each project showcases different aspects of AI and machine learning."
-            
-        elif any(word in message_lower for word in ["experience", "background", "career"]):
-            response = "I'm currently a Senior AI Engineer at TechCorp Vietnam with 5+ years of experience in AI and machine learning. I previously worked as a Machine Learning Engineer at DataTech Solutions. I hold a Computer Science degree with specialization in AI."
-            
-        elif any(word in message_lower for word in ["service", "hire", "consultation"]):
-            response = "I offer AI consultation, machine learning model development, computer vision solutions, and data science services. I can help with AI strategy, model development, deployment, and system integration. Feel free to contact me to discuss your specific needs!"
-            
-        elif any(word in message_lower for word in ["education", "certification", "study"]):
-            response = "I have a Bachelor's degree in Computer Science from University of Technology, specializing in AI and Machine Learning. I also hold certifications in AI Foundation, Data Science, and Machine Learning from various institutes."
-            
-        elif any(word in message_lower for word in ["hello", "hi", "hey", "greetings"]):
-            response = "Hello! I'm Huynh Duc Anh's AI assistant. I'm here to help you learn about my skills, projects, and experience in AI engineering. What would you like to know?"
-            
-        elif any(word in message_lower for word in ["thank", "thanks"]):
-            response = "You're welcome! I'm happy to help. If you have any other questions about my AI expertise or projects, feel free to ask!"
-            
-        else:
-            response = "I'm an AI assistant for Huynh Duc Anh's portfolio. I can help you learn about his AI engineering skills, machine learning projects, experience, and services. What specific information would you like to know?"
+        started = time.perf_counter()
+        intent = self.classify_intent(message)
+        snapshot = self.knowledge
+        fields = snapshot.template_fields if snapshot else template_fields({})
+        response = self.intent_matcher.render(intent, context, fields)
+        self.metrics.stage("local_answer", started)
         
         return {
             "response": response,
             "tokens_used": 0,
-            "fallback": True
+            "fallback": True,
+            "intent": intent
         }
 
-    def _create_system_prompt(self, context: str) -> str:
-        """Create system prompt based on context"""
-        base_prompt = """You are an AI assistant for Huynh Duc Anh's portfolio website. You represent Huynh Duc Anh, an experienced AI Engineer specializing in Machine Learning, Computer Vision, and Data Science.
-
-Key Information about Huynh Duc Anh:
-- Name: Huynh Duc Anh
-- Title: AI Engineer  
-- Location: Ho Chi Minh City, Vietnam
-- Email: huynhducanh.ai@gmail.com
-- Experience: 5+ years in AI/ML
-
-Skills & Technologies:
-- Programming: Python (Expert), JavaScript, SQL
-- AI/ML: TensorFlow, PyTorch, Scikit-learn, OpenCV, NLTK
-- Frameworks: FastAPI, React.js, Node.js, Flask
-- Tools: Docker, Git, AWS, Google Cloud
-
-Experience:
-- Current: Senior AI Engineer at TechCorp Vietnam (2023-Present)
-- Previous: Machine Learning Engineer at DataTech Solutions (2021-2023)  
-- Education: Bachelor of Computer Science, specializing in AI/ML
-
-Notable Projects:
-1. AI-Powered Image Recognition System for manufacturing
-2. NLP Chatbot with sentiment analysis
-3. Portfolio website with AI assistant integration
-
-Services Offered:
-- AI Strategy Consultation
-- ML Model Development & Deployment
-- Computer Vision Solutions  
-- Data Science & Analytics
-
-Instructions:
-- Be helpful, professional, and knowledgeable
-- Provide specific, accurate information about skills and experience
-- Encourage users to contact for collaboration opportunities
-- Keep responses concise but informative
-- If asked about topics outside your expertise, politely redirect to relevant portfolio areas"""
-
-        if context == "technical":
-            base_prompt += "\n\nFocus on technical aspects, implementation details, and methodologies."
-        elif context == "business":
-            base_prompt += "\n\nFocus on business value, ROI, and practical applications of AI solutions."
-            
-        return base_prompt
+    def classify_intent(self, message: str) -> Optional[str]:
+        """Intent from the classifier when confident, else from the keyword matcher"""
+        if self.intent_classifier is not None:
+            intent, confidence = self.intent_classifier.predict(message)
+            if confidence >= settings.INTENT_CONFIDENCE_THRESHOLD:
+                return intent if intent in self.intent_matcher.responses else None
+        return self.intent_matcher.match(message)
+
+    def classify_intents(self, messages: List[str]) -> List[Dict[str, Any]]:
+        """Batch intent classification"""
+        if self.intent_classifier is None:
+            return [{"intent": self.intent_matcher.match(message), "confidence": None, "source": "keywords"} for message in messages]
+
+        results = []
+        for message, (intent, confidence) in zip(messages, self.intent_classifier.predict_batch(messages)):
+            if confidence >= settings.INTENT_CONFIDENCE_THRESHOLD:
+                known = intent if intent in self.intent_matcher.responses else None
+                results.append({"intent": known, "confidence": confidence, "source": "classifier"})
+            else:
+                results.append({"intent": self.intent_matcher.match(message), "confidence": confidence, "source": "keywords"})
+        return results
+
+    async def _embed_message(self, message: str):
+        """Embed a message, off the event loop when a real model is loaded"""
+        if self.embedder.model is not None:
+            return await asyncio.to_thread(self.embedder.embed, message)
+        return self.embedder.embed(message)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get response and semantic cache statistics"""
+        return {
+            "response": self.response_cache.stats(),
+            "semantic": self.semantic_cache.stats() if self.semantic_cache is not None else None,
+            "coalescing": self.single_flight.stats()
+        }
+
+    def slo_stats(self) -> Dict[str, Any]:
+        return {
+            "seconds": settings.RESPONSE_SLO_SECONDS,
+            "deadline_misses": self.deadline_misses,
+            "late_answers_pending": len(self.late_answers)
+        }
+
+    def invalidate_response_cache(self):
+        """Invalidate cached responses after knowledge or prompt changes"""
+        self.response_cache.invalidate()
+        if self.semantic_cache is not None:
+            self.semantic_cache.clear()
+        logger.info("Response cache invalidated")
+
+    def _build_prompt(self, message: str, context: str, conversation_history: List,
+                      query_vector=None, snapshot=None) -> BuiltPrompt:
+        """Build the upstream messages within the prompt token budget"""
+        snapshot = snapshot or self.knowledge
+        if snapshot.vector_index is None or query_vector is None:
+            # Precomputed once per knowledge snapshot
+            built = self.prompt_builder.build(snapshot.system_prompt(context), conversation_history, message)
+        else:
+            # Only the knowledge chunks relevant to this message, after the stable prefix
+            retrieved = retrieved_knowledge_prompt(
+                snapshot.data, self._retrieve_knowledge(snapshot.vector_index, query_vector)
+            )
+            built = self.prompt_builder.build(snapshot.retrieval_prompt(context), conversation_history, message, retrieved)
+        
+        logger.info(
+            "Prompt tokens: %d sent, %d saved (%d history messages sent, %d dropped)",
+            built.prompt_tokens, built.tokens_saved, built.history_sent, built.history_dropped
+        )
+        return built
 
-    def _get_conversation_history(self, conversation_id: str) -> List[Dict]:
-        """Get conversation history"""
-        if conversation_id not in self.conversations:
-            self.conversations[conversation_id] = []
-        return self.conversations[conversation_id]
+    def _retrieve_knowledge(self, vector_index, query_vector) -> str:
+        """Get the personal chunk plus the top-k chunks for a message"""
+        matches = vector_index.search(query_vector, settings.RAG_TOP_K, exclude_sections=("personal",))
+        if self.document_store is not None:
+            # Uploaded documents compete with knowledge chunks on similarity
+            matches += self.document_store.search(query_vector, settings.RAG_TOP_K)
+            matches = sorted(matches, key=lambda match: match[1], reverse=True)[:settings.RAG_TOP_K]
+        
+        chunks = []
+        personal = vector_index.section("personal")
+        if personal:
+            chunks.append(personal)
+        chunks.extend(chunk for chunk, score in matches)
+        return "\n".join(
+            f"- {chunk['text']}" if chunk["section"] != "documents" else f"- (from {chunk['source']}) {chunk['text']}"
+            for chunk in chunks
+        )
+
+    async def _get_conversation_history(self, conversation_id: str) -> List[Dict]:
+        """Get the rolling summary and the turns after it; the prompt builder decides how much is sent"""
+        state = await self.conversation_store.history(conversation_id)
+        if state["summary"]:
+            return [{"role": "system", "content": f"{SUMMARY_HEADER}\n{state['summary']}"}] + state["messages"]
+        return state["messages"]
 
-    async def save_conversation_message(self, conversation_id: str, user_message: str, ai_response: str, context: str):
+    async def save_conversation_message(self, conversation_id: str, user_message: str, ai_response: str, context: str, user_id: str = None):
         """Save conversation message"""
+        started = time.perf_counter()
         try:
-            if conversation_id not in self.conversations:
-                self.conversations[conversation_id] = []
-            
-            self.conversations[conversation_id].extend([
-                {"role": "user", "content": user_message, "timestamp": datetime.now().isoformat()},
-                {"role": "assistant", "content": ai_response, "timestamp": datetime.now().isoformat()}
-            ])
-            
-            # Keep only last 20 messages
-            if len(self.conversations[conversation_id]) > 20:
-                self.conversations[conversation_id] = self.conversations[conversation_id][-20:]
+            timestamp = datetime.now().isoformat()
+            await self.conversation_store.append(
+                conversation_id,
+                (
+                    {"role": "user", "content": user_message, "timestamp": timestamp},
+                    {"role": "assistant", "content": ai_response, "timestamp": timestamp}
+                ),
+                context=context,
+                user_id=user_id
+            )
+            if self.summarizer is not None:
+                self.summarizer.schedule(conversation_id)
+            self.metrics.stage("save_history", started)
                 
         except Exception as e:
-            logger.error(f"Save conversation error: {str(e)}")
+            logger.error("Save conversation error: %s", e)
+            self.metrics.error("save_history", e)
 
     async def get_suggestions(self, context: str = "portfolio", topic: str = None, conversation_id: str = None) -> List[str]:
         """Get conversation suggestions"""
@@ -271,29 +731,59 @@ Instructions:
             logger.error(f"Get suggestions error: {str(e)}")
             return []
 
+    async def probe_components(self, timeout: float) -> Dict[str, Dict[str, Any]]:
+        """Check every dependency once, concurrently, for the health monitor"""
+        checks = {
+            "upstream": self._probe_upstream,
+            "knowledge_base": self._probe_knowledge_base,
+            "conversation_store": self.conversation_store.ping,
+            "response_cache": self.response_cache.ping
+        }
+        results = await asyncio.gather(*(self._probe(check, timeout) for check in checks.values()))
+        return dict(zip(checks, results))
+
+    @staticmethod
+    async def _probe(check, timeout: float) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            result = {"ok": True, **(await asyncio.wait_for(check(), timeout) or {})}
+        except Exception as e:
+            result = {"ok": False, "error": str(e) or type(e).__name__}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    async def _probe_upstream(self) -> Dict[str, Any]:
+        if not (self.client and settings.OPENAI_API_KEY):
+            return {"mode": "fallback"}
+        # Listing models checks reachability and the key without spending tokens
+        await self.client.models.list()
+        return {"mode": "openai", "circuit": self.circuit_breaker.state}
+
+    async def _probe_knowledge_base(self) -> Dict[str, Any]:
+        snapshot = self.knowledge
+        if snapshot is None:
+            raise RuntimeError("knowledge base not loaded")
+        return {"version": snapshot.version}
+
     async def health_check(self) -> Dict[str, Any]:
-        """Check AI service health"""
+        """Report AI service state; dependencies are probed by the health monitor"""
         try:
             health_status = {
                 "openai_available": bool(self.client and settings.OPENAI_API_KEY),
                 "knowledge_base_loaded": bool(self.knowledge_base),
-                "conversations_active": len(self.conversations),
+                "knowledge_base": self.knowledge_store.stats() if self.knowledge_store else None,
+                "documents": self.document_store.stats() if self.document_store else None,
+                "conversations_active": len(self.conversation_store),
+                "conversation_store": self.conversation_store.stats(),
+                "summarizer": self.summarizer.stats() if self.summarizer else None,
+                "cache": self.cache_stats(),
+                "upstream_scheduler": self.scheduler.stats(),
+                "circuit_breaker": self.circuit_breaker.stats(),
+                "retries": self.retry_policy.stats(),
+                "response_slo": self.slo_stats(),
                 "status": "healthy"
             }
             
-            if self.client and settings.OPENAI_API_KEY:
-                # Test OpenAI connection
-                try:
-                    test_response = self.client.chat.completions.create(
-                        model="gpt-3.5-turbo",
-                        messages=[{"role": "user", "content": "test"}],
-                        max_tokens=1
-                    )
-                    health_status["openai_test"] = "passed"
-                except:
-                    health_status["openai_test"] = "failed"
-                    health_status["openai_available"] = False
-            
             return health_status
             
         except Exception as e:
@@ -303,6 +793,22 @@ Instructions:
     async def cleanup(self):
         """Cleanup resources"""
         try:
+            if self.summarizer:
+                await self.summarizer.close()
+            for task in list(self.late_answers):
+                task.cancel()
+            if self.client:
+                await self.client.close()
+                self.client = None
+            if self.http_client:
+                await self.http_client.aclose()
+                self.http_client = None
+            if self.knowledge_store:
+                await self.knowledge_store.stop_watching()
+            await self.conversation_store.close()
+            if self.redis is not None:
+                await self.redis.aclose()
+                self.redis = None
             logger.info("AI service cleanup completed")
         except Exception as e:
             logger.error(f"Cleanup error: {str(e)}")
@@ -311,52 +817,28 @@ Instructions:
     async def create_conversation(self, title: str, context: str, user_id: str = None) -> Dict[str, Any]:
         """Create new conversation"""
         conversation_id = f"conv_{uuid.uuid4().hex[:8]}"
-        conversation = {
-            "id": conversation_id,
-            "title": title,
-            "context": context,
-            "user_id": user_id,
-            "created_at": datetime.now().isoformat(),
-            "message_count": 0,
-            "last_activity": None
-        }
-        return conversation
+        return await self.conversation_store.create(conversation_id, title=title, context=context, user_id=user_id)
 
     async def get_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
         """Get conversation details"""
-        if conversation_id in self.conversations:
-            return {
-                "id": conversation_id,
-                "messages": self.conversations[conversation_id],
-                "message_count": len(self.conversations[conversation_id])
-            }
-        return None
+        conversation = await self.conversation_store.get(conversation_id)
+        if conversation:
+            conversation["messages"] = await self.conversation_store.recent_messages(
+                conversation_id, self.conversation_store.history_size
+            )
+        return conversation
 
     async def get_conversation_messages(self, conversation_id: str, limit: int = 50, offset: int = 0) -> List[Dict]:
         """Get conversation messages"""
-        if conversation_id in self.conversations:
-            messages = self.conversations[conversation_id]
-            return messages[offset:offset + limit]
-        return []
+        return await self.conversation_store.get_messages(conversation_id, limit=limit, offset=offset)
 
     async def list_conversations(self, user_id: str = None, context: str = None, limit: int = 20, offset: int = 0) -> List[Dict]:
         """List conversations"""
-        # Simple implementation for demo
-        conversations = []
-        for conv_id, messages in self.conversations.items():
-            conversations.append({
-                "id": conv_id,
-                "message_count": len(messages),
-                "last_activity": messages[-1]["timestamp"] if messages else None
-            })
-        return conversations[offset:offset + limit]
+        return await self.conversation_store.list(user_id=user_id, context=context, limit=limit, offset=offset)
 
     async def delete_conversation(self, conversation_id: str) -> bool:
         """Delete conversation"""
-        if conversation_id in self.conversations:
-            del self.conversations[conversation_id]
-            return True
-        return False
+        return await self.conversation_store.delete(conversation_id)
 
     async def save_feedback(self, conversation_id: str, rating: int, feedback: str = None):
         """Save user feedback"""
@@ -364,20 +846,19 @@ Instructions:
 
     async def update_conversation_title(self, conversation_id: str, title: str) -> bool:
         """Update conversation title"""
-        # Implementation would update database
-        return True
+        return await self.conversation_store.update(conversation_id, title=title)
 
     async def archive_conversation(self, conversation_id: str) -> bool:
         """Archive conversation"""  
-        # Implementation would mark as archived
-        return True
+        return await self.conversation_store.update(conversation_id, archived=True)
 
     async def export_conversation(self, conversation_id: str, format: str) -> Optional[Dict]:
         """Export conversation"""
-        if conversation_id in self.conversations:
+        conversation = await self.get_conversation(conversation_id)
+        if conversation:
             return {
                 "conversation_id": conversation_id,
-                "messages": self.conversations[conversation_id],
+                "messages": conversation["messages"],
                 "format": format
             }
         return None
@@ -0,0 +1,68 @@
+import logging
+
+from ..core.config import settings
+from .ai_service import AIService
+from .health import HealthMonitor
+from .rate_limiter import RedisTokenBuckets, TokenBucketTable
+from .ingestion import IngestionService
+
+logger = logging.getLogger(__name__)
+
+class ServiceContainer:
+    """Process-wide services shared by every router"""
+
+    def __init__(self):
+        self.ai_service = AIService()
+        self.ingestion = None
+        self.rate_limiter = self._create_rate_limiter() if settings.RATE_LIMIT_ENABLED else None
+        self.health = HealthMonitor(
+            self.ai_service.probe_components,
+            interval=settings.HEALTH_CHECK_INTERVAL,
+            max_staleness=settings.HEALTH_MAX_STALENESS,
+            timeout=settings.HEALTH_PROBE_TIMEOUT,
+            # The upstream is optional: without it answers come from the fallback
+            required=("knowledge_base", "conversation_store", "response_cache")
+        )
+
+    def _create_rate_limiter(self):
+        buckets = TokenBucketTable(settings.RATE_LIMIT_CALLS, settings.RATE_LIMIT_PERIOD)
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            return RedisTokenBuckets(self.ai_service.redis, settings.REDIS_KEY_PREFIX, buckets)
+        return buckets
+
+    async def startup(self):
+        """Initialize shared services"""
+        # Initialize AI service
+        await self.ai_service.initialize()
+        logger.info("✅ AI Service initialized successfully")
+
+        # Initialize vector database
+        await self.ai_service.initialize_knowledge_base()
+        logger.info("✅ Knowledge base initialized")
+
+        # Document ingestion needs the embedding backend used for retrieval
+        if self.ai_service.document_store is not None and settings.INGESTION_ENABLED:
+            self.ingestion = IngestionService(
+                self.ai_service.document_store,
+                upload_dir=settings.UPLOAD_DIR,
+                max_file_size=settings.MAX_FILE_SIZE,
+                workers=settings.INGESTION_WORKERS,
+                read_chunk_size=settings.UPLOAD_READ_CHUNK_SIZE,
+                chunk_words=settings.INGESTION_CHUNK_WORDS,
+                chunk_overlap=settings.INGESTION_CHUNK_OVERLAP
+            )
+
+        if self.rate_limiter is not None:
+            await self.rate_limiter.start()
+
+        await self.health.start()
+        logger.info(f"✅ Health monitor started (ready: {self.health.ready})")
+
+    async def shutdown(self):
+        """Release shared resources"""
+        await self.health.close()
+        if self.rate_limiter is not None:
+            await self.rate_limiter.close()
+        if self.ingestion is not None:
+            await self.ingestion.shutdown()
+        await self.ai_service.cleanup()
@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+def history_state(messages: List[Dict[str, Any]], message_count: int, summary: Optional[str],
+                  summarized_count: int) -> Dict[str, Any]:
+    """Rolling summary plus the stored messages it does not cover
+
+    messages are the newest of message_count, so the first summarized_count
+    messages overall are dropped from them.
+    """
+    start = max(summarized_count - (message_count - len(messages)), 0)
+    return {
+        "summary": summary,
+        "summarized_count": summarized_count,
+        "message_count": message_count,
+        "messages": messages[start:]
+    }
+
+class Conversation:
+    """Conversation metadata plus a fixed-capacity ring buffer of messages"""
+
+    __slots__ = ("id", "title", "context", "user_id", "archived", "created_at",
+                 "last_activity", "last_active", "message_count", "messages",
+                 "summary", "summarized_count")
+
+    def __init__(self, conversation_id: str, history_size: int, title: str = None,
+                 context: str = None, user_id: str = None):
+        now = time.time()
+        self.id = conversation_id
+        self.title = title
+        self.context = context
+        self.user_id = user_id
+        self.archived = False
+        self.created_at = now
+        self.last_activity = None
+        self.last_active = time.monotonic()
+        self.message_count = 0
+        self.messages = deque(maxlen=history_size)
+        # Rolling summary of the first summarized_count messages
+        self.summary = None
+        self.summarized_count = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "title": self.title,
+            "context": self.context,
+            "user_id": self.user_id,
+            "archived": self.archived,
+            "created_at": _isoformat(self.created_at),
+            "message_count": self.message_count,
+            "last_activity": _isoformat(self.last_activity)
+        }
+
+class ConversationStore:
+    """Bounded in-memory conversation store
+
+    Conversations are kept in LRU order of activity. The least recently active
+    one is evicted past max_conversations, and idle ones expire after idle_ttl
+    seconds in a background sweep. Each conversation keeps only the last
+    history_size messages.
+    """
+
+    def __init__(self, max_conversations: int = 10000, history_size: int = 20,
+                 idle_ttl: float = 3600, sweep_interval: float = 60):
+        self.max_conversations = max_conversations
+        self.history_size = history_size
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self._conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._sweep_task = None
+        self.evictions = 0
+        self.expirations = 0
+
+    async def start(self):
+        """Start the idle-expiry sweeper"""
+        if self.idle_ttl > 0 and self.sweep_interval > 0 and self._sweep_task is None:
+            self._sweep_task = asyncio.create_task(self._sweep_loop())
+
+    async def close(self):
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            try:
+                await self._sweep_task
+            except asyncio.CancelledError:
+                pass
+            self._sweep_task = None
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Conversation sweep error: {str(e)}")
+
+    def sweep(self) -> int:
+        """Expire idle conversations, oldest first"""
+        deadline = time.monotonic() - self.idle_ttl
+        expired = 0
+        while self._conversations:
+            conversation = next(iter(self._conversations.values()))
+            if conversation.last_active > deadline:
+                break
+            self._conversations.popitem(last=False)
+            expired += 1
+        self.expirations += expired
+        return expired
+
+    def _touch(self, conversation: Conversation):
+        conversation.last_active = time.monotonic()
+        self._conversations.move_to_end(conversation.id)
+
+    def _insert(self, conversation: Conversation) -> Conversation:
+        self._conversations[conversation.id] = conversation
+        while len(self._conversations) > self.max_conversations:
+            self._conversations.popitem(last=False)
+            self.evictions += 1
+        return conversation
+
+    async def create(self, conversation_id: str, title: str = None, context: str = None,
+                     user_id: str = None) -> Dict[str, Any]:
+        conversation = self._insert(Conversation(conversation_id, self.history_size, title, context, user_id))
+        return conversation.to_dict()
+
+    async def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        conversation = self._conversations.get(conversation_id)
+        return conversation.to_dict() if conversation else None
+
+    async def recent_messages(self, conversation_id: str, count: int) -> List[Dict[str, Any]]:
+        """Get up to count of the newest messages, oldest first"""
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None:
+            return []
+        messages = conversation.messages
+        return list(islice(messages, max(len(messages) - count, 0), None))
+
+    async def history(self, conversation_id: str) -> Dict[str, Any]:
+        """Get the rolling summary and the stored messages after it"""
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None:
+            return history_state([], 0, None, 0)
+        return history_state(
+            list(conversation.messages), conversation.message_count,
+            conversation.summary, conversation.summarized_count
+        )
+
+    async def set_summary(self, conversation_id: str, summary: str, summarized_count: int) -> bool:
+        """Replace the rolling summary, which now covers summarized_count messages"""
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None or summarized_count < conversation.summarized_count:
+            return False
+        conversation.summary = summary
+        conversation.summarized_count = summarized_count
+        return True
+
+    async def get_messages(self, conversation_id: str, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None:
+            return []
+        return list(islice(conversation.messages, offset, offset + limit))
+
+    async def append(self, conversation_id: str, messages: Iterable[Dict[str, Any]],
+                     context: str = None, user_id: str = None):
+        """Append messages, creating the conversation on first use"""
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None:
+            conversation = self._insert(Conversation(conversation_id, self.history_size, context=context, user_id=user_id))
+        else:
+            self._touch(conversation)
+
+        for message in messages:
+            conversation.messages.append(message)
+            conversation.message_count += 1
+        conversation.last_activity = time.time()
+
+    async def list(self, user_id: str = None, context: str = None, limit: int = 20,
+                   offset: int = 0) -> List[Dict[str, Any]]:
+        """List conversations, most recently active first"""
+        matches = (
+            conversation for conversation in reversed(self._conversations.values())
+            if (user_id is None or conversation.user_id == user_id)
+            and (context is None or conversation.context == context)
+        )
+        return [conversation.to_dict() for conversation in islice(matches, offset, offset + limit)]
+
+    async def update(self, conversation_id: str, **fields: Any) -> bool:
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None:
+            return False
+        for name, value in fields.items():
+            setattr(conversation, name, value)
+        return True
+
+    async def delete(self, conversation_id: str) -> bool:
+        return self._conversations.pop(conversation_id, None) is not None
+
+    async def ping(self):
+        """Always reachable; present for parity with the persistent backends"""
+
+    def contains(self, conversation_id: str) -> bool:
+        return conversation_id in self._conversations
+
+    def hydrate(self, row: Dict[str, Any], messages: Iterable[Dict[str, Any]]):
+        """Insert a conversation loaded from a persistent backend"""
+        conversation = Conversation(row["id"], self.history_size, row.get("title"), row.get("context"), row.get("user_id"))
+        conversation.archived = bool(row.get("archived"))
+        conversation.created_at = row.get("created_at") or conversation.created_at
+        conversation.last_activity = row.get("last_activity")
+        conversation.message_count = row.get("message_count") or 0
+        conversation.summary = row.get("summary")
+        conversation.summarized_count = row.get("summarized_count") or 0
+        conversation.messages.extend(messages)
+        self._insert(conversation)
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "conversations": len(self._conversations),
+            "max_conversations": self.max_conversations,
+            "history_size": self.history_size,
+            "idle_ttl": self.idle_ttl,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
@@ -0,0 +1,65 @@
+import hashlib
+import logging
+import re
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+@lru_cache(maxsize=65536)
+def _hash_token(token: str, dim: int) -> Tuple[int, float]:
+    """Map a token to a signed bucket"""
+    digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return value % dim, 1.0 if (value >> 63) & 1 else -1.0
+
+class Embedder:
+    """Local CPU sentence embedder
+
+    Uses sentence-transformers with settings.EMBEDDING_MODEL when it is
+    installed, otherwise a hashed bag-of-words vector so the service keeps
+    working without the model download.
+    """
+
+    def __init__(self, model_name: str, dim: int = 384):
+        self.model_name = model_name
+        self.model = None
+        self.dim = dim
+
+        try:
+            from sentence_transformers import SentenceTransformer
+            self.model = SentenceTransformer(model_name, device="cpu")
+            self.dim = self.model.get_sentence_embedding_dimension()
+            logger.info(f"Embedding model loaded: {model_name}")
+        except ImportError:
+            logger.warning("sentence-transformers not installed - using hashed embeddings")
+        except Exception as e:
+            logger.warning(f"Embedding model unavailable ({str(e)}) - using hashed embeddings")
+
+    @property
+    def backend(self) -> str:
+        return self.model_name if self.model is not None else "hashing"
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed one text as a unit-length float32 vector"""
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as a (n, dim) matrix of unit-length rows"""
+        if self.model is not None:
+            vectors = self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+            return np.ascontiguousarray(vectors, dtype=np.float32)
+
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in TOKEN_PATTERN.findall(text.lower()):
+                index, sign = _hash_token(token, self.dim)
+                vectors[row, index] += sign
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Probe = Callable[[float], Awaitable[Dict[str, Dict[str, Any]]]]
+
+LIVENESS_BODY = b'{"status":"alive"}'
+
+class HealthMonitor:
+    """Readiness served from a snapshot refreshed in the background
+
+    Dependencies are probed every interval seconds by one task, never by the
+    request, so a probe costs a timestamp comparison and the response body is
+    serialized once per refresh. A snapshot older than max_staleness reports
+    not ready, since the refresher itself has stopped making progress.
+    Components outside required, like the upstream in fallback mode, are
+    reported but do not gate readiness.
+    """
+
+    def __init__(self, probe: Probe, interval: float = 15.0, max_staleness: float = 60.0,
+                 timeout: float = 2.0, required: Sequence[str] = ()):
+        self.probe = probe
+        self.interval = interval
+        self.max_staleness = max_staleness
+        self.timeout = timeout
+        self.required = tuple(required)
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self.ready = False
+        self.checked_at: Optional[float] = None
+        self.checked_at_iso: Optional[str] = None
+        self.refreshes = 0
+        self._body = b""
+        self._task = None
+
+    async def start(self):
+        """Probe once so readiness is known before traffic arrives, then keep refreshing"""
+        await self.refresh()
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Health refresh error: {str(e)}")
+
+    async def refresh(self):
+        components = await self.probe(self.timeout)
+        ready = all(components.get(name, {}).get("ok") for name in self.required)
+        if ready != self.ready and self.checked_at is not None:
+            failing = [name for name, result in components.items() if not result.get("ok")]
+            logger.warning(f"Readiness changed to {ready}" + (f" (failing: {', '.join(failing)})" if failing else ""))
+        self.components = components
+        self.ready = ready
+        self.checked_at = time.monotonic()
+        self.checked_at_iso = datetime.now().isoformat()
+        self.refreshes += 1
+        self._body = json.dumps(self.report(), separators=(",", ":")).encode()
+
+    def age(self) -> Optional[float]:
+        return time.monotonic() - self.checked_at if self.checked_at is not None else None
+
+    def readiness(self) -> Tuple[int, bytes]:
+        """HTTP status and prebuilt JSON body for a readiness probe"""
+        age = self.age()
+        if age is None or age > self.max_staleness:
+            return 503, json.dumps({**self.report(), "ready": False, "stale": True}, separators=(",", ":")).encode()
+        return (200 if self.ready else 503), self._body
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "checked_at": self.checked_at_iso,
+            "interval": self.interval,
+            "components": self.components
+        }
@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import aiofiles
+import numpy as np
+from fastapi import UploadFile
+
+from .embeddings import Embedder
+from .retrieval import DocumentStore
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {".pdf", ".md", ".markdown", ".txt"}
+WORD_PATTERN = re.compile(r"\S+")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Jobs kept for status lookups
+MAX_TRACKED_JOBS = 200
+# Chunks embedded per process pool call, also the progress granularity
+EMBED_BATCH_SIZE = 32
+
+class UploadTooLargeError(Exception):
+    pass
+
+class UnsupportedFileError(Exception):
+    pass
+
+_worker_embedder = None
+
+def _init_worker(model_name: str):
+    global _worker_embedder
+    _worker_embedder = Embedder(model_name)
+
+def _extract_text(path: str, extension: str) -> str:
+    if extension == ".pdf":
+        from pypdf import PdfReader
+        reader = PdfReader(path)
+        return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+def extract_and_chunk(path: str, extension: str, chunk_words: int, overlap: int) -> List[Dict[str, Any]]:
+    """Extract document text and split it into overlapping word windows"""
+    text = _extract_text(path, extension)
+    words = WORD_PATTERN.findall(text)
+
+    chunks = []
+    step = max(chunk_words - overlap, 1)
+    for start in range(0, len(words), step):
+        window = words[start:start + chunk_words]
+        chunk_text = " ".join(window)
+        chunks.append({
+            "text": chunk_text,
+            "tokens": len(TOKEN_PATTERN.findall(chunk_text.lower()))
+        })
+        if start + chunk_words >= len(words):
+            break
+    return chunks
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    return _worker_embedder.embed_batch(texts)
+
+class IngestionService:
+    """Streams uploads to disk and indexes them for retrieval in a process pool"""
+
+    def __init__(self, document_store: DocumentStore, upload_dir: str, max_file_size: int,
+                 workers: int = 2, read_chunk_size: int = 65536,
+                 chunk_words: int = 200, chunk_overlap: int = 40):
+        self.document_store = document_store
+        self.upload_dir = upload_dir
+        self.max_file_size = max_file_size
+        self.workers = workers
+        self.read_chunk_size = read_chunk_size
+        self.chunk_words = chunk_words
+        self.chunk_overlap = chunk_overlap
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._in_progress: Dict[str, str] = {}  # Content hash -> id of the job indexing it
+        self._executor = None
+        self._tasks = set()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first upload; spawn avoids forking the running event loop
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.document_store.embedder.model_name,)
+            )
+        return self._executor
+
+    def _new_job(self, filename: str) -> Dict[str, Any]:
+        job = {
+            "id": f"job_{uuid.uuid4().hex[:12]}",
+            "filename": filename,
+            "status": "receiving",
+            "bytes_received": 0,
+            "content_hash": None,
+            "duplicate_of": None,
+            "chunks_total": 0,
+            "chunks_embedded": 0,
+            "progress": 0.0,
+            "error": None,
+            "created_at": datetime.now().isoformat(),
+            "completed_at": None
+        }
+        self.jobs[job["id"]] = job
+        while len(self.jobs) > MAX_TRACKED_JOBS:
+            self.jobs.popitem(last=False)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(job_id)
+
+    async def receive(self, file: UploadFile) -> Dict[str, Any]:
+        """Stream an upload to UPLOAD_DIR and queue it for indexing"""
+        filename = os.path.basename(file.filename or "upload")
+        extension = os.path.splitext(filename)[1].lower()
+        if extension not in SUPPORTED_EXTENSIONS:
+            raise UnsupportedFileError(f"Unsupported file type: {extension or 'none'}")
+
+        os.makedirs(self.upload_dir, exist_ok=True)
+        job = self._new_job(filename)
+        digest = hashlib.sha256()
+        partial_path = os.path.join(self.upload_dir, f".{job['id']}.part")
+
+        try:
+            async with aiofiles.open(partial_path, "wb") as out:
+                while True:
+                    data = await file.read(self.read_chunk_size)
+                    if not data:
+                        break
+                    job["bytes_received"] += len(data)
+                    if job["bytes_received"] > self.max_file_size:
+                        raise UploadTooLargeError(
+                            f"File exceeds maximum size of {self.max_file_size} bytes"
+                        )
+                    digest.update(data)
+                    await out.write(data)
+        except BaseException as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+            await asyncio.to_thread(self._remove, partial_path)
+            raise
+
+        content_hash = digest.hexdigest()
+        job["content_hash"] = content_hash
+
+        # Incremental ingestion: identical content is indexed only once,
+        # including content another upload is still indexing
+        if content_hash in self.document_store.source_hashes or content_hash in self._in_progress:
+            job["duplicate_of"] = self._in_progress.get(content_hash)
+            await asyncio.to_thread(self._remove, partial_path)
+            self._finish(job, "duplicate")
+            return job
+
+        # Claimed before the next await so a concurrent identical upload sees it
+        self._in_progress[content_hash] = job["id"]
+        stored_path = os.path.join(self.upload_dir, f"{content_hash[:16]}{extension}")
+        try:
+            await asyncio.to_thread(os.replace, partial_path, stored_path)
+        except BaseException:
+            del self._in_progress[content_hash]
+            raise
+
+        job["status"] = "queued"
+        task = asyncio.create_task(self._process(job, stored_path, extension))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _process(self, job: Dict[str, Any], path: str, extension: str):
+        """Extract, chunk and embed a stored upload, then add it to the index"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+
+        try:
+            job["status"] = "processing"
+            chunks = await loop.run_in_executor(
+                executor, extract_and_chunk, path, extension, self.chunk_words, self.chunk_overlap
+            )
+            job["chunks_total"] = len(chunks)
+            if not chunks:
+                raise ValueError("No text could be extracted")
+
+            vectors = []
+            for start in range(0, len(chunks), EMBED_BATCH_SIZE):
+                batch = [chunk["text"] for chunk in chunks[start:start + EMBED_BATCH_SIZE]]
+                vectors.append(await loop.run_in_executor(executor, embed_texts, batch))
+                job["chunks_embedded"] += len(batch)
+                job["progress"] = job["chunks_embedded"] / job["chunks_total"]
+
+            for position, chunk in enumerate(chunks):
+                chunk.update({
+                    "id": f"doc_{job['content_hash'][:12]}_{position}",
+                    "section": "documents",
+                    "source": job["filename"],
+                    "source_hash": job["content_hash"]
+                })
+
+            await self.document_store.add(chunks, np.vstack(vectors))
+            self._finish(job, "completed")
+            logger.info(f"Ingested {job['filename']}: {len(chunks)} chunks")
+
+        except Exception as e:
+            job["error"] = str(e)
+            self._finish(job, "failed")
+            logger.error(f"Ingestion error for {job['filename']}: {str(e)}")
+        finally:
+            self._in_progress.pop(job["content_hash"], None)
+
+    def _finish(self, job: Dict[str, Any], status: str):
+        job["status"] = status
+        job["completed_at"] = datetime.now().isoformat()
+        if status in ("completed", "duplicate"):
+            job["progress"] = 1.0
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    async def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,93 @@
+import time
+from typing import Optional
+
+from .metrics import MetricsRegistry
+from .prompts import PROMPT_CONTEXTS
+from .resilience import CLOSED, HALF_OPEN, OPEN
+
+# Stages of the chat path, in the order a request goes through them
+STAGES = (
+    "history",
+    "cache_lookup",
+    "semantic_lookup",
+    "prompt_build",
+    "upstream_queue",
+    "upstream",
+    "local_answer",
+    "suggestions",
+    "serialize",
+    "save_history"
+)
+
+def metric_context(context: Optional[str]) -> str:
+    """Contexts come from clients; anything but a known one is "other" to bound the series"""
+    return context if context in PROMPT_CONTEXTS else "other"
+
+class ServiceMetrics:
+    """The service's Prometheus metrics
+
+    Stage spans are taken with time.perf_counter() and recorded straight
+    into pre-created histograms: a span costs a clock read, a dictionary
+    lookup and a bucket search, with no per-request objects.
+    """
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        self.requests = self.registry.histogram(
+            "ai_request_duration_seconds",
+            "Chat request latency by endpoint, context and serving path",
+            ("endpoint", "context", "path")
+        )
+        self.first_token = self.registry.histogram(
+            "ai_time_to_first_token_seconds",
+            "Streaming chat latency to the first token by context and serving path",
+            ("context", "path")
+        )
+        stages = self.registry.histogram(
+            "ai_stage_duration_seconds",
+            "Time spent in each stage of the chat path",
+            ("stage",)
+        )
+        self._stages = {stage: stages.child((stage,)) for stage in STAGES}
+        self.tokens = self.registry.counter("ai_tokens_total", "Upstream tokens used", ("kind",))
+        self.errors = self.registry.counter("ai_errors_total", "Errors by source and exception type", ("source", "error"))
+        self.fallbacks = self.registry.counter(
+            "ai_fallbacks_total",
+            "Answers from the local responder in place of the upstream, by reason",
+            ("reason",)
+        )
+
+    def stage(self, name: str, started: float) -> float:
+        """Record a stage begun at started (a perf_counter reading); returns when it ended"""
+        now = time.perf_counter()
+        self._stages[name].observe(now - started)
+        return now
+
+    def request(self, endpoint: str, context: Optional[str], path: Optional[str], seconds: float):
+        self.requests.observe((endpoint, metric_context(context), path or "unknown"), seconds)
+
+    def error(self, source: str, error: BaseException):
+        self.errors.inc((source, type(error).__name__))
+
+    def track_upstream(self, scheduler, circuit_breaker):
+        """Export scheduler and circuit breaker state, read when scraped"""
+        def upstream_calls():
+            stats = scheduler.stats()
+            return {
+                (state, priority): count
+                for state in ("running", "waiting")
+                for priority, count in stats[state].items()
+            }
+
+        self.registry.gauge(
+            "ai_upstream_calls",
+            "Upstream calls running or waiting for a slot, by priority",
+            upstream_calls,
+            ("state", "priority")
+        )
+        self.registry.gauge(
+            "ai_circuit_state",
+            "Upstream circuit breaker state, 1 for the current one",
+            lambda: {(state,): int(circuit_breaker.state == state) for state in (CLOSED, HALF_OPEN, OPEN)},
+            ("state",)
+        )
@@ -0,0 +1,239 @@
+"""Local intent classifier: hashed TF-IDF features with a softmax linear model
+
+Train offline from the labeled question file:
+
+    python -m app.services.intent_classifier [--questions FILE] [--output FILE]
+
+Keyword phrases from the intents file are added as extra examples. The
+service also retrains at startup when the saved model is missing or its
+training data changed.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import zlib
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Bump when feature extraction changes so saved models are retrained
+FEATURE_VERSION = 1
+DEFAULT_DIM = 16384  # Hashed feature buckets, a power of two
+
+@lru_cache(maxsize=65536)
+def _bucket(feature: str, mask: int) -> int:
+    return zlib.crc32(feature.encode()) & mask
+
+def extract_features(text: str, dim: int) -> Dict[int, float]:
+    """Hashed counts of words, word bigrams and character trigrams"""
+    mask = dim - 1
+    counts: Dict[int, float] = {}
+    words = WORD_PATTERN.findall(text.lower())
+    features = [f"w:{word}" for word in words]
+    features += [f"b:{first} {second}" for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    for feature in features:
+        bucket = _bucket(feature, mask)
+        counts[bucket] = counts.get(bucket, 0.0) + 1.0
+    return counts
+
+class IntentClassifier:
+    """Multinomial logistic regression over hashed TF-IDF vectors
+
+    Weights are a dense (dim, classes) float32 matrix, so scoring a message is
+    a gather of the rows for its few non-zero features.
+    """
+
+    def __init__(self, labels: Sequence[str], weights: np.ndarray, bias: np.ndarray,
+                 idf: np.ndarray, fingerprint: str = ""):
+        self.labels = list(labels)
+        self.weights = weights
+        self.bias = bias
+        self.idf = idf
+        self.dim = idf.shape[0]
+        self.fingerprint = fingerprint
+
+    @staticmethod
+    def fingerprint_of(questions: Dict[str, List[str]], dim: int) -> str:
+        """Identify the training data and feature setup a model was built from"""
+        payload = json.dumps(questions, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(f"{FEATURE_VERSION}:{dim}:{payload}".encode()).hexdigest()
+
+    def _vectorize(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Sparse unit-length TF-IDF vector as (indices, values)"""
+        counts = extract_features(text, self.dim)
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        values *= self.idf[indices]
+        norm = np.linalg.norm(values)
+        if norm > 0:
+            values /= norm
+        return indices, values
+
+    @staticmethod
+    def _softmax(scores: np.ndarray) -> np.ndarray:
+        scores = scores - scores.max(axis=-1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=-1, keepdims=True)
+        return scores
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Most likely label and its probability"""
+        indices, values = self._vectorize(text)
+        probabilities = self._softmax(values @ self.weights[indices] + self.bias)
+        best = int(probabilities.argmax())
+        return self.labels[best], float(probabilities[best])
+
+    def predict_batch(self, texts: Sequence[str]) -> List[Tuple[str, float]]:
+        """Classify many texts with one gather and segment sum"""
+        vectors = [self._vectorize(text) for text in texts]
+        lengths = np.array([len(indices) for indices, _ in vectors], dtype=np.int64)
+        scores = np.tile(self.bias, (len(texts), 1))
+        if lengths.sum():
+            indices = np.concatenate([indices for indices, _ in vectors])
+            values = np.concatenate([values for _, values in vectors])
+            contributions = self.weights[indices] * values[:, None]
+            starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            nonempty = lengths > 0
+            scores[nonempty] += np.add.reduceat(contributions, starts[nonempty], axis=0)
+
+        probabilities = self._softmax(scores)
+        best = probabilities.argmax(axis=1)
+        return [(self.labels[label], float(probabilities[row, label])) for row, label in enumerate(best)]
+
+    @classmethod
+    def train(cls, questions: Dict[str, List[str]], dim: int = DEFAULT_DIM, epochs: int = 300,
+              learning_rate: float = 2.0, l2: float = 1e-4, fingerprint: str = "") -> "IntentClassifier":
+        """Fit IDF weights and a softmax model with full-batch gradient descent"""
+        labels = sorted(questions)
+        texts = [text for label in labels for text in questions[label]]
+        targets = np.array([index for index, label in enumerate(labels) for _ in questions[label]])
+
+        features = [extract_features(text, dim) for text in texts]
+        document_frequency = np.zeros(dim, dtype=np.float32)
+        for counts in features:
+            document_frequency[list(counts)] += 1
+        idf = (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        # Train only on the feature columns that occur; every other weight stays zero
+        active = np.flatnonzero(document_frequency)
+        column = {bucket: position for position, bucket in enumerate(active)}
+        x = np.zeros((len(texts), len(active)), dtype=np.float32)
+        for row, counts in enumerate(features):
+            for bucket, count in counts.items():
+                x[row, column[bucket]] = (1.0 + np.log(count)) * idf[bucket]
+        x /= np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+        one_hot = np.eye(len(labels), dtype=np.float32)[targets]
+        weights = np.zeros((len(active), len(labels)), dtype=np.float32)
+        bias = np.zeros(len(labels), dtype=np.float32)
+        for _ in range(epochs):
+            error = (cls._softmax(x @ weights + bias) - one_hot) / len(texts)
+            weights -= learning_rate * (x.T @ error + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+
+        full_weights = np.zeros((dim, len(labels)), dtype=np.float32)
+        full_weights[active] = weights
+        return cls(labels, full_weights, bias, idf, fingerprint)
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp_path,
+            labels=np.array(self.labels),
+            weights=self.weights,
+            bias=self.bias,
+            idf=self.idf,
+            fingerprint=np.array(self.fingerprint)
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["IntentClassifier"]:
+        try:
+            with np.load(path) as data:
+                return cls(
+                    data["labels"].tolist(), data["weights"], data["bias"],
+                    data["idf"], str(data["fingerprint"])
+                )
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Intent model {path} unreadable: {str(e)}")
+            return None
+
+    @classmethod
+    def load_or_train(cls, model_path: str, questions_path: str,
+                      extra_questions: Optional[Dict[str, List[str]]] = None,
+                      dim: int = DEFAULT_DIM) -> Optional["IntentClassifier"]:
+        """Load the saved model, retraining it when the training data changed"""
+        stored = cls.load(model_path)
+        try:
+            questions = load_questions(questions_path, extra_questions)
+        except FileNotFoundError:
+            return stored
+
+        fingerprint = cls.fingerprint_of(questions, dim)
+        if stored is not None and stored.fingerprint == fingerprint:
+            logger.info(f"Loaded intent classifier with {len(stored.labels)} intents")
+            return stored
+
+        classifier = cls.train(questions, dim=dim, fingerprint=fingerprint)
+        classifier.save(model_path)
+        logger.info(f"Trained intent classifier with {len(classifier.labels)} intents")
+        return classifier
+
+def load_questions(path: str, extra_questions: Optional[Dict[str, List[str]]] = None) -> Dict[str, List[str]]:
+    """Labeled questions from the file, plus extra examples per label"""
+    with open(path, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+    for label, examples in (extra_questions or {}).items():
+        questions[label] = questions.get(label, []) + list(examples)
+    return questions
+
+def cross_validate(questions: Dict[str, List[str]], folds: int = 5) -> float:
+    """Accuracy of models trained on all but every folds-th question"""
+    correct = total = 0
+    for fold in range(folds):
+        train = {label: [q for i, q in enumerate(items) if i % folds != fold] for label, items in questions.items()}
+        held_out = [(q, label) for label, items in questions.items() for i, q in enumerate(items) if i % folds == fold]
+        classifier = IntentClassifier.train(train)
+        predictions = classifier.predict_batch([q for q, _ in held_out])
+        correct += sum(predicted == label for (predicted, _), (_, label) in zip(predictions, held_out))
+        total += len(held_out)
+    return correct / total if total else 0.0
+
+def main():
+    from ..core.config import settings
+    from .intents import IntentMatcher
+
+    parser = argparse.ArgumentParser(prog="python -m app.services.intent_classifier", description="Train the intent classifier")
+    parser.add_argument("--questions", default=settings.INTENT_QUESTIONS_FILE)
+    parser.add_argument("--intents", default=settings.INTENTS_FILE, help="keyword phrases added as examples")
+    parser.add_argument("--output", default=settings.INTENT_MODEL_FILE)
+    parser.add_argument("--folds", type=int, default=5, help="cross-validation folds, 0 skips")
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions, IntentMatcher.from_file(args.intents).keyword_phrases())
+    if args.folds > 1:
+        print(f"{args.folds}-fold cross-validation accuracy: {cross_validate(questions, args.folds):.1%}")
+
+    classifier = IntentClassifier.train(questions, fingerprint=IntentClassifier.fingerprint_of(questions, DEFAULT_DIM))
+    classifier.save(args.output)
+    print(f"Saved {len(classifier.labels)} intents to {args.output}")
+
+if __name__ == "__main__":
+    main()
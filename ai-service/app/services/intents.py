@@ -0,0 +1,144 @@
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from .prompts import SKILL_CATEGORY_LABELS, group_skills
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTEXT = "portfolio"
+
+# Trie keys that mark where a keyword ends
+END = ""
+PREFIX_END = "*"
+
+def keyword_atoms(keyword: str) -> Tuple[List[str], bool]:
+    """Regex atoms of a keyword; a trailing * also matches longer words"""
+    prefix = keyword.endswith("*")
+    atoms: List[str] = []
+    for index, word in enumerate(keyword.rstrip("*").split()):
+        if index:
+            atoms.append(r"\s+")
+        atoms.extend(re.escape(char) for char in word)
+    return atoms, prefix
+
+def trie_pattern(node: Dict[str, Any]) -> str:
+    """Emit a trie as nested alternation, longer continuations tried first"""
+    alternatives = [key + trie_pattern(child) for key, child in node.items() if key not in (END, PREFIX_END)]
+    if PREFIX_END in node:
+        alternatives.append(rf"\w*(?P<{node[PREFIX_END]}>)")
+    if END in node:
+        alternatives.append(f"(?P<{node[END]}>)")
+    return alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+
+def join_names(names: List[str]) -> str:
+    """Join names as: A, B and C"""
+    names = [name for name in names if name]
+    if len(names) <= 1:
+        return "".join(names)
+    return ", ".join(names[:-1]) + " and " + names[-1]
+
+def template_fields(knowledge: Dict[str, Any]) -> Dict[str, str]:
+    """Values for the {placeholders} of response templates"""
+    personal = knowledge.get("personal", {})
+    skills = knowledge.get("skills", [])
+    experience = knowledge.get("experience", [])
+    education = knowledge.get("education", [])
+    roles = [f"{job['position']} at {job['company']}" for job in experience]
+    degree = education[0] if education else {}
+    return {
+        "name": personal.get("name", ""),
+        "title": personal.get("title", ""),
+        "location": personal.get("location", ""),
+        "email": personal.get("email", ""),
+        "experience_years": str(personal.get("experience_years", "")),
+        "specialties": join_names(personal.get("specialties", [])),
+        "top_skills": join_names([s["name"] for s in skills if s.get("level") in ("Expert", "Advanced")]),
+        "skill_groups": "; ".join(
+            f"{SKILL_CATEGORY_LABELS.get(category, category.capitalize())}: {', '.join(s['name'] for s in group)}"
+            for category, group in group_skills(skills).items()
+        ),
+        "current_role": roles[0] if roles else "",
+        "previous_roles": join_names(roles[1:]),
+        "projects": join_names([project["name"] for project in knowledge.get("projects", [])]),
+        "project_details": "; ".join(
+            f"{project['name']} ({', '.join(project.get('technologies', []))})"
+            for project in knowledge.get("projects", [])
+        ),
+        "services": join_names([service["title"] for service in knowledge.get("services", [])]),
+        "degree": degree.get("degree", ""),
+        "school": degree.get("school", ""),
+        "specialization": degree.get("specialization", ""),
+        "certifications": join_names(knowledge.get("certifications", []))
+    }
+
+class IntentMatcher:
+    """Scores messages against keyword tables compiled into one regex
+
+    All keywords of all intents are merged into a character trie and emitted
+    as a single word-bounded pattern, so one finditer pass over the message
+    finds every keyword hit and each position only follows the branches that
+    share its prefix. An empty named group at each keyword end tells which
+    keyword matched. Hits add their weight to their intent and the highest
+    total wins; ties go to the intent listed first.
+    """
+
+    def __init__(self, intents: List[Dict[str, Any]], default_response: Dict[str, str]):
+        self.intents = [intent["name"] for intent in intents]
+        self.responses = {intent["name"]: intent["responses"] for intent in intents}
+        self.keywords = {intent["name"]: list(intent["keywords"]) for intent in intents}
+        self.default_response = default_response
+        self._priority = {name: index for index, name in enumerate(self.intents)}
+
+        trie: Dict[str, Any] = {}
+        self._groups: Dict[str, List[Tuple[str, float]]] = {}
+        for intent in intents:
+            for keyword, weight in intent["keywords"].items():
+                atoms, prefix = keyword_atoms(keyword.lower())
+                node = trie
+                for atom in atoms:
+                    node = node.setdefault(atom, {})
+                end = PREFIX_END if prefix else END
+                group = node.setdefault(end, f"k{len(self._groups)}")
+                self._groups.setdefault(group, []).append((intent["name"], float(weight)))
+        self._pattern = re.compile(rf"\b{trie_pattern(trie)}\b")
+
+    @classmethod
+    def from_file(cls, path: str) -> "IntentMatcher":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        matcher = cls(data["intents"], data["default_response"])
+        logger.info(f"Intent matcher compiled: {len(matcher.intents)} intents, {len(matcher._groups)} keywords")
+        return matcher
+
+    def scores(self, message: str) -> Dict[str, float]:
+        scores: Dict[str, float] = {}
+        for match in self._pattern.finditer(message.lower()):
+            for name, weight in self._groups[match.lastgroup]:
+                scores[name] = scores.get(name, 0.0) + weight
+        return scores
+
+    def match(self, message: str) -> Optional[str]:
+        """Best scoring intent, or None when no keyword matches"""
+        scores = self.scores(message)
+        if not scores:
+            return None
+        return max(scores, key=lambda name: (scores[name], -self._priority[name]))
+
+    def keyword_phrases(self) -> Dict[str, List[str]]:
+        """Keywords of each intent as plain phrases, for training the classifier"""
+        return {name: [keyword.rstrip("*") for keyword in keywords] for name, keywords in self.keywords.items()}
+
+    def render(self, intent: Optional[str], context: str = DEFAULT_CONTEXT,
+               fields: Optional[Dict[str, str]] = None) -> str:
+        """Response template for the intent and context, filled from the knowledge base"""
+        responses = self.responses.get(intent) or self.default_response
+        template = responses.get(context) or responses[DEFAULT_CONTEXT]
+        return template.format_map(fields or {})
+
+    def respond(self, message: str, context: str = DEFAULT_CONTEXT,
+                fields: Optional[Dict[str, str]] = None) -> Tuple[Optional[str], str]:
+        """Matched intent and its response for the context"""
+        intent = self.match(message)
+        return intent, self.render(intent, context, fields)
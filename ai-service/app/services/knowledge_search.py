@@ -0,0 +1,142 @@
+import bisect
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Section name -> result type, in index order
+SECTION_TYPES = {
+    "personal": "personal",
+    "skills": "skill",
+    "experience": "experience",
+    "projects": "project",
+    "education": "education",
+    "certifications": "certification",
+    "services": "service"
+}
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+def _flatten_text(value: Any) -> str:
+    """Join every scalar inside a knowledge item into one string"""
+    if isinstance(value, dict):
+        return " ".join(_flatten_text(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return " ".join(_flatten_text(v) for v in value)
+    return str(value)
+
+def _item_title(section: str, item: Any) -> str:
+    if section == "personal":
+        return "Personal Information"
+    if isinstance(item, str):
+        return item
+    if section == "skills":
+        return f"Skill: {item['name']}"
+    if section == "experience":
+        return f"{item['position']} at {item['company']}"
+    if section == "education":
+        return item["degree"]
+    return item.get("name") or item.get("title") or section.capitalize()
+
+def documents_from_knowledge_base(knowledge_base: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Turn each knowledge section entry into a searchable document"""
+    documents = []
+    for section, doc_type in SECTION_TYPES.items():
+        value = knowledge_base.get(section)
+        if not value:
+            continue
+        items = [value] if isinstance(value, dict) else value
+        for item in items:
+            documents.append({
+                "type": doc_type,
+                "category": section,
+                "title": _item_title(section, item),
+                "content": item,
+                "text": _flatten_text(item)
+            })
+    return documents
+
+class KnowledgeSearchIndex:
+    """Tokenized inverted index with BM25 ranking over knowledge documents"""
+
+    K1 = 1.5
+    B = 0.75
+    # Score weight of a term reached only through prefix expansion
+    PREFIX_WEIGHT = 0.5
+    MIN_PREFIX_LENGTH = 2
+
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self.documents = documents
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths: List[int] = []
+        self.categories: Dict[str, set] = defaultdict(set)
+
+        for doc_id, document in enumerate(documents):
+            terms = Counter(tokenize(document["title"] + " " + document["text"]))
+            self.doc_lengths.append(sum(terms.values()))
+            for term, frequency in terms.items():
+                self.postings[term].append((doc_id, frequency))
+            self.categories[document["category"]].add(doc_id)
+            self.categories[document["type"]].add(doc_id)
+
+        self.postings = dict(self.postings)
+        self.vocabulary = sorted(self.postings)
+        count = len(documents)
+        self.average_length = sum(self.doc_lengths) / count if count else 0.0
+        self.idf = {
+            term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+        # Length normalization depends only on the document, so precompute it
+        self.doc_norms = [
+            self.K1 * (1 - self.B + self.B * length / self.average_length)
+            for length in self.doc_lengths
+        ]
+
+    @classmethod
+    def from_knowledge_base(cls, knowledge_base: Dict[str, Any]) -> "KnowledgeSearchIndex":
+        return cls(documents_from_knowledge_base(knowledge_base))
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        """Get index terms matching a query token exactly or by prefix"""
+        matches = [(token, 1.0)] if token in self.postings else []
+        if len(token) < self.MIN_PREFIX_LENGTH:
+            return matches
+
+        start = bisect.bisect_right(self.vocabulary, token)
+        for term in self.vocabulary[start:]:
+            if not term.startswith(token):
+                break
+            matches.append((term, self.PREFIX_WEIGHT))
+        return matches
+
+    def search(self, query: str, category: Optional[str] = None, limit: int = 10) -> Tuple[List[Dict[str, Any]], int]:
+        """Get the top results for a query and the number of matching documents"""
+        allowed = None
+        if category:
+            allowed = self.categories.get(category.lower(), set())
+
+        scores: Dict[int, float] = defaultdict(float)
+        doc_norms = self.doc_norms
+        for token in set(tokenize(query)):
+            for term, weight in self._expand(token):
+                term_weight = self.idf[term] * weight * (self.K1 + 1)
+                for doc_id, frequency in self.postings[term]:
+                    if allowed is None or doc_id in allowed:
+                        scores[doc_id] += term_weight * frequency / (frequency + doc_norms[doc_id])
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        results = []
+        for doc_id, score in top:
+            document = self.documents[doc_id]
+            results.append({
+                "type": document["type"],
+                "title": document["title"],
+                "content": document["content"],
+                "relevance": round(score, 4)
+            })
+        return results, len(scores)
@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .embeddings import Embedder
+from .intents import template_fields
+from .knowledge_search import KnowledgeSearchIndex
+from .prompts import PROMPT_CONTEXTS, build_retrieval_prompt, build_system_prompt
+from .retrieval import VectorIndex, chunk_knowledge_base
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class KnowledgeSnapshot:
+    """Immutable knowledge base plus everything derived from it
+
+    Readers grab the current snapshot once and use it for the whole request,
+    so a reload never exposes a half-updated state. Nothing in a snapshot is
+    mutated after it is built.
+    """
+    version: str
+    loaded_at: str
+    data: Dict[str, Any]
+    system_prompts: Dict[str, str]
+    retrieval_prompts: Dict[str, str]
+    chunks: Tuple[Dict[str, str], ...]
+    search_index: KnowledgeSearchIndex
+    vector_index: Optional[VectorIndex]
+    response_bytes: bytes
+    template_fields: Dict[str, str]
+
+    def system_prompt(self, context: str) -> str:
+        return self.system_prompts.get(context) or self.system_prompts["portfolio"]
+
+    def retrieval_prompt(self, context: str) -> str:
+        return self.retrieval_prompts.get(context) or self.retrieval_prompts["portfolio"]
+
+def build_snapshot(raw: bytes, embedder: Optional[Embedder] = None,
+                   index_directory: Optional[str] = None) -> KnowledgeSnapshot:
+    """Parse knowledge file contents and precompute derived artifacts"""
+    data = json.loads(raw)
+    version = hashlib.sha256(raw).hexdigest()[:16]
+    chunks = chunk_knowledge_base(data)
+
+    vector_index = None
+    if embedder is not None and index_directory:
+        vector_index = VectorIndex.load_or_build(chunks, embedder, index_directory)
+
+    return KnowledgeSnapshot(
+        version=version,
+        loaded_at=datetime.now().isoformat(),
+        data=data,
+        system_prompts={context: build_system_prompt(data, context) for context in PROMPT_CONTEXTS},
+        retrieval_prompts={context: build_retrieval_prompt(data, context) for context in PROMPT_CONTEXTS},
+        chunks=tuple(chunks),
+        search_index=KnowledgeSearchIndex.from_knowledge_base(data),
+        vector_index=vector_index,
+        response_bytes=json.dumps({"success": True, "data": data}).encode(),
+        template_fields=template_fields(data)
+    )
+
+class KnowledgeStore:
+    """File-backed knowledge base with hot reload
+
+    Reloads build a complete new snapshot in a worker thread and then swap a
+    single reference, so readers never lock and in-flight requests keep the
+    snapshot they started with.
+    """
+
+    def __init__(self, path: str, embedder: Optional[Embedder] = None,
+                 index_directory: Optional[str] = None, reload_interval: float = 2.0):
+        self.path = path
+        self.embedder = embedder
+        self.index_directory = index_directory
+        self.reload_interval = reload_interval
+        self.snapshot: Optional[KnowledgeSnapshot] = None
+        self.reloads = 0
+        self.reload_errors = 0
+        self._file_state = None
+        self._watch_task = None
+        self._listeners: List[Callable[[KnowledgeSnapshot], None]] = []
+
+    def on_reload(self, listener: Callable[[KnowledgeSnapshot], None]):
+        """Register a callback run after a new snapshot is swapped in"""
+        self._listeners.append(listener)
+
+    def _stat(self) -> Tuple[float, int]:
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_and_build(self) -> KnowledgeSnapshot:
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        return build_snapshot(raw, self.embedder, self.index_directory)
+
+    async def load(self) -> KnowledgeSnapshot:
+        """Load the knowledge file and swap in the new snapshot"""
+        file_state = self._stat()
+        snapshot = await asyncio.to_thread(self._read_and_build)
+
+        previous = self.snapshot
+        self.snapshot = snapshot
+        self._file_state = file_state
+
+        if previous is not None:
+            self.reloads += 1
+            logger.info(f"Knowledge base reloaded (version {snapshot.version})")
+            for listener in self._listeners:
+                listener(snapshot)
+        return snapshot
+
+    def start_watching(self):
+        """Poll the knowledge file and reload it when it changes"""
+        if self.reload_interval > 0 and self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop_watching(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                file_state = self._stat()
+                if file_state != self._file_state:
+                    # Remember the attempt so a broken file is not retried every tick
+                    self._file_state = file_state
+                    await self.load()
+            except Exception as e:
+                # Keep serving the last good snapshot
+                self.reload_errors += 1
+                logger.error(f"Knowledge reload error: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self.snapshot
+        return {
+            "path": self.path,
+            "version": snapshot.version if snapshot else None,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "watching": self._watch_task is not None
+        }
@@ -0,0 +1,175 @@
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds, from a cache hit to a slow upstream completion
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Waiting requests
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+class Histogram:
+    """Fixed-bucket histogram with Prometheus "le" semantics
+
+    Observing is a binary search and an increment; quantiles are estimated
+    as the upper bound of the bucket they fall in.
+    """
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def cumulative(self) -> Dict[str, int]:
+        """Counts of observations at or below each bound"""
+        result, total = {}, 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result[repr(bound)] = total
+        result["+Inf"] = self.count
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": self.cumulative()
+        }
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class CounterFamily:
+    """Monotonic counters keyed by a tuple of label values"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, labels: LabelValues = (), amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+                for labels, value in self.values.items()]
+
+class HistogramFamily:
+    """Histograms keyed by a tuple of label values
+
+    Hot paths should hold on to child() and observe it directly, which
+    skips the dictionary lookup.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.children: Dict[LabelValues, Histogram] = {}
+
+    def child(self, labels: LabelValues = ()) -> Histogram:
+        histogram = self.children.get(labels)
+        if histogram is None:
+            histogram = self.children[labels] = Histogram(self.buckets)
+        return histogram
+
+    def observe(self, labels: LabelValues, value: float):
+        self.child(labels).observe(value)
+
+    def samples(self) -> List[str]:
+        lines = []
+        bounds = [f'le="{_number(bound)}"' for bound in self.buckets] + ['le="+Inf"']
+        for labels, histogram in self.children.items():
+            total = 0
+            for bound, count in zip(bounds, histogram.counts):
+                total += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, bound)} {total}")
+            series = _labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{series} {_number(histogram.sum)}")
+            lines.append(f"{self.name}_count{series} {histogram.count}")
+        return lines
+
+class GaugeFamily:
+    """Gauges read from a callback at scrape time, so nothing is recorded per request"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], Dict[LabelValues, float]],
+                 labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.read = read
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+                for labels, value in self.read().items()]
+
+class MetricsRegistry:
+    """Metric families rendered in the Prometheus text exposition format"""
+
+    content_type = "text/plain; version=0.0.4"  # Starlette appends the charset
+
+    def __init__(self):
+        self.families: List[Any] = []
+
+    def register(self, family):
+        self.families.append(family)
+        return family
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> CounterFamily:
+        return self.register(CounterFamily(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> HistogramFamily:
+        return self.register(HistogramFamily(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, read: Callable[[], Dict[LabelValues, float]],
+              labelnames: Sequence[str] = ()) -> GaugeFamily:
+        return self.register(GaugeFamily(name, documentation, read, labelnames))
+
+    def render(self) -> str:
+        lines = []
+        for family in self.families:
+            lines.append(f"# HELP {family.name} {family.documentation}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            lines.extend(family.samples())
+        return "\n".join(lines) + "\n"
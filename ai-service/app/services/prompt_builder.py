@@ -0,0 +1,116 @@
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Words and single punctuation marks, each roughly one BPE token
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Chat format overhead: role and separators per message, plus reply priming
+MESSAGE_OVERHEAD = 4
+REPLY_OVERHEAD = 3
+
+# Encoding of the gpt-3.5/gpt-4 family, used for model names tiktoken does not know
+DEFAULT_ENCODING = "cl100k_base"
+
+class TokenCounter:
+    """Local token counts
+
+    Uses tiktoken's encoding for the configured model, or cl100k_base for
+    model names tiktoken does not know (OpenAI-compatible endpoints). Only
+    when tiktoken is missing or its encoding files cannot be loaded does it
+    estimate from words and punctuation, counting long words as several
+    pieces the way BPE splits them.
+    """
+
+    def __init__(self, model: str):
+        self.encoding = None
+        try:
+            import tiktoken
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+        except ImportError:
+            logger.warning("tiktoken not installed - estimating prompt tokens")
+        except Exception as e:
+            logger.warning(f"tiktoken encoding unavailable ({str(e)}) - estimating prompt tokens")
+        # System prompts and stored messages are counted over and over
+        self.count = lru_cache(maxsize=8192)(self._count)
+
+    @property
+    def backend(self) -> str:
+        return self.encoding.name if self.encoding is not None else "estimate"
+
+    def _count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        return sum((len(token) + 5) // 6 for token in TOKEN_PATTERN.findall(text))
+
+@dataclass
+class BuiltPrompt:
+    messages: List[Dict[str, str]]
+    prompt_tokens: int
+    unbudgeted_tokens: int  # With every available history message
+    history_sent: int
+    history_dropped: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.unbudgeted_tokens - self.prompt_tokens
+
+class PromptBuilder:
+    """Assemble upstream chat messages within a token budget
+
+    Messages are ordered from most to least stable: the per-context system
+    prompt, then history oldest first, then per-request retrieved knowledge
+    and the user message, so consecutive requests share the longest possible
+    prefix for upstream prompt caching. History is filled newest first until
+    the budget is spent. A leading system message in the history, the rolling
+    summary of older turns, is always kept.
+    """
+
+    def __init__(self, counter: TokenCounter, budget: int):
+        self.counter = counter
+        self.budget = budget
+
+    def message_tokens(self, content: str) -> int:
+        return self.counter.count(content) + MESSAGE_OVERHEAD
+
+    def build(self, system_prompt: str, history: List[Dict], message: str,
+              retrieved: Optional[str] = None) -> BuiltPrompt:
+        pinned = []
+        if history and history[0]["role"] == "system":
+            pinned, history = [history[0]], history[1:]
+        tail = []
+        if retrieved:
+            tail.append({"role": "system", "content": retrieved})
+        tail.append({"role": "user", "content": message})
+
+        used = self.message_tokens(system_prompt) + REPLY_OVERHEAD
+        used += sum(self.message_tokens(item["content"]) for item in pinned + tail)
+
+        costs = [self.message_tokens(item["content"]) for item in history]
+        start = len(history)
+        while start > 0 and used + costs[start - 1] <= self.budget:
+            start -= 1
+            used += costs[start]
+        # Never open the window with an assistant reply whose question was cut
+        if start < len(history) and history[start]["role"] == "assistant":
+            used -= costs[start]
+            start += 1
+
+        messages = [{"role": "system", "content": system_prompt}]
+        messages.extend({"role": "system", "content": item["content"]} for item in pinned)
+        messages.extend({"role": item["role"], "content": item["content"]} for item in history[start:])
+        messages.extend(tail)
+        return BuiltPrompt(
+            messages=messages,
+            prompt_tokens=used,
+            unbudgeted_tokens=used + sum(costs[:start]),
+            history_sent=len(history) - start,
+            history_dropped=start
+        )
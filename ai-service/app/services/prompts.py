@@ -0,0 +1,104 @@
+from typing import Any, Dict, List
+
+SKILL_CATEGORY_LABELS = {
+    "programming": "Programming",
+    "ai_ml": "AI/ML",
+    "frameworks": "Frameworks",
+    "tools": "Tools"
+}
+
+CONTEXT_FOCUS = {
+    "technical": "Focus on technical aspects, implementation details, and methodologies.",
+    "business": "Focus on business value, ROI, and practical applications of AI solutions."
+}
+
+# Contexts with a precomputed system prompt
+PROMPT_CONTEXTS = ("portfolio", "technical", "business")
+
+PROMPT_INSTRUCTIONS = """Instructions:
+- Be helpful, professional, and knowledgeable
+- Provide specific, accurate information about skills and experience
+- Encourage users to contact for collaboration opportunities
+- Keep responses concise but informative
+- If asked about topics outside your expertise, politely redirect to relevant portfolio areas"""
+
+def _join_phrases(items: List[str]) -> str:
+    if len(items) <= 2:
+        return " and ".join(items)
+    return ", ".join(items[:-1]) + ", and " + items[-1]
+
+def prompt_intro(knowledge: Dict[str, Any]) -> str:
+    personal = knowledge["personal"]
+    intro = (
+        f"You are an AI assistant for {personal['name']}'s portfolio website. "
+        f"You represent {personal['name']}, an experienced {personal['title']}"
+    )
+    if personal.get("specialties"):
+        intro += f" specializing in {_join_phrases(personal['specialties'])}"
+    return intro + "."
+
+def group_skills(skills: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Group skills by category, keeping file order"""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for skill in skills:
+        groups.setdefault(skill.get("category", "other"), []).append(skill)
+    return groups
+
+def knowledge_prompt(knowledge: Dict[str, Any]) -> str:
+    """Render the whole knowledge base as system prompt prose"""
+    personal = knowledge["personal"]
+    lines = [
+        f"Key Information about {personal['name']}:",
+        f"- Name: {personal['name']}",
+        f"- Title: {personal['title']}",
+        f"- Location: {personal['location']}",
+        f"- Email: {personal['email']}",
+        f"- Experience: {personal['experience_years']}+ years in AI/ML"
+    ]
+
+    lines += ["", "Skills & Technologies:"]
+    for category, skills in group_skills(knowledge.get("skills", [])).items():
+        names = [f"{s['name']} ({s['level']})" if s.get("level") else s["name"] for s in skills]
+        lines.append(f"- {SKILL_CATEGORY_LABELS.get(category, category.capitalize())}: {', '.join(names)}")
+
+    lines += ["", "Experience:"]
+    for index, job in enumerate(knowledge.get("experience", [])):
+        label = "Current" if index == 0 and job["period"].endswith("Present") else "Previous"
+        lines.append(f"- {label}: {job['position']} at {job['company']} ({job['period']})")
+    for degree in knowledge.get("education", []):
+        lines.append(f"- Education: {degree['degree']}, specializing in {degree['specialization']}")
+
+    lines += ["", "Notable Projects:"]
+    for index, project in enumerate(knowledge.get("projects", []), start=1):
+        lines.append(f"{index}. {project['name']} - {project['description']}")
+
+    if knowledge.get("certifications"):
+        lines += ["", "Certifications:"]
+        lines += [f"- {certification}" for certification in knowledge["certifications"]]
+
+    lines += ["", "Services Offered:"]
+    lines += [f"- {service['title']}" for service in knowledge.get("services", [])]
+
+    return "\n".join(lines)
+
+def with_context_focus(prompt: str, context: str) -> str:
+    """Append the context-specific focus line"""
+    if context in CONTEXT_FOCUS:
+        return prompt + "\n\n" + CONTEXT_FOCUS[context]
+    return prompt
+
+def build_system_prompt(knowledge: Dict[str, Any], context: str) -> str:
+    """Build the full system prompt for a context"""
+    prompt = prompt_intro(knowledge) + "\n\n" + knowledge_prompt(knowledge) + "\n\n" + PROMPT_INSTRUCTIONS
+    return with_context_focus(prompt, context)
+
+def build_retrieval_prompt(knowledge: Dict[str, Any], context: str) -> str:
+    """Build the static system prompt used with retrieval
+
+    Retrieved knowledge changes per message, so it travels in a separate
+    message after the history and this prefix stays identical across requests.
+    """
+    return with_context_focus(prompt_intro(knowledge) + "\n\n" + PROMPT_INSTRUCTIONS, context)
+
+def retrieved_knowledge_prompt(knowledge: Dict[str, Any], retrieved: str) -> str:
+    return f"Relevant information about {knowledge['personal']['name']}:\n{retrieved}"
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Refill every bucket and, only if each holds a token, take one from each,
+# atomically; replies [allowed, milliseconds until every bucket has a token]
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local bucket = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(now - updated, 0) * rate)
+    if tokens < 1 then
+        wait = math.max(wait, math.ceil((1 - tokens) / rate * 1000))
+    end
+    levels[i] = tokens
+end
+local allowed = 0
+if wait == 0 then
+    allowed = 1
+end
+for i, key in ipairs(KEYS) do
+    redis.call('HSET', key, 'tokens', tostring(levels[i] - allowed), 'updated', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return {allowed, wait}
+"""
+
+class TokenBucketTable:
+    """In-process token buckets, one per client key
+
+    Buckets hold capacity tokens and regain capacity / period per second.
+    Refill is computed lazily from the time of the last request, so a key
+    costs one small list and no timer. A bucket left alone until it is full
+    again is indistinguishable from a new one, so idle keys are dropped by a
+    sweeper that visits one shard per tick, keeping each pass short however
+    many clients there are.
+    """
+
+    def __init__(self, capacity: int, period: float, shards: int = 256, sweep_interval: float = 1.0):
+        self.capacity = float(capacity)
+        self.rate = capacity / period
+        self.idle_after = period  # Seconds for an empty bucket to refill completely
+        self.sweep_interval = sweep_interval
+        self._shards: List[Dict[str, List[float]]] = [{} for _ in range(shards)]
+        self._next_shard = 0
+        self._sweep_task = None
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    async def start(self):
+        if self.sweep_interval > 0 and self._sweep_task is None:
+            self._sweep_task = asyncio.create_task(self._sweep_loop())
+
+    async def close(self):
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            try:
+                await self._sweep_task
+            except asyncio.CancelledError:
+                pass
+            self._sweep_task = None
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.sweep_shard()
+
+    def sweep_shard(self) -> int:
+        """Drop the idle buckets of the next shard in turn"""
+        shard = self._shards[self._next_shard]
+        self._next_shard = (self._next_shard + 1) % len(self._shards)
+        deadline = time.monotonic() - self.idle_after
+        idle = [key for key, bucket in shard.items() if bucket[1] <= deadline]
+        for key in idle:
+            del shard[key]
+        self.evictions += len(idle)
+        return len(idle)
+
+    def acquire(self, keys: Sequence[str]) -> float:
+        """Take a token from every bucket: 0.0 when allowed, else seconds until each has one
+
+        All or nothing, so a request refused by one bucket does not spend
+        the others.
+        """
+        now = time.monotonic()
+        buckets = []
+        wait = 0.0
+        for key in keys:
+            shard = self._shards[hash(key) % len(self._shards)]
+            bucket = shard.get(key)
+            if bucket is None:
+                bucket = shard[key] = [self.capacity, now]
+            else:
+                bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] < 1:
+                wait = max(wait, (1 - bucket[0]) / self.rate)
+            buckets.append(bucket)
+
+        if wait > 0:
+            self.rejected += 1
+            return wait
+        for bucket in buckets:
+            bucket[0] -= 1
+        self.allowed += 1
+        return 0.0
+
+    async def check(self, *keys: str) -> float:
+        return self.acquire(keys)
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "capacity": self.capacity,
+            "refill_per_second": self.rate,
+            "keys": len(self),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evictions": self.evictions
+        }
+
+class RedisTokenBuckets:
+    """Token buckets shared by every worker through Redis
+
+    Each check is one script call that refills and takes a token
+    atomically. Keys expire once their bucket would be full again, so Redis
+    evicts idle clients itself. If Redis is unreachable the local table
+    takes over, so limits stay per worker instead of failing requests.
+    """
+
+    def __init__(self, client, prefix: str, local: TokenBucketTable):
+        self.client = client
+        self.prefix = f"{prefix}:ratelimit:"
+        self.local = local
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+        self.errors = 0
+
+    async def start(self):
+        await self.local.start()
+
+    async def close(self):
+        await self.local.close()
+
+    async def check(self, *keys: str) -> float:
+        try:
+            allowed, wait_ms = await self._script(
+                keys=[self.prefix + key for key in keys],
+                args=[self.local.capacity, self.local.rate, repr(time.time())]
+            )
+        except Exception as e:
+            self.errors += 1
+            if self.errors == 1 or self.errors % 1000 == 0:
+                logger.warning(f"Redis rate limiter unavailable, limiting per worker: {str(e)}")
+            return self.local.acquire(keys)
+        return 0.0 if allowed else wait_ms / 1000
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis",
+            "capacity": self.local.capacity,
+            "refill_per_second": self.local.rate,
+            "errors": self.errors,
+            "local": self.local.stats()
+        }
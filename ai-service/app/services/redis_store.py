@@ -0,0 +1,333 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import redis.asyncio as redis
+
+from .conversation_store import _isoformat, history_state
+from .response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+UPDATABLE_FIELDS = {"title", "archived"}
+
+def create_redis_client(url: str, pool_size: int, timeout: float = 5.0) -> redis.Redis:
+    """Create a client over a bounded pool that waits for a free connection"""
+    pool = redis.BlockingConnectionPool.from_url(
+        url,
+        max_connections=pool_size,
+        timeout=timeout,
+        decode_responses=True
+    )
+    return redis.Redis.from_pool(pool)
+
+class RedisResponseCache(ResponseCache):
+    """Response cache shared by every worker through Redis
+
+    The inherited in-process LRU is a small read-through layer in front of
+    Redis. Its short TTL bounds how long a worker can keep serving an entry
+    another worker has replaced.
+    """
+
+    def __init__(self, client: redis.Redis, prefix: str, ttl: float,
+                 local_size: int = 256, local_ttl: float = 2.0):
+        super().__init__(max_size=local_size, ttl=local_ttl)
+        self.client = client
+        self.prefix = f"{prefix}:response:"
+        self.shared_ttl = ttl
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.errors = 0
+        self._purge_task = None
+
+    def _redis_key(self, key: str) -> str:
+        return self.prefix + hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+    async def fetch(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        try:
+            raw = await self.client.get(self._redis_key(key))
+        except redis.RedisError as e:
+            self.errors += 1
+            logger.warning(f"Redis response cache read failed: {str(e)}")
+            return None
+        if raw is None:
+            self.shared_misses += 1
+            return None
+
+        self.shared_hits += 1
+        value = json.loads(raw)
+        self.set(key, value)
+        return value
+
+    async def store(self, key: str, value: Dict[str, Any]):
+        self.set(key, value)
+        try:
+            await self.client.set(self._redis_key(key), json.dumps(value), ex=max(int(self.shared_ttl), 1))
+        except redis.RedisError as e:
+            self.errors += 1
+            logger.warning(f"Redis response cache write failed: {str(e)}")
+
+    async def ping(self):
+        await self.client.ping()
+
+    def invalidate(self):
+        """Drop the local entries and purge the shared ones in the background"""
+        super().invalidate()
+        if self._purge_task is None or self._purge_task.done():
+            self._purge_task = asyncio.get_running_loop().create_task(self._purge())
+
+    async def _purge(self):
+        try:
+            batch = []
+            async for key in self.client.scan_iter(match=self.prefix + "*", count=1000):
+                batch.append(key)
+                if len(batch) >= 1000:
+                    await self.client.unlink(*batch)
+                    batch = []
+            if batch:
+                await self.client.unlink(*batch)
+        except redis.RedisError as e:
+            self.errors += 1
+            logger.warning(f"Redis response cache purge failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.shared_hits + self.shared_misses
+        return {
+            "backend": "redis",
+            "local": super().stats(),
+            "ttl": self.shared_ttl,
+            "shared_hits": self.shared_hits,
+            "shared_misses": self.shared_misses,
+            "shared_hit_rate": self.shared_hits / lookups if lookups else 0.0,
+            "errors": self.errors
+        }
+
+class RedisConversationStore:
+    """Conversation store shared by every worker through Redis
+
+    Each conversation is a metadata hash plus a message list trimmed to
+    history_size, both expiring after idle_ttl. Sorted sets scored by last
+    activity index conversations overall, per user and per context. Every
+    operation is a single pipelined round trip where possible, and recent
+    history is kept briefly in a local read-through cache.
+    """
+
+    def __init__(self, client: redis.Redis, prefix: str, history_size: int = 20,
+                 idle_ttl: float = 3600, local_size: int = 256, local_ttl: float = 2.0):
+        self.client = client
+        self.prefix = prefix
+        self.history_size = history_size
+        self.idle_ttl = idle_ttl
+        self.local = ResponseCache(max_size=local_size, ttl=local_ttl)
+
+    def _meta_key(self, conversation_id: str) -> str:
+        return f"{self.prefix}:conversation:{conversation_id}"
+
+    def _messages_key(self, conversation_id: str) -> str:
+        return f"{self.prefix}:conversation:{conversation_id}:messages"
+
+    def _index_keys(self, user_id: str = None, context: str = None) -> List[str]:
+        keys = [f"{self.prefix}:conversations"]
+        if user_id is not None:
+            keys.append(f"{self.prefix}:user:{user_id}:conversations")
+        if context is not None:
+            keys.append(f"{self.prefix}:context:{context}:conversations")
+        return keys
+
+    def _expire(self, pipe, *keys: str):
+        if self.idle_ttl > 0:
+            for key in keys:
+                pipe.expire(key, int(self.idle_ttl))
+
+    @staticmethod
+    def _decode(meta: Dict[str, str]) -> Dict[str, Any]:
+        last_activity = meta.get("last_activity")
+        return {
+            "id": meta["id"],
+            "title": meta.get("title"),
+            "context": meta.get("context"),
+            "user_id": meta.get("user_id"),
+            "archived": meta.get("archived") == "1",
+            "created_at": _isoformat(float(meta["created_at"])),
+            "message_count": int(meta.get("message_count", 0)),
+            "last_activity": _isoformat(float(last_activity)) if last_activity else None
+        }
+
+    async def start(self):
+        await self.client.ping()
+        logger.info("Redis conversation store connected")
+
+    async def close(self):
+        """Nothing buffered locally; the shared client is closed by its owner"""
+        self.local.invalidate()
+
+    async def create(self, conversation_id: str, title: str = None, context: str = None,
+                     user_id: str = None) -> Dict[str, Any]:
+        now = time.time()
+        meta = {"id": conversation_id, "archived": "0", "created_at": repr(now), "message_count": "0"}
+        for name, value in (("title", title), ("context", context), ("user_id", user_id)):
+            if value is not None:
+                meta[name] = value
+
+        meta_key = self._meta_key(conversation_id)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hset(meta_key, mapping=meta)
+            for index in self._index_keys(user_id, context):
+                pipe.zadd(index, {conversation_id: now})
+            self._expire(pipe, meta_key)
+            await pipe.execute()
+        return self._decode(meta)
+
+    async def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        meta = await self.client.hgetall(self._meta_key(conversation_id))
+        return self._decode(meta) if meta else None
+
+    async def _history(self, conversation_id: str) -> Dict[str, Any]:
+        """Recent messages with the counters and summary needed to window them"""
+        state = self.local.get(conversation_id)
+        if state is None:
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.lrange(self._messages_key(conversation_id), -self.history_size, -1)
+                pipe.hmget(self._meta_key(conversation_id), "message_count", "summary", "summarized_count")
+                raw, (message_count, summary, summarized_count) = await pipe.execute()
+            state = {
+                "messages": [json.loads(item) for item in raw],
+                "message_count": int(message_count or 0),
+                "summary": summary,
+                "summarized_count": int(summarized_count or 0)
+            }
+            self.local.set(conversation_id, state)
+        return state
+
+    async def recent_messages(self, conversation_id: str, count: int) -> List[Dict[str, Any]]:
+        """Get up to count of the newest messages, oldest first"""
+        if count <= 0:
+            return []
+        return list((await self._history(conversation_id))["messages"][-count:])
+
+    async def history(self, conversation_id: str) -> Dict[str, Any]:
+        """Get the rolling summary and the stored messages after it"""
+        state = await self._history(conversation_id)
+        return history_state(list(state["messages"]), state["message_count"], state["summary"], state["summarized_count"])
+
+    async def set_summary(self, conversation_id: str, summary: str, summarized_count: int) -> bool:
+        """Replace the rolling summary, which now covers summarized_count messages"""
+        meta_key = self._meta_key(conversation_id)
+        exists, current = await self.client.hmget(meta_key, "id", "summarized_count")
+        # Another worker may already have folded further
+        if exists is None or int(current or 0) > summarized_count:
+            return False
+        await self.client.hset(meta_key, mapping={"summary": summary, "summarized_count": summarized_count})
+        self.local.discard(conversation_id)
+        return True
+
+    async def get_messages(self, conversation_id: str, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        raw = await self.client.lrange(self._messages_key(conversation_id), offset, offset + limit - 1)
+        return [json.loads(item) for item in raw]
+
+    async def append(self, conversation_id: str, messages: Iterable[Dict[str, Any]],
+                     context: str = None, user_id: str = None):
+        """Append messages, creating the conversation on first use"""
+        messages = list(messages)
+        now = time.time()
+        meta_key = self._meta_key(conversation_id)
+        messages_key = self._messages_key(conversation_id)
+
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.rpush(messages_key, *(json.dumps(message) for message in messages))
+            pipe.ltrim(messages_key, -self.history_size, -1)
+            pipe.hsetnx(meta_key, "id", conversation_id)
+            pipe.hsetnx(meta_key, "archived", "0")
+            pipe.hsetnx(meta_key, "created_at", repr(now))
+            if context is not None:
+                pipe.hsetnx(meta_key, "context", context)
+            if user_id is not None:
+                pipe.hsetnx(meta_key, "user_id", user_id)
+            pipe.hset(meta_key, "last_activity", repr(now))
+            pipe.hincrby(meta_key, "message_count", len(messages))
+            for index in self._index_keys(user_id, context):
+                pipe.zadd(index, {conversation_id: now})
+            self._expire(pipe, meta_key, messages_key)
+            await pipe.execute()
+
+        cached = self.local.get(conversation_id)
+        if cached is not None:
+            self.local.set(conversation_id, {
+                **cached,
+                "messages": (cached["messages"] + messages)[-self.history_size:],
+                "message_count": cached["message_count"] + len(messages)
+            })
+
+    async def list(self, user_id: str = None, context: str = None, limit: int = 20,
+                   offset: int = 0) -> List[Dict[str, Any]]:
+        """List conversations, most recently active first"""
+        if user_id is not None:
+            index = self._index_keys(user_id)[1]
+        elif context is not None:
+            index = self._index_keys(context=context)[1]
+        else:
+            index = self._index_keys()[0]
+        # A user's conversations are few, so a combined filter is applied in memory
+        filter_context = user_id is not None and context is not None
+
+        if self.idle_ttl > 0:
+            await self.client.zremrangebyscore(index, "-inf", time.time() - self.idle_ttl)
+        if filter_context:
+            ids = await self.client.zrevrange(index, 0, -1)
+        else:
+            ids = await self.client.zrevrange(index, offset, offset + limit - 1)
+
+        async with self.client.pipeline(transaction=False) as pipe:
+            for conversation_id in ids:
+                pipe.hgetall(self._meta_key(conversation_id))
+            metas = await pipe.execute()
+
+        conversations = [self._decode(meta) for meta in metas if meta]
+        if filter_context:
+            conversations = [c for c in conversations if c["context"] == context][offset:offset + limit]
+        return conversations
+
+    async def update(self, conversation_id: str, **fields: Any) -> bool:
+        fields = {
+            name: ("1" if value else "0") if name == "archived" else value
+            for name, value in fields.items() if name in UPDATABLE_FIELDS
+        }
+        meta_key = self._meta_key(conversation_id)
+        if not await self.client.exists(meta_key):
+            return False
+        if fields:
+            await self.client.hset(meta_key, mapping=fields)
+        return True
+
+    async def delete(self, conversation_id: str) -> bool:
+        self.local.discard(conversation_id)
+        meta_key = self._meta_key(conversation_id)
+        user_id, context = await self.client.hmget(meta_key, "user_id", "context")
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.delete(meta_key, self._messages_key(conversation_id))
+            for index in self._index_keys(user_id, context):
+                pipe.zrem(index, conversation_id)
+            deleted, *_ = await pipe.execute()
+        return deleted > 0
+
+    async def ping(self):
+        await self.client.ping()
+
+    def __len__(self) -> int:
+        """Conversations cached by this worker"""
+        return len(self.local)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis",
+            "history_size": self.history_size,
+            "idle_ttl": self.idle_ttl,
+            "local_cache": self.local.stats()
+        }
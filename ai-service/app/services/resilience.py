@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, Optional
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Transient upstream failures worth another attempt; client errors are not
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,  # Includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+    asyncio.TimeoutError
+)
+
+# The upstream answered and refused the request itself; its health is not in question
+CLIENT_ERRORS = (
+    openai.BadRequestError,
+    openai.NotFoundError,
+    openai.UnprocessableEntityError
+)
+
+class CircuitOpenError(Exception):
+    """The upstream circuit is open; answer locally without calling it"""
+
+class CircuitBreaker:
+    """Upstream circuit breaker over a sliding time window
+
+    Outcomes are counted in window / buckets second buckets. Once the window
+    holds min_calls, the circuit opens when the failure rate or the rate of
+    calls slower than slow_call_seconds crosses its threshold. While open,
+    calls are refused without touching the network. After the open period
+    up to half_open_probes trial calls go through: if all succeed the
+    circuit closes, any failure reopens it for twice as long, up to
+    max_open_seconds.
+    """
+
+    def __init__(self, window: float = 30.0, buckets: int = 10, min_calls: int = 10,
+                 failure_rate: float = 0.5, slow_call_seconds: float = 10.0, slow_call_rate: float = 0.8,
+                 open_seconds: float = 5.0, max_open_seconds: float = 60.0, half_open_probes: int = 2):
+        self.bucket_seconds = window / buckets
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_probes = half_open_probes
+        # [bucket index, calls, failures, slow calls] per slot of the ring
+        self._buckets = [[-1, 0, 0, 0] for _ in range(buckets)]
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._open_for = open_seconds
+        self._probes_started = 0
+        self._probes_succeeded = 0
+        self.opened = 0
+        self.refused = 0
+
+    def _bucket(self, now: float):
+        index = int(now / self.bucket_seconds)
+        bucket = self._buckets[index % len(self._buckets)]
+        if bucket[0] != index:
+            bucket[:] = [index, 0, 0, 0]
+        return bucket
+
+    def _totals(self, now: float):
+        oldest = int(now / self.bucket_seconds) - len(self._buckets) + 1
+        calls = failures = slow = 0
+        for index, bucket_calls, bucket_failures, bucket_slow in self._buckets:
+            if index >= oldest:
+                calls += bucket_calls
+                failures += bucket_failures
+                slow += bucket_slow
+        return calls, failures, slow
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now; a True in half-open starts a probe"""
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now - self._opened_at < self._open_for:
+                self.refused += 1
+                return False
+            self.state = HALF_OPEN
+            self._probes_started = self._probes_succeeded = 0
+            logger.info("Upstream circuit half-open, probing")
+        if self._probes_started >= self.half_open_probes:
+            self.refused += 1
+            return False
+        self._probes_started += 1
+        return True
+
+    def record_success(self, latency: float):
+        now = time.monotonic()
+        bucket = self._bucket(now)
+        bucket[1] += 1
+        slow = latency >= self.slow_call_seconds
+        if slow:
+            bucket[3] += 1
+        if self.state == HALF_OPEN:
+            if slow:
+                self._open(now)
+                return
+            self._probes_succeeded += 1
+            if self._probes_succeeded >= self.half_open_probes:
+                self._close()
+        elif self.state == CLOSED:
+            self._evaluate(now)
+
+    def record_failure(self, latency: float):
+        now = time.monotonic()
+        bucket = self._bucket(now)
+        bucket[1] += 1
+        bucket[2] += 1
+        if latency >= self.slow_call_seconds:
+            bucket[3] += 1
+        if self.state == HALF_OPEN:
+            self._open(now)
+        elif self.state == CLOSED:
+            self._evaluate(now)
+
+    def release(self):
+        """A permitted call never reached the upstream; free its probe"""
+        if self.state == HALF_OPEN and self._probes_started > self._probes_succeeded:
+            self._probes_started -= 1
+
+    def _evaluate(self, now: float):
+        calls, failures, slow = self._totals(now)
+        if calls < self.min_calls:
+            return
+        if failures / calls >= self.failure_rate or slow / calls >= self.slow_call_rate:
+            logger.warning(f"Upstream circuit opened: {failures}/{calls} failed, {slow}/{calls} slow")
+            self._open_for = self.open_seconds
+            self._open(now, escalate=False)
+
+    def _open(self, now: float, escalate: bool = True):
+        if escalate:
+            # A failed probe: the upstream is still down, back off further
+            self._open_for = min(self._open_for * 2, self.max_open_seconds)
+            logger.warning(f"Upstream probe failed, circuit open for {self._open_for:.1f}s")
+        self.state = OPEN
+        self._opened_at = now
+        self.opened += 1
+
+    def _close(self):
+        self.state = CLOSED
+        self._open_for = self.open_seconds
+        # Start the window over so pre-outage failures cannot reopen it
+        for bucket in self._buckets:
+            bucket[:] = [-1, 0, 0, 0]
+        logger.info("Upstream circuit closed")
+
+    def stats(self) -> Dict[str, Any]:
+        calls, failures, slow = self._totals(time.monotonic())
+        return {
+            "state": self.state,
+            "window_calls": calls,
+            "window_failures": failures,
+            "window_slow_calls": slow,
+            "open_seconds": self._open_for if self.state != CLOSED else None,
+            "opened": self.opened,
+            "refused": self.refused
+        }
+
+class RetryBudget:
+    """Caps retries at a fraction of recent requests
+
+    Each first attempt deposits ratio tokens and each retry spends one, so
+    during an outage retries add at most ratio extra load instead of
+    multiplying it. The balance is capped so a quiet period cannot save up
+    a retry storm.
+    """
+
+    def __init__(self, ratio: float = 0.2, cap: float = 10.0):
+        self.ratio = ratio
+        self.cap = cap
+        self.balance = cap
+
+    def deposit(self):
+        self.balance = min(self.cap, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.balance < 1:
+            return False
+        self.balance -= 1
+        return True
+
+class RetryPolicy:
+    """Bounded exponential backoff with full jitter, within a retry budget"""
+
+    def __init__(self, max_retries: int = 2, base_delay: float = 0.2, max_delay: float = 2.0,
+                 budget: Optional[RetryBudget] = None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+        self.retries = 0
+        self.exhausted = 0
+
+    def delay(self, attempt: int, error: Exception, remaining: float) -> Optional[float]:
+        """Seconds to wait before retry number attempt + 1, or None to give up"""
+        if attempt >= self.max_retries or not isinstance(error, RETRYABLE_ERRORS):
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        # A retry that cannot finish inside the deadline only adds load
+        if delay >= remaining or not self.budget.withdraw():
+            self.exhausted += 1
+            return None
+        self.retries += 1
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_retries": self.max_retries,
+            "retries": self.retries,
+            "budget_exhausted": self.exhausted,
+            "budget_balance": round(self.budget.balance, 2)
+        }
@@ -0,0 +1,109 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Tuple
+
+class ResponseCache:
+    """In-process LRU cache with TTL for AI responses"""
+
+    def __init__(self, max_size: int = 1000, ttl: float = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def normalize_message(message: str) -> str:
+        """Normalize message text for cache lookups"""
+        return " ".join(message.lower().split())
+
+    @staticmethod
+    def history_fingerprint(history: List[Dict]) -> str:
+        """Hash the role/content pairs of a history window"""
+        digest = hashlib.blake2b(digest_size=16)
+        for item in history:
+            digest.update(item.get("role", "").encode())
+            digest.update(b"\x00")
+            digest.update(item.get("content", "").encode())
+            digest.update(b"\x01")
+        return digest.hexdigest()
+
+    def make_key(self, message: str, context: str, history_fingerprint: str) -> str:
+        """Build cache key from normalized message, context and history"""
+        return "\x1f".join((
+            self.normalize_message(message),
+            context or "",
+            history_fingerprint
+        ))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get cached response, or None on miss"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]):
+        """Store response, evicting least recently used entries"""
+        if self.max_size <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, key: str):
+        """Drop a single entry"""
+        self._entries.pop(key, None)
+
+    async def fetch(self, key: str) -> Optional[Dict[str, Any]]:
+        """Async lookup, overridden by shared backends"""
+        return self.get(key)
+
+    async def store(self, key: str, value: Dict[str, Any]):
+        """Async store, overridden by shared backends"""
+        self.set(key, value)
+
+    async def ping(self):
+        """In-process caches are always reachable, shared backends override this"""
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self):
+        """Drop every cached response"""
+        self._entries.clear()
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
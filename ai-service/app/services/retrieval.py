@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .embeddings import Embedder
+from .prompts import SKILL_CATEGORY_LABELS, group_skills
+
+logger = logging.getLogger(__name__)
+
+def chunk_knowledge_base(knowledge_base: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Split the knowledge base into self-contained text chunks"""
+    chunks = []
+
+    def add(section: str, text: str):
+        chunks.append({"id": f"{section}_{len(chunks)}", "section": section, "text": text})
+
+    personal = knowledge_base.get("personal")
+    if personal:
+        add("personal", (
+            f"Name: {personal['name']}. Title: {personal['title']}. "
+            f"Location: {personal['location']}. Email: {personal['email']}. "
+            f"Experience: {personal['experience_years']}+ years in AI/ML. {personal['bio']} "
+            f"Specialties: {', '.join(personal.get('specialties', []))}."
+        ))
+
+    for category, skills in group_skills(knowledge_base.get("skills", [])).items():
+        label = SKILL_CATEGORY_LABELS.get(category, category.capitalize())
+        names = [f"{s['name']} ({s['level']})" if s.get("level") else s["name"] for s in skills]
+        add("skills", f"Skills - {label}: {', '.join(names)}.")
+
+    for job in knowledge_base.get("experience", []):
+        add("experience", (
+            f"Experience: {job['position']} at {job['company']} ({job['period']}). {job['description']}"
+        ))
+
+    for project in knowledge_base.get("projects", []):
+        category = f" ({project['category']})" if project.get("category") else ""
+        add("projects", (
+            f"Project: {project['name']}{category}. {project['description']}. "
+            f"Technologies: {', '.join(project['technologies'])}."
+        ))
+
+    for degree in knowledge_base.get("education", []):
+        add("education", (
+            f"Education: {degree['degree']}, {degree['school']} ({degree['period']}), "
+            f"specializing in {degree['specialization']}."
+        ))
+
+    if knowledge_base.get("certifications"):
+        add("certifications", f"Certifications: {'; '.join(knowledge_base['certifications'])}.")
+
+    for service in knowledge_base.get("services", []):
+        description = f": {service['description']}" if service.get("description") else ""
+        add("services", f"Service offered: {service['title']}{description}.")
+
+    return chunks
+
+class VectorIndex:
+    """Persisted, memory-mapped vector index over knowledge chunks"""
+
+    CHUNKS_FILE = "chunks.json"
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, chunks: List[Dict[str, str]], vectors: np.ndarray):
+        self.chunks = chunks
+        self.vectors = vectors
+
+    @staticmethod
+    def fingerprint(chunks: List[Dict[str, str]], embedder: Embedder) -> str:
+        """Identify the chunk set and embedding backend an index was built from"""
+        digest = hashlib.sha256(f"{embedder.backend}:{embedder.dim}".encode())
+        for chunk in chunks:
+            digest.update(chunk["text"].encode())
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    @classmethod
+    def load_or_build(cls, chunks: List[Dict[str, str]], embedder: Embedder, directory: str) -> "VectorIndex":
+        """Memory-map the persisted index, rebuilding it when the chunks changed"""
+        fingerprint = cls.fingerprint(chunks, embedder)
+
+        stored = cls.load(directory)
+        if stored is not None and stored[1].get("fingerprint") == fingerprint:
+            logger.info(f"Loaded vector index with {len(stored[0].chunks)} chunks")
+            return stored[0]
+
+        index = cls(chunks, embedder.embed_batch([chunk["text"] for chunk in chunks]))
+        vectors_file = index.save(directory, fingerprint)
+        logger.info(f"Built vector index with {len(chunks)} chunks")
+        return cls(chunks, np.load(os.path.join(directory, vectors_file), mmap_mode="r"))
+
+    @classmethod
+    def load(cls, directory: str) -> Optional[Tuple["VectorIndex", Dict[str, Any]]]:
+        """Memory-map a persisted index, returning it with its manifest"""
+        try:
+            with open(os.path.join(directory, cls.MANIFEST_FILE)) as f:
+                manifest = json.load(f)
+            with open(os.path.join(directory, cls.CHUNKS_FILE)) as f:
+                chunks = json.load(f)
+            vectors = np.load(os.path.join(directory, manifest["vectors_file"]), mmap_mode="r")
+            return cls(chunks, vectors), manifest
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Vector index in {directory} unreadable: {str(e)}")
+            return None
+
+    def save(self, directory: str, fingerprint: str, **manifest_fields: Any) -> str:
+        """Write the index atomically; the manifest is replaced last
+
+        Vectors go to a file named after the fingerprint, so a previous index
+        that is still memory-mapped by live snapshots is never overwritten.
+        """
+        os.makedirs(directory, exist_ok=True)
+        vectors_file = f"vectors-{fingerprint[:16]}.npy"
+
+        files = {
+            vectors_file: lambda f: np.save(f, np.ascontiguousarray(self.vectors, dtype=np.float32)),
+            self.CHUNKS_FILE: lambda f: f.write(json.dumps(self.chunks).encode()),
+            self.MANIFEST_FILE: lambda f: f.write(json.dumps({
+                "fingerprint": fingerprint,
+                "vectors_file": vectors_file,
+                "count": len(self.chunks),
+                **manifest_fields
+            }).encode())
+        }
+        for name, write in files.items():
+            path = os.path.join(directory, name)
+            # Per-process temp names keep concurrently starting workers from clobbering each other
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+
+        # Remove vector files of older fingerprints right away, even though a
+        # snapshot still serving requests may have one memory-mapped: on POSIX
+        # the mapping keeps the unlinked inode alive until it is closed. Where
+        # a mapped file cannot be removed (Windows) it is left for the next save
+        for name in os.listdir(directory):
+            if name.startswith("vectors-") and name.endswith(".npy") and name != vectors_file:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+        return vectors_file
+
+    def search(self, vector: np.ndarray, k: int, exclude_sections: Tuple[str, ...] = ()) -> List[Tuple[Dict[str, str], float]]:
+        """Get the top-k chunks by cosine similarity"""
+        if not self.chunks:
+            return []
+        scores = np.asarray(self.vectors @ vector, dtype=np.float32)
+        for i, chunk in enumerate(self.chunks):
+            if chunk["section"] in exclude_sections:
+                scores[i] = -np.inf
+
+        k = min(k, len(self.chunks))
+        if k <= 0:
+            return []
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.chunks[i], float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    def section(self, name: str) -> Optional[Dict[str, str]]:
+        """Get the first chunk of a section"""
+        return next((chunk for chunk in self.chunks if chunk["section"] == name), None)
+
+class DocumentStore:
+    """Persisted vector index over chunks of uploaded documents
+
+    Every change builds a new VectorIndex and swaps one reference, so
+    retrieval reads without locks while ingestion jobs append.
+    """
+
+    def __init__(self, embedder: Embedder, directory: str):
+        self.embedder = embedder
+        self.directory = directory
+        self.index = VectorIndex([], np.zeros((0, embedder.dim), dtype=np.float32))
+        self.source_hashes = set()
+        self._write_lock = asyncio.Lock()
+
+    def _backend(self) -> str:
+        return f"{self.embedder.backend}:{self.embedder.dim}"
+
+    def load(self):
+        """Load persisted document chunks, re-embedding them if the backend changed"""
+        stored = VectorIndex.load(self.directory)
+        if stored is None:
+            return
+
+        index, manifest = stored
+        if manifest.get("backend") != self._backend() and index.chunks:
+            logger.info(f"Embedding backend changed, re-embedding {len(index.chunks)} document chunks")
+            vectors = self.embedder.embed_batch([chunk["text"] for chunk in index.chunks])
+            index = self._write(index.chunks, vectors)
+
+        self.index = index
+        self.source_hashes = {chunk["source_hash"] for chunk in index.chunks}
+        logger.info(f"Loaded {len(index.chunks)} document chunks")
+
+    def _write(self, chunks: List[Dict[str, Any]], vectors: np.ndarray) -> VectorIndex:
+        digest = hashlib.sha256(self._backend().encode())
+        for source_hash in sorted({chunk["source_hash"] for chunk in chunks}):
+            digest.update(source_hash.encode())
+        vectors_file = VectorIndex(chunks, vectors).save(
+            self.directory, digest.hexdigest(), backend=self._backend()
+        )
+        return VectorIndex(chunks, np.load(os.path.join(self.directory, vectors_file), mmap_mode="r"))
+
+    async def add(self, chunks: List[Dict[str, Any]], vectors: np.ndarray):
+        """Append chunks of one document and swap in the new index"""
+        # Writers are serialized; readers keep using the previous index
+        async with self._write_lock:
+            current = self.index
+            all_chunks = list(current.chunks) + list(chunks)
+            all_vectors = np.vstack([np.asarray(current.vectors), vectors]).astype(np.float32)
+            self.index = await asyncio.to_thread(self._write, all_chunks, all_vectors)
+            self.source_hashes |= {chunk["source_hash"] for chunk in chunks}
+
+    def search(self, vector: np.ndarray, k: int) -> List[Tuple[Dict[str, Any], float]]:
+        return self.index.search(vector, k)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self.source_hashes),
+            "chunks": len(self.index.chunks)
+        }
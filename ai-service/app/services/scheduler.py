@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+
+from .metrics import DEPTH_BUCKETS, LATENCY_BUCKETS, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Lower values are served first
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+class SchedulerRejected(Exception):
+    """The upstream is saturated; the caller should fall back instead of waiting"""
+
+class UpstreamScheduler:
+    """Admission control for upstream calls
+
+    At most max_concurrency calls run at once and at most queue_size wait.
+    Waiters are grouped by conversation and each priority level is served
+    round robin across conversations, so one chatty visitor gets one slot
+    per turn of the queue. Interactive work always goes before background
+    work, which is further capped at background_concurrency slots so it can
+    never crowd out chat.
+
+    Interactive waiters have a queue deadline. A request whose estimated
+    wait (waiters ahead times the average call duration, spread over the
+    slots) already exceeds it is rejected on arrival instead of timing out
+    later, which lets the caller answer from the fallback right away.
+    """
+
+    def __init__(self, max_concurrency: int = 8, queue_size: int = 64, queue_timeout: float = 5.0,
+                 background_concurrency: int = 2):
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.background_concurrency = max(1, min(background_concurrency, max_concurrency))
+        self._queues: Dict[int, "OrderedDict[str, Deque[asyncio.Future]]"] = {
+            INTERACTIVE: OrderedDict(),
+            BACKGROUND: OrderedDict()
+        }
+        self._waiting = {INTERACTIVE: 0, BACKGROUND: 0}
+        self._running = {INTERACTIVE: 0, BACKGROUND: 0}
+        self._call_time: Optional[float] = None  # Moving average of slot hold time
+        self.queue_depth = Histogram(DEPTH_BUCKETS)
+        self.wait_time = {priority: Histogram(LATENCY_BUCKETS) for priority in PRIORITY_NAMES}
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "deadline": 0, "timeout": 0}
+
+    @property
+    def running(self) -> int:
+        return self._running[INTERACTIVE] + self._running[BACKGROUND]
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting[INTERACTIVE] + self._waiting[BACKGROUND]
+
+    def _can_start(self, priority: int) -> bool:
+        if self.running >= self.max_concurrency:
+            return False
+        return priority == INTERACTIVE or self._running[BACKGROUND] < self.background_concurrency
+
+    def _ahead(self, priority: int) -> int:
+        """Waiters that would be served before a new arrival at priority"""
+        return self._waiting[INTERACTIVE] + (self._waiting[BACKGROUND] if priority == BACKGROUND else 0)
+
+    def estimated_wait(self, priority: int = INTERACTIVE) -> float:
+        if self._call_time is None or self.running < self.max_concurrency:
+            return 0.0
+        return (self._ahead(priority) + 1) * self._call_time / self.max_concurrency
+
+    @asynccontextmanager
+    async def slot(self, key: str, priority: int = INTERACTIVE, timeout: Optional[float] = None):
+        """Hold an upstream slot for the body of the block
+
+        timeout defaults to the queue deadline for interactive work; background
+        work waits as long as it takes unless given one.
+        """
+        await self.acquire(key, priority, timeout)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(priority, time.monotonic() - started)
+
+    async def acquire(self, key: str, priority: int = INTERACTIVE, timeout: Optional[float] = None):
+        if timeout is None and priority == INTERACTIVE:
+            timeout = self.queue_timeout
+        self.queue_depth.observe(self.waiting)
+
+        if self._can_start(priority) and not self._ahead(priority):
+            self._running[priority] += 1
+            self.admitted += 1
+            self.wait_time[priority].observe(0.0)
+            return
+        if self.waiting >= self.queue_size:
+            self._reject("queue_full", priority)
+        if timeout is not None and self.estimated_wait(priority) > timeout:
+            self._reject("deadline", priority)
+
+        future = asyncio.get_running_loop().create_future()
+        waiters = self._queues[priority].setdefault(key, deque())
+        waiters.append(future)
+        self._waiting[priority] += 1
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Granted just as the wait ended: hand the slot on
+                self._release(priority, 0.0, record=False)
+            else:
+                self._remove(priority, key, future)
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject("timeout", priority)
+            raise
+        self.admitted += 1
+        self.wait_time[priority].observe(time.monotonic() - queued_at)
+
+    def _reject(self, reason: str, priority: int):
+        self.rejected[reason] += 1
+        raise SchedulerRejected(
+            f"{PRIORITY_NAMES[priority]} upstream call rejected ({reason}): "
+            f"{self.running} running, {self.waiting} waiting"
+        )
+
+    def _remove(self, priority: int, key: str, future: asyncio.Future):
+        queue = self._queues[priority]
+        waiters = queue.get(key)
+        if waiters is None or future not in waiters:
+            return
+        waiters.remove(future)
+        self._waiting[priority] -= 1
+        if not waiters:
+            del queue[key]
+
+    def _release(self, priority: int, held: float, record: bool = True):
+        self._running[priority] -= 1
+        if record:
+            self._call_time = held if self._call_time is None else 0.9 * self._call_time + 0.1 * held
+        self._dispatch()
+
+    def _dispatch(self):
+        """Start waiters while slots are free, priority first, round robin by key"""
+        while True:
+            priority = next(
+                (p for p in (INTERACTIVE, BACKGROUND) if self._waiting[p] and self._can_start(p)),
+                None
+            )
+            if priority is None:
+                return
+            queue = self._queues[priority]
+            key, waiters = next(iter(queue.items()))
+            future = waiters.popleft()
+            self._waiting[priority] -= 1
+            if waiters:
+                queue.move_to_end(key)
+            else:
+                del queue[key]
+            if future.done():
+                continue
+            self._running[priority] += 1
+            future.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "queue_size": self.queue_size,
+            "queue_timeout": self.queue_timeout,
+            "running": {PRIORITY_NAMES[p]: count for p, count in self._running.items()},
+            "waiting": {PRIORITY_NAMES[p]: count for p, count in self._waiting.items()},
+            "average_call_seconds": self._call_time,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "queue_depth": self.queue_depth.snapshot(),
+            "wait_seconds": {PRIORITY_NAMES[p]: histogram.snapshot() for p, histogram in self.wait_time.items()}
+        }
@@ -0,0 +1,95 @@
+import time
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+
+class SemanticCache:
+    """Nearest-neighbour cache of answers keyed by question embeddings
+
+    Question vectors live in one contiguous float32 matrix so a lookup is a
+    single matrix-vector product. Rows are partitioned by context and history
+    fingerprint, and the least recently used row is replaced when full.
+    """
+
+    def __init__(self, dim: int, capacity: int = 10000, threshold: float = 0.9,
+                 context_thresholds: Optional[Dict[str, float]] = None):
+        self.dim = dim
+        self.capacity = capacity
+        self.threshold = threshold
+        self.context_thresholds = dict(context_thresholds or {})
+
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._partitions = np.zeros(capacity, dtype=np.int64)
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._values: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def partition_key(context: str, history_fingerprint: str) -> int:
+        """Fold context and history fingerprint into one int64 partition id"""
+        return hash((context or "", history_fingerprint)) & 0x7FFFFFFFFFFFFFFF
+
+    def threshold_for(self, context: str) -> float:
+        return self.context_thresholds.get(context, self.threshold)
+
+    def lookup(self, vector: np.ndarray, context: str, history_fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Get the stored answer of the most similar cached question"""
+        if self._size == 0:
+            self.misses += 1
+            return None
+
+        partition = self.partition_key(context, history_fingerprint)
+        scores = self._vectors[:self._size] @ vector
+        scores[self._partitions[:self._size] != partition] = -1.0
+
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold_for(context):
+            self.misses += 1
+            return None
+
+        self._last_used[best] = time.monotonic()
+        self.hits += 1
+        return self._values[best]
+
+    def add(self, vector: np.ndarray, context: str, history_fingerprint: str, value: Dict[str, Any]):
+        """Store an answer, replacing the least recently used row when full"""
+        if self.capacity <= 0:
+            return
+
+        if self._size < self.capacity:
+            row = self._size
+            self._size += 1
+        else:
+            row = int(np.argmin(self._last_used))
+            self.evictions += 1
+
+        self._vectors[row] = vector
+        self._partitions[row] = self.partition_key(context, history_fingerprint)
+        self._last_used[row] = time.monotonic()
+        self._values[row] = value
+
+    def clear(self):
+        """Drop every cached answer"""
+        self._values = [None] * self.capacity
+        self._last_used.fill(0.0)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": self._size,
+            "capacity": self.capacity,
+            "threshold": self.threshold,
+            "context_thresholds": self.context_thresholds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,350 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .conversation_store import ConversationStore, _isoformat
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    context TEXT,
+    user_id TEXT,
+    archived INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_activity REAL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    summary TEXT,
+    summarized_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    conversation_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages (conversation_id, id);
+CREATE INDEX IF NOT EXISTS idx_conversations_user ON conversations (user_id, last_activity);
+CREATE INDEX IF NOT EXISTS idx_conversations_activity ON conversations (last_activity);
+"""
+
+CONVERSATION_COLUMNS = ("id", "title", "context", "user_id", "archived", "created_at", "last_activity", "message_count")
+UPDATABLE_COLUMNS = {"title", "archived"}
+# Added after the first release; older databases get them on open
+SUMMARY_COLUMNS = {"summary": "TEXT", "summarized_count": "INTEGER NOT NULL DEFAULT 0"}
+
+def sqlite_path(database_url: str) -> str:
+    """Get the file path from a sqlite:/// URL"""
+    prefix = "sqlite:///"
+    if not database_url.startswith(prefix):
+        raise ValueError(f"Unsupported database URL for SQLite store: {database_url}")
+    return database_url[len(prefix):]
+
+class SQLiteConversationStore:
+    """Persistent conversation store with write-behind batching
+
+    Requests only touch the in-memory hot cache. Writes are queued and a
+    background task flushes them to SQLite (WAL mode) in batched transactions
+    on a dedicated thread. Conversations missing from the cache are loaded
+    from disk on first read.
+
+    Operations stay in the queue until they are written, and every write
+    goes through flush() under one lock, so batches reach the database in
+    the order they were queued and a flush() returns only once everything
+    queued before it, including a batch already being written, is on disk.
+    """
+
+    def __init__(self, path: str, cache: ConversationStore, batch_size: int = 500,
+                 flush_interval: float = 0.05):
+        self.path = path
+        self.cache = cache
+        self.history_size = cache.history_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-store")
+        self._connection: Optional[sqlite3.Connection] = None
+        self._queue: deque = deque()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._flush_task = None
+        self._pending = Counter()
+        # One disk load per uncached id; a second would replace the cached
+        # conversation and lose appends made in between
+        self._loads = SingleFlight()
+        self.batches_flushed = 0
+        self.operations_written = 0
+        self.flush_errors = 0
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        existing = {row["name"] for row in connection.execute("PRAGMA table_info(conversations)")}
+        for name, definition in SUMMARY_COLUMNS.items():
+            if name not in existing:
+                connection.execute(f"ALTER TABLE conversations ADD COLUMN {name} {definition}")
+        connection.commit()
+        self._connection = connection
+
+    async def start(self):
+        await self._run(self._connect)
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        await self.cache.start()
+        logger.info(f"SQLite conversation store opened at {self.path}")
+
+    async def close(self):
+        """Flush pending writes and close the database"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        # Waits for a batch the flusher was writing, then writes the rest
+        await self.flush()
+        await self.cache.close()
+        if self._connection is not None:
+            await self._run(self._connection.close)
+            self._connection = None
+        self._executor.shutdown(wait=True)
+
+    def _enqueue(self, conversation_id: str, operation: Tuple):
+        self._pending[conversation_id] += 1
+        self._queue.append(operation)
+        self._wakeup.set()
+
+    async def _flush_loop(self):
+        while True:
+            await self._wakeup.wait()
+            # Let a burst accumulate so it lands in one transaction
+            await asyncio.sleep(self.flush_interval)
+            self._wakeup.clear()
+            # close() cancels this loop; shielded so a batch being written still finishes
+            await asyncio.shield(self.flush())
+
+    async def flush(self):
+        """Write every queued operation now, after any batch already being written"""
+        async with self._flush_lock:
+            while self._queue:
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                await self._write(batch)
+
+    async def _write(self, batch: List[Tuple]):
+        try:
+            await self._run(self._write_batch, batch)
+            self.batches_flushed += 1
+            self.operations_written += len(batch)
+        except Exception as e:
+            self.flush_errors += 1
+            logger.error(f"Conversation write-behind error ({len(batch)} operations): {str(e)}")
+        finally:
+            for operation in batch:
+                conversation_id = operation[1]
+                self._pending[conversation_id] -= 1
+                if self._pending[conversation_id] <= 0:
+                    del self._pending[conversation_id]
+
+    def _write_batch(self, batch: List[Tuple]):
+        connection = self._connection
+        with connection:
+            for operation in batch:
+                kind = operation[0]
+                if kind == "create":
+                    _, conversation_id, row = operation
+                    connection.execute(
+                        "INSERT OR IGNORE INTO conversations (id, title, context, user_id, created_at) VALUES (?, ?, ?, ?, ?)",
+                        (conversation_id, row["title"], row["context"], row["user_id"], row["created_at"])
+                    )
+                elif kind == "append":
+                    _, conversation_id, messages, context, user_id, now = operation
+                    connection.execute(
+                        "INSERT INTO conversations (id, context, user_id, created_at, last_activity, message_count) "
+                        "VALUES (?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT(id) DO UPDATE SET last_activity = excluded.last_activity, "
+                        "message_count = message_count + excluded.message_count",
+                        (conversation_id, context, user_id, now, now, len(messages))
+                    )
+                    connection.executemany(
+                        "INSERT INTO messages (conversation_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                        [(conversation_id, m["role"], m["content"], m.get("timestamp")) for m in messages]
+                    )
+                elif kind == "update":
+                    _, conversation_id, fields = operation
+                    assignments = ", ".join(f"{name} = ?" for name in fields)
+                    connection.execute(
+                        f"UPDATE conversations SET {assignments} WHERE id = ?",
+                        (*fields.values(), conversation_id)
+                    )
+                elif kind == "summary":
+                    _, conversation_id, summary, summarized_count = operation
+                    connection.execute(
+                        "UPDATE conversations SET summary = ?, summarized_count = ? WHERE id = ?",
+                        (summary, summarized_count, conversation_id)
+                    )
+                elif kind == "delete":
+                    _, conversation_id = operation
+                    connection.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+                    connection.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+
+    def _load_conversation(self, conversation_id: str) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        row = self._connection.execute(
+            f"SELECT {', '.join((*CONVERSATION_COLUMNS, *SUMMARY_COLUMNS))} FROM conversations WHERE id = ?",
+            (conversation_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        messages = self._connection.execute(
+            "SELECT role, content, timestamp FROM messages WHERE conversation_id = ? ORDER BY id DESC LIMIT ?",
+            (conversation_id, self.history_size)
+        ).fetchall()
+        return dict(row), [dict(message) for message in reversed(messages)]
+
+    async def _ensure_cached(self, conversation_id: str) -> bool:
+        """Load a conversation into the hot cache, True when it exists"""
+        if self.cache.contains(conversation_id):
+            return True
+        return await self._loads.do(conversation_id, lambda: self._hydrate(conversation_id))
+
+    async def _hydrate(self, conversation_id: str) -> bool:
+        if conversation_id in self._pending:
+            await self.flush()
+        loaded = await self._run(self._load_conversation, conversation_id)
+        if self.cache.contains(conversation_id):
+            # Created while the load ran; the cached copy is newer
+            return True
+        if loaded is None:
+            return False
+        self.cache.hydrate(*loaded)
+        return True
+
+    async def create(self, conversation_id: str, title: str = None, context: str = None,
+                     user_id: str = None) -> Dict[str, Any]:
+        conversation = await self.cache.create(conversation_id, title=title, context=context, user_id=user_id)
+        self._enqueue(conversation_id, ("create", conversation_id, {
+            "title": title, "context": context, "user_id": user_id, "created_at": time.time()
+        }))
+        return conversation
+
+    async def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        if await self._ensure_cached(conversation_id):
+            return await self.cache.get(conversation_id)
+        return None
+
+    async def recent_messages(self, conversation_id: str, count: int) -> List[Dict[str, Any]]:
+        await self._ensure_cached(conversation_id)
+        return await self.cache.recent_messages(conversation_id, count)
+
+    async def history(self, conversation_id: str) -> Dict[str, Any]:
+        await self._ensure_cached(conversation_id)
+        return await self.cache.history(conversation_id)
+
+    async def set_summary(self, conversation_id: str, summary: str, summarized_count: int) -> bool:
+        if not await self._ensure_cached(conversation_id):
+            return False
+        if not await self.cache.set_summary(conversation_id, summary, summarized_count):
+            return False
+        self._enqueue(conversation_id, ("summary", conversation_id, summary, summarized_count))
+        return True
+
+    async def get_messages(self, conversation_id: str, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        """Get messages; older pages than the hot window come from disk"""
+        await self._ensure_cached(conversation_id)
+        conversation = await self.cache.get(conversation_id)
+        if conversation is None:
+            return []
+        if conversation["message_count"] <= self.history_size:
+            return await self.cache.get_messages(conversation_id, limit=limit, offset=offset)
+
+        await self.flush()
+        rows = await self._run(lambda: self._connection.execute(
+            "SELECT role, content, timestamp FROM messages WHERE conversation_id = ? ORDER BY id LIMIT ? OFFSET ?",
+            (conversation_id, limit, offset)
+        ).fetchall())
+        return [dict(row) for row in rows]
+
+    async def append(self, conversation_id: str, messages: Iterable[Dict[str, Any]],
+                     context: str = None, user_id: str = None):
+        messages = list(messages)
+        await self._ensure_cached(conversation_id)
+        await self.cache.append(conversation_id, messages, context=context, user_id=user_id)
+        self._enqueue(conversation_id, ("append", conversation_id, messages, context, user_id, time.time()))
+
+    async def list(self, user_id: str = None, context: str = None, limit: int = 20,
+                   offset: int = 0) -> List[Dict[str, Any]]:
+        await self.flush()
+        clauses, params = [], []
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if context is not None:
+            clauses.append("context = ?")
+            params.append(context)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = (
+            f"SELECT {', '.join(CONVERSATION_COLUMNS)} FROM conversations {where} "
+            "ORDER BY COALESCE(last_activity, created_at) DESC LIMIT ? OFFSET ?"
+        )
+        rows = await self._run(lambda: self._connection.execute(query, (*params, limit, offset)).fetchall())
+
+        return [self._row_to_dict(dict(row)) for row in rows]
+
+    @staticmethod
+    def _row_to_dict(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            **row,
+            "archived": bool(row["archived"]),
+            "created_at": _isoformat(row["created_at"]),
+            "last_activity": _isoformat(row["last_activity"])
+        }
+
+    async def update(self, conversation_id: str, **fields: Any) -> bool:
+        fields = {name: value for name, value in fields.items() if name in UPDATABLE_COLUMNS}
+        if not await self._ensure_cached(conversation_id):
+            return False
+        await self.cache.update(conversation_id, **fields)
+        self._enqueue(conversation_id, ("update", conversation_id, fields))
+        return True
+
+    async def delete(self, conversation_id: str) -> bool:
+        exists = await self._ensure_cached(conversation_id)
+        await self.cache.delete(conversation_id)
+        if exists:
+            self._enqueue(conversation_id, ("delete", conversation_id))
+        return exists
+
+    async def ping(self) -> Dict[str, Any]:
+        """Round trip through the writer thread, so a stuck flush shows up"""
+        await self._run(lambda: self._connection.execute("SELECT 1").fetchone())
+        return {"queued_operations": len(self._queue)}
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.cache.stats(),
+            "backend": "sqlite",
+            "path": self.path,
+            "queued_operations": len(self._queue),
+            "batches_flushed": self.batches_flushed,
+            "operations_written": self.operations_written,
+            "flush_errors": self.flush_errors
+        }
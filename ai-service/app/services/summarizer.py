@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import math
+import re
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .prompt_builder import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+# Heads the summary message sent in place of the folded turns
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a chat between a visitor and a portfolio assistant. "
+    "Merge the previous summary with the new turns into one short factual summary. Keep what "
+    "the visitor asked about, wants or said about themselves, and any commitments made. "
+    "Drop greetings and repetition. Answer with the summary only."
+)
+
+SENTENCE_PATTERN = re.compile(r"[^.!?\n]+[.!?]*")
+WORD_PATTERN = re.compile(r"\w+")
+SPEAKERS = {"user": "User", "assistant": "Assistant"}
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by can could did do does for from had has have how i if in into is it "
+    "its me my of on or our so that the their them there these they this to was we were what when "
+    "where which who why will with would you your yes no not just about also any some more very".split()
+)
+
+# (conversation_id, previous summary, turns to fold) -> merged summary
+Summarize = Callable[[str, Optional[str], List[Dict[str, Any]]], Awaitable[str]]
+
+def transcript(messages: List[Dict[str, Any]]) -> str:
+    return "\n".join(f"{SPEAKERS.get(m['role'], m['role'])}: {m['content']}" for m in messages)
+
+def summary_request(previous: Optional[str], messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Chat messages asking the upstream model for the merged summary"""
+    content = f"Previous summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript(messages)}"
+    return [
+        {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+        {"role": "user", "content": content}
+    ]
+
+def extractive_summary(previous: Optional[str], messages: List[Dict[str, Any]],
+                       counter: TokenCounter, max_tokens: int) -> str:
+    """Keep the most informative sentences of the previous summary and new turns
+
+    Sentences are scored by how often their content words occur across all
+    candidates, normalised for length, with visitor sentences weighted up
+    since they carry the topics. The best fitting max_tokens are kept in
+    their original order.
+    """
+    candidates = list((previous or "").splitlines())
+    for message in messages:
+        speaker = SPEAKERS.get(message["role"], message["role"])
+        candidates += [f"{speaker}: {s.strip()}" for s in SENTENCE_PATTERN.findall(message["content"]) if s.strip()]
+    # Repeated answers would crowd out everything else, keep the latest copy
+    latest = {candidate.lower(): index for index, candidate in enumerate(candidates)}
+    candidates = [candidate for index, candidate in enumerate(candidates) if latest[candidate.lower()] == index]
+
+    words = [
+        [w for w in WORD_PATTERN.findall(candidate.lower()) if w not in STOPWORDS and w not in ("user", "assistant")]
+        for candidate in candidates
+    ]
+    frequency = Counter(w for sentence in words for w in set(sentence))
+    scores = []
+    for index, (candidate, sentence) in enumerate(zip(candidates, words)):
+        score = sum(frequency[w] for w in set(sentence)) / math.sqrt(len(sentence)) if sentence else 0.0
+        if candidate.startswith("User:"):
+            score *= 2.0
+        scores.append((score, index))
+
+    chosen, used = [], 0
+    for score, index in sorted(scores, reverse=True):
+        cost = counter.count(candidates[index]) + 1
+        if score > 0 and used + cost <= max_tokens:
+            chosen.append(index)
+            used += cost
+    return "\n".join(candidates[index] for index in sorted(chosen))
+
+class ConversationSummarizer:
+    """Folds the older turns of long conversations into a rolling summary
+
+    Once more than trigger messages are stored past the summary, all but the
+    newest keep are merged into it, by the upstream model when one is given
+    and extractively otherwise. Requests only schedule a conversation id; a
+    single background task does the work, so chat latency is unaffected and
+    a full queue just defers compaction to the conversation's next turn.
+    """
+
+    def __init__(self, store, counter: TokenCounter, trigger: int = 12, keep: int = 4,
+                 max_tokens: int = 200, upstream: Optional[Summarize] = None, queue_size: int = 1000):
+        self.store = store
+        self.counter = counter
+        # Fold before the store's ring buffer lets unsummarized messages fall off
+        self.trigger = min(trigger, store.history_size - 2)
+        # Whole exchanges, so the raw window opens with a user message
+        self.keep = min(keep - keep % 2, self.trigger)
+        self.max_tokens = max_tokens
+        self.upstream = upstream
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._queued = set()
+        self._task = None
+        self.compactions = 0
+        self.dropped = 0
+        self.upstream_errors = 0
+        self.errors = 0
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop compacting; skipped conversations are folded on their next turn"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(self, conversation_id: str):
+        """Queue a conversation for compaction without waiting"""
+        if conversation_id in self._queued:
+            return
+        try:
+            self._queue.put_nowait(conversation_id)
+            self._queued.add(conversation_id)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _run(self):
+        while True:
+            conversation_id = await self._queue.get()
+            self._queued.discard(conversation_id)
+            try:
+                await self.compact(conversation_id)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Conversation summary error for {conversation_id}: {str(e)}")
+
+    async def summarize(self, conversation_id: str, previous: Optional[str], messages: List[Dict[str, Any]]) -> str:
+        if self.upstream is not None:
+            try:
+                summary = await self.upstream(conversation_id, previous, messages)
+                if summary:
+                    return summary.strip()
+            except Exception as e:
+                self.upstream_errors += 1
+                logger.warning(f"Upstream summary failed, summarizing locally: {str(e)}")
+        return extractive_summary(previous, messages, self.counter, self.max_tokens)
+
+    async def compact(self, conversation_id: str) -> bool:
+        """Fold the conversation's older turns when it is past the trigger"""
+        state = await self.store.history(conversation_id)
+        messages = state["messages"]
+        if len(messages) <= self.trigger:
+            return False
+
+        folded = messages[:len(messages) - self.keep]
+        summary = await self.summarize(conversation_id, state["summary"], folded)
+        summarized_count = state["message_count"] - self.keep
+        if not await self.store.set_summary(conversation_id, summary, summarized_count):
+            return False
+        self.compactions += 1
+        logger.info(f"Folded {len(folded)} messages of {conversation_id} into its summary")
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "trigger": self.trigger,
+            "keep": self.keep,
+            "queued": self._queue.qsize(),
+            "compactions": self.compactions,
+            "dropped": self.dropped,
+            "upstream_errors": self.upstream_errors,
+            "errors": self.errors
+        }
@@ -0,0 +1,71 @@
+"""Micro-benchmark of the fallback intent matcher
+
+    python -m benchmarks.intent_matcher [--rounds N]
+
+Compares IntentMatcher with the substring chain it replaced, on accuracy
+over the labelled utterances in tests/data/intent_utterances.json and on
+time per message for short questions and a long message.
+"""
+import argparse
+import json
+import os
+import time
+from typing import Callable, List, Optional
+
+from app.core.config import settings
+from app.services.intents import IntentMatcher
+
+UTTERANCES_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "tests", "data", "intent_utterances.json")
+
+LONG_MESSAGE = "I have been looking through the site and was wondering, given everything on this page, " * 5 + "what are your skills?"
+
+# The keyword chain of _get_fallback_response before the intent matcher
+LEGACY_CHAIN = (
+    ("skills", ("skill", "technology", "programming")),
+    ("projects", ("project", "work", "portfolio")),
+    ("experience", ("experience", "background", "career")),
+    ("services", ("service", "hire", "consultation")),
+    ("education", ("education", "certification", "study")),
+    ("greeting", ("hello", "hi", "hey", "greetings")),
+    ("thanks", ("thank", "thanks"))
+)
+
+def legacy_match(message: str) -> Optional[str]:
+    message_lower = message.lower()
+    for intent, words in LEGACY_CHAIN:
+        if any(word in message_lower for word in words):
+            return intent
+    return None
+
+def time_per_message(match: Callable[[str], Optional[str]], messages: List[str], rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            match(message)
+    return (time.perf_counter() - started) / (rounds * len(messages))
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.intent_matcher")
+    parser.add_argument("--rounds", type=int, default=100)
+    args = parser.parse_args()
+
+    with open(UTTERANCES_FILE, "r", encoding="utf-8") as f:
+        utterances = json.load(f)
+    matcher = IntentMatcher.from_file(settings.INTENTS_FILE)
+    candidates = (("keyword chain", legacy_match), ("intent matcher", matcher.match))
+
+    for name, match in candidates:
+        correct = sum(match(item["text"]) == item["intent"] for item in utterances)
+        print(f"accuracy  {name:15} {correct}/{len(utterances)} ({correct / len(utterances):.0%})")
+
+    workloads = (
+        ("short", [item["text"] for item in utterances]),
+        (f"long ({len(LONG_MESSAGE)} chars)", [LONG_MESSAGE])
+    )
+    for label, messages in workloads:
+        for name, match in candidates:
+            seconds = time_per_message(match, messages, args.rounds * (len(utterances) // len(messages)))
+            print(f"latency   {name:15} {label:18} {seconds * 1e6:.2f} us/message")
+
+if __name__ == "__main__":
+    main()
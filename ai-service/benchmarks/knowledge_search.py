@@ -0,0 +1,96 @@
+"""Micro-benchmark of knowledge search
+
+    python -m benchmarks.knowledge_search [--copies N] [--rounds N]
+
+Scales the knowledge file up to a synthetic base (copies of every list
+entry, each with a unique name and a few filler words). It then compares
+the substring scan that search_knowledge used to do with the BM25 index,
+on a common term, with a category facet, and on a rare term. The
+one-off index build is timed too.
+"""
+import argparse
+import copy
+import json
+import random
+import time
+from typing import Any, Dict, List
+
+from app.core.config import settings
+from app.services.knowledge_search import KnowledgeSearchIndex
+
+FILLER = (
+    "platform pipeline latency cluster dashboard migration analytics billing inventory "
+    "forecasting onboarding search streaming gateway scheduler reporting monitoring"
+).split()
+
+def synthetic_knowledge_base(copies: int, seed: int = 7) -> Dict[str, Any]:
+    with open(settings.KNOWLEDGE_FILE, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    rng = random.Random(seed)
+    scaled = {"personal": base["personal"]}
+    for section, items in base.items():
+        if not isinstance(items, list):
+            continue
+        scaled[section] = []
+        for n in range(copies):
+            for item in items:
+                item = copy.deepcopy(item)
+                suffix = f" {n} " + " ".join(rng.sample(FILLER, 3))
+                if isinstance(item, str):
+                    item += suffix
+                else:
+                    for field in ("name", "title", "degree", "description"):
+                        if field in item:
+                            item[field] += suffix
+                            break
+                scaled[section].append(item)
+    return scaled
+
+def legacy_search(knowledge_data: Dict[str, Any], query: str) -> List[Dict[str, Any]]:
+    """The substring scan of search_knowledge before the BM25 index"""
+    results = []
+    query_lower = query.lower()
+    personal = knowledge_data["personal"]
+    if any(query_lower in str(v).lower() for v in personal.values()):
+        results.append({"type": "personal", "title": "Personal Information", "content": personal, "relevance": 0.9})
+    for skill in knowledge_data["skills"]:
+        if query_lower in skill["name"].lower():
+            results.append({"type": "skill", "title": f"Skill: {skill['name']}", "content": skill, "relevance": 0.8})
+    for project in knowledge_data["projects"]:
+        if query_lower in project["name"].lower() or query_lower in project["description"].lower():
+            results.append({"type": "project", "title": project["name"], "content": project, "relevance": 0.7})
+    results.sort(key=lambda x: x["relevance"], reverse=True)
+    return results[:10]
+
+def per_query(fn, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.knowledge_search")
+    parser.add_argument("--copies", type=int, default=180)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    knowledge_base = synthetic_knowledge_base(args.copies)
+    started = time.perf_counter()
+    index = KnowledgeSearchIndex.from_knowledge_base(knowledge_base)
+    build = time.perf_counter() - started
+
+    common = "python"
+    _, matches = index.search(common)
+    print(f"{len(index.documents)} documents, {matches} matching '{common}'")
+    workloads = (
+        ("old substring scan", lambda: legacy_search(knowledge_base, common)),
+        ("BM25, common term", lambda: index.search(common)),
+        ("BM25, with category facet", lambda: index.search(common, category="projects")),
+        ("BM25, rare term (one copy)", lambda: index.search("97")),
+    )
+    for label, fn in workloads:
+        print(f"{label:32} {per_query(fn, args.rounds) * 1e3:.3f} ms/query")
+    print(f"{'one-off index build':32} {build * 1e3:.0f} ms")
+
+if __name__ == "__main__":
+    main()
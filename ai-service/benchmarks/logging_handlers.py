@@ -0,0 +1,131 @@
+"""Micro-benchmark of direct versus queued log handlers
+
+    python -m benchmarks.logging_handlers [--records N] [--rounds N]
+
+Writes to a temporary file through three setups:
+- direct: the file handler on the caller's thread, as before the queue
+  listener
+- queued: NonBlockingQueueHandler feeding a QueueListener thread
+- off: logging disabled
+
+For each it reports the caller's cost of one logger.info call, as wall
+time, thread CPU and p50/p99 latency, and the throughput until the file
+holds every line. It also times the local-answer chat path in-process,
+with the route's two INFO lines, under each setup.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import queue
+import tempfile
+import time
+from logging.handlers import QueueListener, RotatingFileHandler
+
+from app.core.logger import TEXT_FORMAT, NonBlockingQueueHandler, RequestContextFilter
+from app.services.ai_service import AIService
+
+class Setup:
+    """Route the root logger through one handler arrangement"""
+
+    def __init__(self, mode: str, path: str):
+        self.mode = mode
+        self.target = RotatingFileHandler(path, maxBytes=10 * 1024 * 1024, backupCount=5, delay=True)
+        self.target.setFormatter(logging.Formatter(TEXT_FORMAT))
+        self.listener = None
+        if mode == "queued":
+            self.handler = NonBlockingQueueHandler(queue.Queue(100_000))
+            self.handler.addFilter(RequestContextFilter())
+            self.listener = QueueListener(self.handler.queue, self.target)
+        else:
+            self.handler = self.target
+            self.handler.addFilter(RequestContextFilter())
+
+    def __enter__(self):
+        root = logging.getLogger()
+        self.saved = root.handlers[:], root.level
+        root.handlers[:] = [self.handler]
+        root.setLevel(logging.INFO)
+        logging.disable(logging.CRITICAL if self.mode == "off" else logging.NOTSET)
+        if self.listener is not None:
+            self.listener.start()
+        return self
+
+    def drain(self):
+        """Wait until every queued record is written"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener.start()
+        self.target.flush()
+
+    def __exit__(self, *exc):
+        if self.listener is not None:
+            self.listener.stop()
+        self.target.close()
+        root = logging.getLogger()
+        root.handlers[:], level = self.saved
+        root.setLevel(level)
+        logging.disable(logging.NOTSET)
+
+def time_calls(records: int):
+    logger = logging.getLogger("app.services.ai_service")
+    latencies = []
+    cpu_started = time.thread_time()
+    started = time.perf_counter()
+    for n in range(records):
+        call_started = time.perf_counter()
+        logger.info("AI response for %s: %d tokens", "conv_1", n)
+        latencies.append(time.perf_counter() - call_started)
+    wall = time.perf_counter() - started
+    cpu = time.thread_time() - cpu_started
+    latencies.sort()
+    return wall, cpu, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+async def time_chat(service: AIService, rounds: int, prefix: str) -> float:
+    # The two lines the /api/chat route logs around each answer
+    logger = logging.getLogger("app.api.chat")
+    started = time.perf_counter()
+    for n in range(rounds):
+        request_started = time.perf_counter()
+        logger.info("Processing chat message for conversation: %s", f"{prefix}_{n}")
+        await service.get_ai_response("What are your skills?", f"{prefix}_{n}", "portfolio")
+        logger.info("Chat response generated in %.2fs", time.perf_counter() - request_started)
+    return (time.perf_counter() - started) / rounds
+
+async def run(records: int, rounds: int, directory: str):
+    modes = ("direct", "queued", "off")
+    for mode in modes:
+        with Setup(mode, os.path.join(directory, f"{mode}.log")) as setup:
+            started = time.perf_counter()
+            wall, cpu, p50, p99 = time_calls(records)
+            setup.drain()
+            written = time.perf_counter() - started
+            throughput = f"{records / written:,.0f} lines/s written" if mode != "off" else "nothing written"
+            print(f"logger.info, {mode:6}  caller {wall / records * 1e6:5.2f} us wall, "
+                  f"{cpu / records * 1e6:5.2f} us CPU, p50 {p50 * 1e6:5.2f} us, p99 {p99 * 1e6:6.2f} us; {throughput}")
+
+    service = AIService()
+    with Setup("off", os.path.join(directory, "startup.log")):
+        await service.initialize()
+    try:
+        best = {mode: float("inf") for mode in modes}
+        for run_number in range(3):
+            for mode in modes:
+                with Setup(mode, os.path.join(directory, f"chat_{mode}.log")):
+                    seconds = await time_chat(service, rounds, f"{mode}_{run_number}")
+                best[mode] = min(best[mode], seconds)
+        for mode, seconds in best.items():
+            print(f"chat, local answer, logging {mode:6}  {seconds * 1e6:.0f} us")
+    finally:
+        await service.cleanup()
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.logging_handlers")
+    parser.add_argument("--records", type=int, default=50_000)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(args.records, args.rounds, directory))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Micro-benchmark of the rate limiter
+
+    python -m benchmarks.rate_limiter [--keys N] [--rounds N]
+
+Times TokenBucketTable.acquire over many client keys, the middleware's
+cost on unlimited and limited routes (direct clients and requests from a
+trusted proxy carrying X-Forwarded-For and X-User-ID), and one sweeper
+tick. Everything runs in-process, with no network and no server.
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from app.api.rate_limit import RateLimitMiddleware
+from app.services.rate_limiter import TokenBucketTable
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+async def send(message):
+    pass
+
+def make_scope(app, path: str, client: str, headers=()):
+    return {
+        "type": "http",
+        "method": "POST",
+        "path": path,
+        "app": app,
+        "client": (client, 50000),
+        "headers": [(name.encode(), value.encode()) for name, value in headers]
+    }
+
+def time_acquire(keys: int, per_request: int) -> float:
+    # Capacity high enough that every call is allowed and does the full update
+    table = TokenBucketTable(10 ** 9, 3600, sweep_interval=0)
+    batches = [[f"key:{n}:{k}" for k in range(per_request)] for n in range(keys)]
+    for batch in batches:
+        table.acquire(batch)
+    started = time.perf_counter()
+    for batch in batches:
+        table.acquire(batch)
+    return (time.perf_counter() - started) / keys
+
+async def time_middleware(call, scopes) -> float:
+    started = time.perf_counter()
+    for scope in scopes:
+        await call(scope, receive, send)
+    return (time.perf_counter() - started) / len(scopes)
+
+async def run(keys: int, rounds: int):
+    print(f"acquire, 1 key/request    {keys} keys  {time_acquire(keys, 1) * 1e6:.2f} us")
+    print(f"acquire, 2 keys/request   {keys} keys  {time_acquire(keys, 2) * 1e6:.2f} us")
+
+    limiter = TokenBucketTable(10 ** 9, 3600, sweep_interval=0)
+    app = SimpleNamespace(state=SimpleNamespace(services=SimpleNamespace(rate_limiter=limiter)))
+    middleware = RateLimitMiddleware(ok_app, paths=["/api/chat"], trusted_proxies=["172.28.0.0/24"])
+    clients = [f"198.51.{n // 256 % 256}.{n % 256}" for n in range(rounds)]
+    workloads = (
+        ("unlimited route", [make_scope(app, "/api/health", client) for client in clients]),
+        ("limited, direct client", [make_scope(app, "/api/chat", client) for client in clients]),
+        ("limited, trusted proxy", [
+            make_scope(app, "/api/chat", "172.28.0.11", (
+                ("x-forwarded-for", f"{client}, 172.28.0.10"),
+                ("x-user-id", f"user_{n}")
+            ))
+            for n, client in enumerate(clients)
+        ])
+    )
+    for label, scopes in workloads:
+        baseline = await time_middleware(ok_app, scopes)
+        limited = await time_middleware(middleware, scopes)
+        print(f"middleware, {label:24} +{(limited - baseline) * 1e6:.2f} us/request")
+
+    table = TokenBucketTable(10, 3600, sweep_interval=0)
+    table.idle_after = 0  # Every bucket counts as idle, the worst case for one tick
+    for n in range(keys):
+        table.acquire((f"key:{n}",))
+    ticks = len(table._shards)
+    started = time.perf_counter()
+    for _ in range(ticks):
+        table.sweep_shard()
+    print(f"sweep tick                {keys} keys  {(time.perf_counter() - started) / ticks * 1e6:.0f} us")
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.rate_limiter")
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=50_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.keys, args.rounds))
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import uvicorn
 import os
 from dotenv import load_dotenv
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 # Load environment variables
@@ -17,12 +18,44 @@ from app.api.conversations import router as conversations_router
 from app.api.knowledge import router as knowledge_router
 from app.core.config import settings
 from app.core.logger import setup_logging
+from app.api.body_limit import BodySizeLimitMiddleware
+from app.api.rate_limit import RateLimitMiddleware
+from app.api.request_id import RequestIdMiddleware
+from app.api.dependencies import get_ai_service, get_health_monitor
 from app.services.ai_service import AIService
+from app.services.container import ServiceContainer
+from app.services.health import LIVENESS_BODY, HealthMonitor
 
 # Setup logging
 setup_logging()
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared services on startup and release them on shutdown"""
+    logger.info("🚀 Starting AI Assistant API...")
+    
+    # One service container per process, injected into every router
+    services = ServiceContainer()
+    
+    try:
+        await services.startup()
+    except Exception as e:
+        logger.error(f"❌ Startup error: {str(e)}")
+        raise
+    
+    app.state.services = services
+    
+    yield
+    
+    logger.info("🛑 Shutting down AI Assistant API...")
+    
+    try:
+        await services.shutdown()
+        logger.info("✅ Cleanup completed")
+    except Exception as e:
+        logger.error(f"❌ Shutdown error: {str(e)}")
+
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.TITLE,
@@ -30,6 +63,22 @@ app = FastAPI(
     version=settings.VERSION,
     docs_url="/docs" if settings.DEBUG else None,
     redoc_url="/redoc" if settings.DEBUG else None,
+    lifespan=lifespan,
+)
+
+# Refuse oversized uploads before Starlette spools the multipart body;
+# the limit leaves room for the part headers and boundaries
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={f"{settings.API_PREFIX}/knowledge/upload": settings.MAX_FILE_SIZE + settings.UPLOAD_FORM_OVERHEAD}
+)
+
+# Token-bucket rate limiting on the routes that call the upstream;
+# added before CORS so CORS headers are still set on 429 responses
+app.add_middleware(
+    RateLimitMiddleware,
+    paths=settings.RATE_LIMIT_PATHS,
+    trusted_proxies=settings.RATE_LIMIT_TRUSTED_PROXIES
 )
 
 # CORS middleware
@@ -47,44 +96,34 @@ app.add_middleware(
     allowed_hosts=["localhost", "127.0.0.1", "*.vercel.app"]
 )
 
-# Initialize AI service
-ai_service = AIService()
+# Outermost, so every log record of a request carries its id
+app.add_middleware(RequestIdMiddleware)
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize services on startup"""
-    logger.info("🚀 Starting AI Assistant API...")
-    
-    try:
-        # Initialize AI service
-        await ai_service.initialize()
-        logger.info("✅ AI Service initialized successfully")
-        
-        # Initialize vector database
-        await ai_service.initialize_knowledge_base()
-        logger.info("✅ Knowledge base initialized")
-        
-    except Exception as e:
-        logger.error(f"❌ Startup error: {str(e)}")
-        raise
+# Liveness probe: the process answers, no dependency is touched
+@app.get("/livez")
+async def liveness():
+    return Response(content=LIVENESS_BODY, media_type="application/json")
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup on shutdown"""
-    logger.info("🛑 Shutting down AI Assistant API...")
-    
-    try:
-        await ai_service.cleanup()
-        logger.info("✅ Cleanup completed")
-    except Exception as e:
-        logger.error(f"❌ Shutdown error: {str(e)}")
+# Readiness probe: dependency status from the background health monitor.
+# Reads app state directly, dependency injection would cost more than the probe.
+@app.get("/readyz")
+async def readiness(request: Request):
+    status_code, body = request.app.state.services.health.readiness()
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+# Prometheus scrape endpoint, read straight from app state like the probes
+@app.get("/metrics")
+async def metrics(request: Request):
+    registry = request.app.state.services.ai_service.metrics.registry
+    return Response(content=registry.render(), media_type=registry.content_type)
 
 # Health check endpoint
 @app.get("/health")
-async def health_check():
+async def health_check(ai_service: AIService = Depends(get_ai_service),
+                       health: HealthMonitor = Depends(get_health_monitor)):
     """Health check endpoint"""
     try:
-        # Check AI service health
+        # Service counters plus the last background dependency probe
         ai_health = await ai_service.health_check()
         
         return {
@@ -93,6 +132,7 @@ async def health_check():
             "version": settings.VERSION,
             "environment": settings.FASTAPI_ENV,
             "ai_service": ai_health,
+            "readiness": health.report(),
             "uptime": "running"
         }
     except Exception as e:
@@ -115,6 +155,9 @@ async def root():
         "version": settings.VERSION,
         "docs": "/docs",
         "health": "/health",
+        "liveness": "/livez",
+        "readiness": "/readyz",
+        "metrics": "/metrics",
         "endpoints": {
             "chat": "/api/chat",
             "conversations": "/api/conversations",
@@ -169,7 +212,7 @@ async def http_exception_handler(request, exc):
     )
 
 if __name__ == "__main__":
-    # Configuration for development
+    # Configuration for development; run `python -m app.server` in production
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
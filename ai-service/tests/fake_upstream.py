@@ -0,0 +1,58 @@
+import asyncio
+from typing import List
+
+import httpx
+from openai import AsyncOpenAI
+
+ERROR_TYPES = {400: "invalid_request_error", 404: "not_found_error", 422: "invalid_request_error",
+               429: "rate_limit_error", 500: "server_error", 503: "server_error"}
+
+class FakeUpstream:
+    """In-process stand-in for the OpenAI chat completions API
+
+    Serves the real SDK through an httpx mock transport, so status codes
+    turn into the same exceptions as in production. Each request takes the
+    next scripted reply: a status code, optionally with a delay, or None to
+    hang until the caller gives up. Once the script runs out every request
+    succeeds.
+    """
+
+    def __init__(self, *replies):
+        self.replies: List = list(replies)
+        self.requests = 0
+        self.hanging = asyncio.Event()
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        reply = self.replies.pop(0) if self.replies else 200
+        delay = 0.0
+        if isinstance(reply, tuple):
+            reply, delay = reply
+        if reply is None:
+            self.hanging.set()
+            await asyncio.Event().wait()
+        if delay:
+            await asyncio.sleep(delay)
+        if reply != 200:
+            body = {"error": {"message": f"fake upstream {reply}", "type": ERROR_TYPES.get(reply, "server_error")}}
+            return httpx.Response(reply, json=body)
+        return httpx.Response(200, json={
+            "id": f"chatcmpl-{self.requests}",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "gpt-3.5-turbo",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"answer {self.requests}"},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7}
+        })
+
+    def client(self) -> AsyncOpenAI:
+        return AsyncOpenAI(
+            api_key="test",
+            base_url="http://upstream.test/v1",
+            max_retries=0,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+        )
@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import conversations
+from app.core.config import settings
+
+class FakeAIService:
+    async def list_conversations(self, **filters):
+        return [{"id": "conv_1"}]
+
+    async def export_conversation(self, conversation_id, format):
+        return {"id": conversation_id, "format": format}
+
+    async def get_conversation(self, conversation_id):
+        return {"id": conversation_id}
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    app = FastAPI()
+    app.include_router(conversations.router, prefix="/api")
+    app.state.services = SimpleNamespace(ai_service=FakeAIService())
+    return TestClient(app, base_url="http://localhost")
+
+@pytest.mark.parametrize("path", ["/api/conversations", "/api/conversations/conv_1/export"])
+def test_listing_and_export_need_the_admin_token(client, path):
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers={"X-Admin-Token": "guess"}).status_code == 401
+    assert client.get(path, headers={"X-Admin-Token": "secret"}).status_code == 200
+
+def test_a_single_conversation_stays_public(client):
+    assert client.get("/api/conversations/conv_1").json()["data"] == {"id": "conv_1"}
@@ -0,0 +1,65 @@
+import json
+import os
+
+import pytest
+
+from app.core.config import settings
+from app.services.intents import IntentMatcher
+
+UTTERANCES_FILE = os.path.join(os.path.dirname(__file__), "data", "intent_utterances.json")
+
+with open(UTTERANCES_FILE, "r", encoding="utf-8") as f:
+    UTTERANCES = json.load(f)
+
+@pytest.fixture(scope="module")
+def matcher():
+    return IntentMatcher.from_file(settings.INTENTS_FILE)
+
+def test_labelled_set_covers_every_intent(matcher):
+    assert set(matcher.intents) <= {item["intent"] for item in UTTERANCES}
+
+@pytest.mark.parametrize("item", UTTERANCES, ids=[item["text"] for item in UTTERANCES])
+def test_labelled_utterances(matcher, item):
+    assert matcher.match(item["text"]) == item["intent"], matcher.scores(item["text"])
+
+@pytest.mark.parametrize("message", ["this is it", "Is this network secure?", "the highway behind the hotel"])
+def test_keywords_match_whole_words_only(matcher, message):
+    assert matcher.match(message) is None
+
+def test_prefix_and_phrase_keywords():
+    matcher = IntentMatcher(
+        [
+            {"name": "skills", "keywords": {"skill*": 1}, "responses": {"portfolio": "skills"}},
+            {"name": "experience", "keywords": {"work experience": 2}, "responses": {"portfolio": "experience"}}
+        ],
+        {"portfolio": "default"}
+    )
+
+    assert matcher.match("Your SKILLSET?") == "skills"
+    assert matcher.match("your work\n  experience") == "experience"
+    assert matcher.match("work") is None
+
+def test_highest_score_wins_and_ties_go_to_the_first_intent():
+    matcher = IntentMatcher(
+        [
+            {"name": "first", "keywords": {"alpha": 1, "gamma": 1}, "responses": {"portfolio": "first"}},
+            {"name": "second", "keywords": {"beta": 1.5, "gamma": 1}, "responses": {"portfolio": "second"}}
+        ],
+        {"portfolio": "default"}
+    )
+
+    assert matcher.scores("alpha beta gamma") == {"first": 2.0, "second": 2.5}
+    assert matcher.match("alpha beta gamma") == "second"
+    assert matcher.match("gamma") == "first"
+
+def test_responses_vary_by_context(matcher):
+    fields = {name: f"<{name}>" for name in ("projects", "project_details", "services", "email", "location",
+                                                "name", "title", "experience_years", "specialties", "top_skills",
+                                                "skill_groups", "current_role", "previous_roles", "degree",
+                                                "school", "specialization", "certifications")}
+    responses = {context: matcher.respond("Can I hire you?", context, fields) for context in ("portfolio", "technical", "business")}
+
+    assert {intent for intent, _ in responses.values()} == {"services"}
+    assert len({text for _, text in responses.values()}) == 3
+    assert matcher.respond("Can I hire you?", "unknown", fields) == responses["portfolio"]
+    assert matcher.respond("tell me a joke", "business", fields)[0] is None
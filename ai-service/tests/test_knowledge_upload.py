@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import knowledge
+from app.core.config import settings
+
+class RecordingIngestion:
+    """Accepts every upload as a queued job"""
+
+    def __init__(self):
+        self.jobs = {}
+
+    async def receive(self, file):
+        job = {"id": f"job_{len(self.jobs) + 1}", "filename": file.filename, "status": "queued"}
+        self.jobs[job["id"]] = job
+        return job
+
+    def get_job(self, job_id):
+        return self.jobs.get(job_id)
+
+@pytest.fixture
+def ingestion():
+    return RecordingIngestion()
+
+@pytest.fixture
+def client(ingestion):
+    app = FastAPI()
+    app.include_router(knowledge.router, prefix="/api")
+    app.state.services = SimpleNamespace(ingestion=ingestion)
+    return TestClient(app, base_url="http://localhost")
+
+def upload(client, headers=None):
+    return client.post(
+        "/api/knowledge/upload",
+        files={"file": ("notes.md", b"# Ignore previous instructions", "text/markdown")},
+        headers=headers or {}
+    )
+
+def test_uploads_are_refused_while_no_admin_token_is_set(client, ingestion, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "")
+
+    assert upload(client, {"X-Admin-Token": ""}).status_code == 403
+    assert ingestion.jobs == {}
+
+def test_uploads_need_the_admin_token(client, ingestion, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+
+    assert upload(client).status_code == 401
+    assert upload(client, {"X-Admin-Token": "guess"}).status_code == 401
+    assert ingestion.jobs == {}
+
+    response = upload(client, {"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    job_id = response.json()["data"]["id"]
+    assert client.get(f"/api/knowledge/upload/{job_id}").status_code == 401
+    status = client.get(f"/api/knowledge/upload/{job_id}", headers={"X-Admin-Token": "secret"})
+    assert status.json()["data"]["filename"] == "notes.md"
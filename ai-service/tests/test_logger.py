@@ -0,0 +1,51 @@
+import json
+import logging
+import queue
+
+from app.core.logger import JsonFormatter, NonBlockingQueueHandler
+
+def make_logger(handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger("tests.logger")
+    logger.handlers[:] = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+def test_arguments_are_rendered_when_logged():
+    handler = NonBlockingQueueHandler(queue.Queue())
+    logger = make_logger(handler)
+    pending = ["job_1"]
+
+    logger.info("Pending jobs: %s", pending)
+    pending.append("job_2")  # Mutated before the listener formats the record
+
+    record = handler.queue.get_nowait()
+    assert record.getMessage() == "Pending jobs: ['job_1']"
+    assert record.args is None
+    assert record.name == "tests.logger"
+
+def test_exceptions_reach_the_formatter_as_text():
+    handler = NonBlockingQueueHandler(queue.Queue())
+    logger = make_logger(handler)
+
+    try:
+        raise ValueError("bad chunk")
+    except ValueError:
+        logger.exception("Ingestion failed")
+
+    record = handler.queue.get_nowait()
+    assert record.exc_info is None
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Ingestion failed"
+    assert "ValueError: bad chunk" in entry["exception"]
+    assert "ValueError: bad chunk" in logging.Formatter().format(record)
+
+def test_records_are_dropped_when_the_queue_is_full():
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    logger = make_logger(handler)
+
+    for number in range(3):
+        logger.info("line %d", number)
+
+    assert handler.dropped == 2
+    assert handler.queue.get_nowait().getMessage() == "line 0"
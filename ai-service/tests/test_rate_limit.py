@@ -0,0 +1,111 @@
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+
+from app.api.rate_limit import RateLimitMiddleware
+from app.services.rate_limiter import RedisTokenBuckets, TokenBucketTable
+
+pytestmark = pytest.mark.anyio
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+def make_middleware(capacity=2, trusted_proxies=()):
+    limiter = TokenBucketTable(capacity, 3600, sweep_interval=0)
+    app = SimpleNamespace(state=SimpleNamespace(services=SimpleNamespace(rate_limiter=limiter)))
+    middleware = RateLimitMiddleware(ok_app, paths=["/api/chat"], trusted_proxies=trusted_proxies)
+    return middleware, app, limiter
+
+async def call(middleware, app, client, headers=None, method="POST"):
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": "/api/chat",
+        "app": app,
+        "client": (client, 50000),
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    }
+    statuses = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    await middleware(scope, receive, send)
+    return statuses[0]
+
+async def test_identity_headers_from_clients_do_not_reset_the_limit():
+    middleware, app, _ = make_middleware()
+
+    statuses = [
+        await call(middleware, app, "203.0.113.5", {"X-User-ID": f"user_{n}", "X-Forwarded-For": f"10.0.0.{n}"})
+        for n in range(3)
+    ]
+
+    assert statuses == [200, 200, 429]
+
+async def test_trusted_proxy_forwards_the_client_address():
+    middleware, app, limiter = make_middleware(trusted_proxies=["172.28.0.0/24"])
+
+    for _ in range(2):
+        assert await call(middleware, app, "172.28.0.11", {"X-Forwarded-For": "198.51.100.7"}) == 200
+    assert await call(middleware, app, "172.28.0.11", {"X-Forwarded-For": "198.51.100.7"}) == 429
+    assert await call(middleware, app, "172.28.0.11", {"X-Forwarded-For": "198.51.100.8"}) == 200
+    assert "ip:172.28.0.11" not in {key for shard in limiter._shards for key in shard}
+
+async def test_forged_forwarded_entries_are_ignored():
+    middleware, app, _ = make_middleware(trusted_proxies=["172.28.0.10", "172.28.0.11"])
+
+    statuses = [
+        await call(middleware, app, "::ffff:172.28.0.11", {"X-Forwarded-For": f"10.9.9.{n}, 198.51.100.7, 172.28.0.10"})
+        for n in range(3)
+    ]
+
+    assert statuses == [200, 200, 429]
+
+async def test_user_bucket_is_charged_in_addition_to_the_address():
+    middleware, app, _ = make_middleware(trusted_proxies=["172.28.0.11"])
+
+    # One user moving between addresses keeps spending the same user bucket
+    assert await call(middleware, app, "172.28.0.11", {"X-Forwarded-For": "198.51.100.1", "X-User-ID": "u"}) == 200
+    assert await call(middleware, app, "172.28.0.11", {"X-Forwarded-For": "198.51.100.2", "X-User-ID": "u"}) == 200
+    assert await call(middleware, app, "172.28.0.11", {"X-Forwarded-For": "198.51.100.3", "X-User-ID": "u"}) == 429
+    # A new user id does not refill an exhausted address
+    assert await call(middleware, app, "172.28.0.11", {"X-Forwarded-For": "198.51.100.1", "X-User-ID": "v"}) == 200
+    assert await call(middleware, app, "172.28.0.11", {"X-Forwarded-For": "198.51.100.1", "X-User-ID": "w"}) == 429
+
+async def test_a_request_refused_by_one_bucket_spends_none():
+    middleware, app, _ = make_middleware(trusted_proxies=["172.28.0.11"])
+    for n in range(2):
+        assert await call(middleware, app, "172.28.0.11", {"X-Forwarded-For": f"198.51.100.{n}", "X-User-ID": "u"}) == 200
+
+    # The user bucket is empty; the address it is refused from keeps its tokens
+    for _ in range(3):
+        assert await call(middleware, app, "172.28.0.11", {"X-Forwarded-For": "198.51.100.9", "X-User-ID": "u"}) == 429
+    for _ in range(2):
+        assert await call(middleware, app, "172.28.0.11", {"X-Forwarded-For": "198.51.100.9"}) == 200
+
+async def test_redis_buckets_are_checked_before_any_is_charged():
+    local = TokenBucketTable(2, 3600, sweep_interval=0)
+    limiter = RedisTokenBuckets(fakeredis.FakeAsyncRedis(decode_responses=True), "test", local)
+
+    assert await limiter.check("ip:a", "user:u") == 0
+    assert await limiter.check("ip:b", "user:u") == 0
+    assert await limiter.check("ip:c", "user:u") > 0
+    assert await limiter.check("ip:c") == 0
+    assert await limiter.check("ip:c") == 0
+    assert await limiter.check("ip:c") > 0
+    assert limiter.errors == 0
+
+async def test_other_methods_are_not_limited():
+    middleware, app, limiter = make_middleware(capacity=1)
+
+    statuses = [await call(middleware, app, "203.0.113.5", method="GET") for _ in range(3)]
+
+    assert statuses == [200, 200, 200]
+    assert len(limiter) == 0
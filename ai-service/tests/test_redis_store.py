@@ -0,0 +1,156 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from app.services.redis_store import RedisConversationStore, RedisResponseCache
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def server():
+    # One in-process Redis shared by every client of a test, like workers sharing a real one
+    return fakeredis.FakeServer()
+
+def make_client(server):
+    return fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+
+def make_store(server, **kwargs):
+    return RedisConversationStore(make_client(server), "test", **{"history_size": 4, **kwargs})
+
+def exchange(number):
+    return [
+        {"role": "user", "content": f"question {number}"},
+        {"role": "assistant", "content": f"answer {number}"}
+    ]
+
+async def test_workers_share_a_conversation(server):
+    worker_a, worker_b = make_store(server), make_store(server)
+
+    await worker_a.append("conv_1", exchange(1), context="portfolio", user_id="user_1")
+
+    messages = await worker_b.recent_messages("conv_1", 10)
+    assert [m["content"] for m in messages] == ["question 1", "answer 1"]
+    conversation = await worker_b.get("conv_1")
+    assert conversation["user_id"] == "user_1"
+    assert conversation["context"] == "portfolio"
+    assert conversation["message_count"] == 2
+
+async def test_history_is_trimmed_to_the_window(server):
+    store = make_store(server)
+
+    for number in range(3):
+        await store.append("conv_1", exchange(number))
+
+    messages = await store.recent_messages("conv_1", 10)
+    assert [m["content"] for m in messages] == ["question 1", "answer 1", "question 2", "answer 2"]
+    assert (await store.get("conv_1"))["message_count"] == 6
+    assert len(await store.get_messages("conv_1")) == 4
+
+async def test_append_updates_the_local_cache(server):
+    store = make_store(server)
+    await store.append("conv_1", exchange(1))
+    await store.recent_messages("conv_1", 10)  # Now held locally
+
+    await store.append("conv_1", exchange(2))
+
+    state = await store.history("conv_1")
+    assert state["message_count"] == 4
+    assert [m["content"] for m in state["messages"]][-1] == "answer 2"
+
+async def test_local_cache_expires_so_other_workers_writes_show_up(server):
+    worker_a, worker_b = make_store(server), make_store(server, local_ttl=0.05)
+    await worker_a.append("conv_1", exchange(1))
+    assert len(await worker_b.recent_messages("conv_1", 10)) == 2
+
+    await worker_a.append("conv_1", exchange(2))
+    await asyncio.sleep(0.1)
+
+    assert len(await worker_b.recent_messages("conv_1", 10)) == 4
+
+async def test_list_by_user_and_context(server):
+    store = make_store(server)
+    await store.append("conv_1", exchange(1), context="portfolio", user_id="user_1")
+    await store.append("conv_2", exchange(2), context="technical", user_id="user_1")
+    await store.append("conv_3", exchange(3), context="portfolio", user_id="user_2")
+
+    assert [c["id"] for c in await store.list()] == ["conv_3", "conv_2", "conv_1"]
+    assert [c["id"] for c in await store.list(user_id="user_1")] == ["conv_2", "conv_1"]
+    assert [c["id"] for c in await store.list(context="portfolio")] == ["conv_3", "conv_1"]
+    assert [c["id"] for c in await store.list(user_id="user_1", context="portfolio")] == ["conv_1"]
+    assert [c["id"] for c in await store.list(limit=1, offset=1)] == ["conv_2"]
+
+async def test_create_update_and_delete(server):
+    store = make_store(server)
+    created = await store.create("conv_1", title="Hello", context="portfolio", user_id="user_1")
+    assert created["title"] == "Hello"
+    assert created["archived"] is False
+
+    assert await store.update("conv_1", title="Renamed", archived=True, message_count=99)
+    conversation = await store.get("conv_1")
+    assert conversation["title"] == "Renamed"
+    assert conversation["archived"] is True
+    assert conversation["message_count"] == 0
+    assert not await store.update("missing", title="x")
+
+    assert await store.delete("conv_1")
+    assert await store.get("conv_1") is None
+    assert await store.list(user_id="user_1") == []
+    assert not await store.delete("conv_1")
+
+async def test_summary_is_not_replaced_by_an_older_one(server):
+    worker_a, worker_b = make_store(server), make_store(server)
+    for number in range(3):
+        await worker_a.append("conv_1", exchange(number))
+
+    assert await worker_a.set_summary("conv_1", "first four", 4)
+    assert not await worker_b.set_summary("conv_1", "first two", 2)
+    assert not await worker_b.set_summary("missing", "summary", 2)
+
+    state = await worker_b.history("conv_1")
+    assert state["summary"] == "first four"
+    assert [m["content"] for m in state["messages"]] == ["question 2", "answer 2"]
+
+async def test_idle_conversations_expire(server):
+    store = make_store(server, idle_ttl=1)
+    await store.append("conv_1", exchange(1))
+
+    assert await store.client.ttl("test:conversation:conv_1") == 1
+    assert await store.client.ttl("test:conversation:conv_1:messages") == 1
+
+async def test_response_cache_is_shared_and_read_through(server):
+    worker_a = RedisResponseCache(make_client(server), "test", ttl=60)
+    worker_b = RedisResponseCache(make_client(server), "test", ttl=60)
+    key = worker_a.make_key("What are your skills?", "portfolio", "")
+
+    await worker_a.store(key, {"response": "Python"})
+
+    assert await worker_b.fetch(key) == {"response": "Python"}
+    assert await worker_b.fetch(key) == {"response": "Python"}
+    stats = worker_b.stats()
+    assert stats["shared_hits"] == 1
+    assert stats["local"]["hits"] == 1
+    assert await worker_b.fetch(worker_a.make_key("other", "portfolio", "")) is None
+    assert worker_b.stats()["shared_misses"] == 1
+
+async def test_response_cache_invalidate_purges_shared_entries(server):
+    cache = RedisResponseCache(make_client(server), "test", ttl=60)
+    other = make_client(server)
+    await other.set("unrelated", "kept")
+    for number in range(5):
+        await cache.store(cache.make_key(f"question {number}", None, ""), {"response": number})
+
+    cache.invalidate()
+    await cache._purge_task
+
+    assert len(cache) == 0
+    assert await other.keys("test:response:*") == []
+    assert await other.get("unrelated") == "kept"
+
+async def test_response_cache_survives_redis_errors(server):
+    cache = RedisResponseCache(make_client(server), "test", ttl=60, local_size=0)
+    server.connected = False
+
+    await cache.store("key", {"response": "x"})
+    assert await cache.fetch("key") is None
+    assert cache.stats()["errors"] == 2
@@ -0,0 +1,302 @@
+import asyncio
+
+import openai
+import pytest
+
+from app.services import resilience
+from app.services.ai_service import AIService
+from app.services.resilience import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, RetryBudget, RetryPolicy
+)
+from app.services.scheduler import SchedulerRejected, UpstreamScheduler
+
+from .fake_upstream import FakeUpstream
+
+MESSAGES = [{"role": "user", "content": "What are your skills?"}]
+
+class Clock:
+    """Stands in for the time module in resilience; the event loop keeps the real one"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience, "time", clock)
+    return clock
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.min_calls):
+        breaker.record_failure(0.1)
+    assert breaker.state == OPEN
+
+# Circuit breaker
+
+def test_opens_on_failure_rate(clock):
+    breaker = CircuitBreaker(min_calls=4, failure_rate=0.5)
+
+    breaker.record_success(0.1)
+    breaker.record_failure(0.1)
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED  # Below min_calls
+    breaker.record_failure(0.1)
+
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["refused"] == 1
+
+def test_stays_closed_under_the_failure_rate(clock):
+    breaker = CircuitBreaker(min_calls=4, failure_rate=0.5)
+
+    for _ in range(3):
+        breaker.record_success(0.1)
+    breaker.record_failure(0.1)
+
+    assert breaker.state == CLOSED
+
+def test_opens_on_slow_call_rate(clock):
+    breaker = CircuitBreaker(min_calls=4, slow_call_seconds=1.0, slow_call_rate=0.5)
+
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    breaker.record_success(2.0)
+    assert breaker.state == CLOSED
+    breaker.record_success(2.0)
+
+    assert breaker.state == OPEN
+
+def test_old_outcomes_leave_the_window(clock):
+    breaker = CircuitBreaker(window=10, buckets=10, min_calls=4, failure_rate=0.5)
+
+    for _ in range(3):
+        breaker.record_failure(0.1)
+    clock.now += 11
+    breaker.record_success(0.1)
+
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 1
+
+def test_failed_probe_doubles_the_open_period(clock):
+    breaker = CircuitBreaker(min_calls=2, open_seconds=5, max_open_seconds=15, half_open_probes=1)
+    open_breaker(breaker)
+
+    clock.now += 5
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    breaker.record_failure(0.1)
+    assert breaker.state == OPEN
+
+    clock.now += 9.9
+    assert not breaker.allow()
+    clock.now += 0.1
+    assert breaker.allow()
+    breaker.record_failure(0.1)
+
+    # Capped at max_open_seconds
+    assert breaker.stats()["open_seconds"] == 15
+
+def test_successful_probes_close_the_circuit(clock):
+    breaker = CircuitBreaker(min_calls=2, open_seconds=5, half_open_probes=2)
+    open_breaker(breaker)
+    clock.now += 5
+
+    assert breaker.allow()
+    assert breaker.allow()
+    assert not breaker.allow()  # Only half_open_probes trial calls at once
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 0
+
+def test_released_probe_can_be_taken_again(clock):
+    breaker = CircuitBreaker(min_calls=2, open_seconds=5, half_open_probes=1)
+    open_breaker(breaker)
+    clock.now += 5
+
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release()
+
+    assert breaker.allow()
+
+# Retry budget and policy
+
+def test_retry_budget_is_capped_and_refilled_by_requests():
+    budget = RetryBudget(ratio=0.5, cap=2)
+
+    assert budget.withdraw()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+    for _ in range(10):
+        budget.deposit()
+    assert budget.balance == 2
+
+def test_retry_policy_gives_up(monkeypatch):
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: high)
+    policy = RetryPolicy(max_retries=2, base_delay=0.2, max_delay=0.3, budget=RetryBudget(ratio=0, cap=1))
+    transient = openai.APIConnectionError(request=None)
+
+    assert policy.delay(2, transient, remaining=10) is None  # Out of attempts
+    assert policy.delay(0, ValueError("bug"), remaining=10) is None  # Not transient
+    assert policy.delay(1, transient, remaining=0.3) is None  # Would end after the deadline
+    assert policy.delay(1, transient, remaining=10) == 0.3  # Backoff capped at max_delay
+    assert policy.delay(0, transient, remaining=10) is None  # Budget spent
+
+    assert policy.stats()["retries"] == 1
+    assert policy.stats()["budget_exhausted"] == 2
+
+# Upstream calls through the fake upstream
+
+def make_service(upstream: FakeUpstream, max_retries: int = 2, budget: float = 10.0) -> AIService:
+    service = AIService()
+    service.client = upstream.client()
+    service.retry_policy = RetryPolicy(max_retries=max_retries, base_delay=0.001, max_delay=0.001,
+                                       budget=RetryBudget(ratio=0.2, cap=budget))
+    service.circuit_breaker = CircuitBreaker(min_calls=4, open_seconds=5, half_open_probes=1)
+    return service
+
+def call(service: AIService):
+    return service._call_upstream("conv_1", lambda remaining: service._get_openai_response(MESSAGES, timeout=remaining))
+
+@pytest.mark.anyio
+async def test_transient_errors_are_retried():
+    upstream = FakeUpstream(500, 503)
+    service = make_service(upstream)
+
+    result = await call(service)
+
+    assert result["response"] == "answer 3"
+    assert upstream.requests == 3
+    assert service.retry_policy.retries == 2
+    assert service.circuit_breaker.stats()["window_failures"] == 2
+
+@pytest.mark.anyio
+async def test_retries_stop_when_the_budget_runs_out():
+    upstream = FakeUpstream(500, 500, 500)
+    service = make_service(upstream, budget=1)
+
+    with pytest.raises(openai.InternalServerError):
+        await call(service)
+
+    assert upstream.requests == 2
+    assert service.retry_policy.exhausted == 1
+
+@pytest.mark.anyio
+async def test_retries_stop_at_the_deadline(monkeypatch):
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: high)
+    monkeypatch.setattr("app.services.ai_service.settings.RESPONSE_TIMEOUT", 0.2)
+    upstream = FakeUpstream(500, 500)
+    service = make_service(upstream)
+    service.retry_policy.base_delay = service.retry_policy.max_delay = 0.5
+
+    with pytest.raises(openai.InternalServerError):
+        await call(service)
+
+    assert upstream.requests == 1
+    assert service.retry_policy.exhausted == 1
+
+@pytest.mark.anyio
+async def test_a_spent_deadline_is_not_renewed():
+    upstream = FakeUpstream()
+    service = make_service(upstream)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await service._get_openai_response(MESSAGES, timeout=0.0)
+
+    assert upstream.requests == 0
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("status, error", [
+    (400, openai.BadRequestError),
+    (404, openai.NotFoundError),
+    (422, openai.UnprocessableEntityError)
+])
+async def test_client_errors_are_not_failures(status, error):
+    upstream = FakeUpstream(*[status] * 6)
+    service = make_service(upstream)
+
+    for _ in range(6):
+        with pytest.raises(error):
+            await call(service)
+
+    assert upstream.requests == 6  # Never retried
+    stats = service.circuit_breaker.stats()
+    assert stats["state"] == CLOSED
+    assert stats["window_calls"] == 6
+    assert stats["window_failures"] == 0
+
+@pytest.mark.anyio
+async def test_open_circuit_refuses_without_calling_upstream():
+    upstream = FakeUpstream(500, 500, 500, 500)
+    service = make_service(upstream, max_retries=0)
+    for _ in range(4):
+        with pytest.raises(openai.InternalServerError):
+            await call(service)
+
+    with pytest.raises(CircuitOpenError):
+        await call(service)
+
+    assert upstream.requests == 4
+    assert service._fallback_reason(CircuitOpenError()) == "circuit_open"
+
+def half_open(service: AIService, clock: Clock):
+    open_breaker(service.circuit_breaker)
+    clock.now += service.circuit_breaker.open_seconds
+
+@pytest.mark.anyio
+async def test_probe_is_released_when_cancelled_upstream(clock):
+    upstream = FakeUpstream(None)
+    service = make_service(upstream)
+    half_open(service, clock)
+
+    task = asyncio.create_task(call(service))
+    await upstream.hanging.wait()
+    assert service.circuit_breaker.state == HALF_OPEN
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # The probe permit is free again: the next call probes and closes the circuit
+    assert (await call(service))["response"] == "answer 2"
+    assert service.circuit_breaker.state == CLOSED
+
+@pytest.mark.anyio
+async def test_probe_is_released_when_cancelled_in_the_queue(clock):
+    upstream = FakeUpstream()
+    service = make_service(upstream)
+    service.scheduler = UpstreamScheduler(max_concurrency=1, queue_size=4, queue_timeout=5)
+    half_open(service, clock)
+
+    async with service.scheduler.slot("other"):
+        task = asyncio.create_task(call(service))
+        await asyncio.sleep(0.01)
+        assert service.scheduler.waiting == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    assert upstream.requests == 0
+    assert service.circuit_breaker.allow()
+
+@pytest.mark.anyio
+async def test_probe_is_released_when_the_scheduler_rejects(clock):
+    upstream = FakeUpstream()
+    service = make_service(upstream)
+    service.scheduler = UpstreamScheduler(max_concurrency=1, queue_size=0)
+    half_open(service, clock)
+
+    async with service.scheduler.slot("other"):
+        with pytest.raises(SchedulerRejected):
+            await call(service)
+
+    assert upstream.requests == 0
+    assert service.circuit_breaker.allow()
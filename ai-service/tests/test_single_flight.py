@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+pytestmark = pytest.mark.anyio
+
+class Call:
+    """An upstream stand-in that blocks until released"""
+
+    def __init__(self, result=None, error: Exception = None):
+        self.result = result
+        self.error = error
+        self.started = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.started += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+async def waiters(flight: SingleFlight, key: str, call: Call, count: int):
+    tasks = [asyncio.create_task(flight.do(key, call)) for _ in range(count)]
+    await asyncio.sleep(0)  # Let every waiter join before the call finishes
+    return tasks
+
+async def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    call = Call(result={"response": "Python"})
+
+    tasks = await waiters(flight, "skills", call, 3)
+    call.release.set()
+
+    assert await asyncio.gather(*tasks) == [{"response": "Python"}] * 3
+    assert call.started == 1
+    assert flight.stats() == {"in_flight": 0, "executions": 1, "coalesced_requests": 2}
+
+async def test_an_error_reaches_every_waiter():
+    flight = SingleFlight()
+    call = Call(error=RuntimeError("upstream down"))
+
+    tasks = await waiters(flight, "skills", call, 3)
+    call.release.set()
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert [str(result) for result in results] == ["upstream down"] * 3
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.in_flight == 0
+
+async def test_cancelling_one_waiter_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+    call = Call(result="answer")
+
+    first, second = await waiters(flight, "skills", call, 2)
+    first.cancel()
+    await asyncio.sleep(0)
+    call.release.set()
+
+    assert await second == "answer"
+    assert first.cancelled()
+    assert call.started == 1
+
+async def test_a_call_outlives_all_of_its_waiters():
+    flight = SingleFlight()
+    call = Call(error=RuntimeError("upstream down"))
+
+    (only,) = await waiters(flight, "skills", call, 1)
+    only.cancel()
+    await asyncio.sleep(0)
+    assert flight.in_flight == 1
+
+    # The error is consumed by the done callback, nothing is left unretrieved
+    call.release.set()
+    await asyncio.sleep(0.01)
+    assert flight.in_flight == 0
+
+async def test_the_next_call_after_completion_runs_again():
+    flight = SingleFlight()
+    first, second = Call(result=1), Call(result=2)
+    first.release.set()
+    second.release.set()
+
+    assert await flight.do("skills", first) == 1
+    assert await flight.do("skills", second) == 2
+    assert await flight.do("projects", first) == 1
+    assert flight.executions == 3
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from app.services.conversation_store import ConversationStore
+from app.services.sqlite_store import SQLiteConversationStore
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "data" / "conversations.db")
+
+async def open_store(path, **kwargs):
+    cache = ConversationStore(history_size=4, sweep_interval=0)
+    store = SQLiteConversationStore(path, cache, **{"flush_interval": 0.01, **kwargs})
+    await store.start()
+    return store
+
+def exchange(number):
+    return [
+        {"role": "user", "content": f"question {number}"},
+        {"role": "assistant", "content": f"answer {number}"}
+    ]
+
+async def test_close_during_the_flush_delay_does_not_hang(path):
+    store = await open_store(path, flush_interval=0.2)
+    await store.append("conv_1", exchange(1))
+    await asyncio.sleep(0.05)  # The flusher is now sleeping off the burst
+
+    await asyncio.wait_for(store.close(), 3)
+
+    store = await open_store(path)
+    assert len(await store.recent_messages("conv_1", 10)) == 2
+    await store.close()
+
+async def test_flush_writes_in_batches_of_batch_size(path):
+    store = await open_store(path, batch_size=2, flush_interval=60)
+    for number in range(5):
+        await store.append(f"conv_{number}", exchange(number))
+    assert store.stats()["queued_operations"] == 5
+
+    await store.flush()
+
+    stats = store.stats()
+    assert stats["queued_operations"] == 0
+    assert stats["batches_flushed"] == 3
+    assert stats["operations_written"] == 5
+    await store.close()
+
+async def test_a_burst_is_written_in_one_batch_after_the_interval(path):
+    store = await open_store(path, flush_interval=0.05)
+    for number in range(3):
+        await store.append("conv_1", exchange(number))
+    assert store.stats()["batches_flushed"] == 0
+
+    await asyncio.sleep(0.2)
+
+    stats = store.stats()
+    assert stats["queued_operations"] == 0
+    assert stats["batches_flushed"] == 1
+    assert stats["operations_written"] == 3
+    await store.close()
+
+async def test_conversations_reload_after_restart(path):
+    store = await open_store(path)
+    await store.create("conv_1", title="Hello", context="portfolio", user_id="user_1")
+    for number in range(3):
+        await store.append("conv_1", exchange(number), context="portfolio", user_id="user_1")
+    assert await store.set_summary("conv_1", "first two", 2)
+    assert await store.update("conv_1", archived=True)
+    await store.close()
+
+    store = await open_store(path)
+    conversation = await store.get("conv_1")
+    assert conversation["title"] == "Hello"
+    assert conversation["user_id"] == "user_1"
+    assert conversation["archived"] is True
+    assert conversation["message_count"] == 6
+    state = await store.history("conv_1")
+    assert state["summary"] == "first two"
+    # Only the hot window is loaded; older pages come from disk
+    assert [m["content"] for m in await store.recent_messages("conv_1", 10)] == [
+        "question 1", "answer 1", "question 2", "answer 2"
+    ]
+    assert [m["content"] for m in await store.get_messages("conv_1", limit=2)] == ["question 0", "answer 0"]
+    assert [c["id"] for c in await store.list(user_id="user_1")] == ["conv_1"]
+    await store.close()
+
+async def test_concurrent_first_reads_load_a_conversation_once(path):
+    store = await open_store(path)
+    await store.append("conv_1", exchange(1))
+    await store.close()
+
+    store = await open_store(path)
+    await asyncio.gather(store.append("conv_1", exchange(2)), store.append("conv_1", exchange(3)))
+
+    conversation = await store.get("conv_1")
+    assert conversation["message_count"] == 6
+    assert [m["content"] for m in await store.recent_messages("conv_1", 10)] == [
+        "question 2", "answer 2", "question 3", "answer 3"
+    ]
+    await store.close()
+
+async def test_deleted_conversations_stay_deleted_after_restart(path):
+    store = await open_store(path)
+    await store.append("conv_1", exchange(1))
+    await store.flush()
+    assert await store.delete("conv_1")
+    await store.close()
+
+    store = await open_store(path)
+    assert await store.get("conv_1") is None
+    assert await store.list() == []
+    await store.close()
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+from fastapi import FastAPI
+
+from app.api import chat
+from app.core.config import settings
+from app.services.ai_service import AIService
+from app.services.resilience import CircuitBreaker
+
+from .fake_upstream import FakeUpstream
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def service(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "test")
+    monkeypatch.setattr(settings, "CONVERSATION_BACKEND", "memory")
+    monkeypatch.setattr(settings, "RAG_ENABLED", False)
+    monkeypatch.setattr(settings, "KNOWLEDGE_RELOAD_INTERVAL", 0)
+    service = AIService()
+    await service.initialize()
+    await service.initialize_knowledge_base()
+    service.client = FakeUpstream().client()
+    service.circuit_breaker = CircuitBreaker(min_calls=10)
+    yield service
+    await service.cleanup()
+
+async def post_stream(service: AIService, message: str) -> httpx.Response:
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api")
+    app.state.services = SimpleNamespace(ai_service=service)
+    async with httpx.AsyncClient(app=app, base_url="http://localhost") as client:
+        return await client.post("/api/chat/stream", json={"message": message, "conversation_id": "conv_1"})
+
+def events(response) -> list:
+    return [line[len("event: "):] for line in response.text.splitlines() if line.startswith("event: ")]
+
+def stream(service: AIService, *chunks, error: Exception = None):
+    async def upstream(messages):
+        for chunk in chunks:
+            yield chunk
+        if error is not None:
+            raise error
+
+    service._stream_openai_response = upstream
+
+async def test_completed_stream_is_saved_and_recorded_once(service):
+    stream(service, "Python ", "and FastAPI")
+
+    response = await post_stream(service, "Skills?")
+
+    assert events(response) == ["start", "token", "token", "done"]
+    stats = service.circuit_breaker.stats()
+    assert stats["window_calls"] == 1
+    assert stats["window_failures"] == 0
+    assert service.conversation_store.contains("conv_1")
+
+async def test_failure_mid_stream_is_recorded_and_not_saved(service):
+    stream(service, "Python ", error=openai.APIConnectionError(request=None))
+
+    response = await post_stream(service, "Skills?")
+
+    assert events(response) == ["start", "token", "error", "done"]
+    stats = service.circuit_breaker.stats()
+    assert stats["window_calls"] == 1
+    assert stats["window_failures"] == 1
+    assert not service.conversation_store.contains("conv_1")
+
+async def test_failure_before_the_first_token_falls_back(service):
+    stream(service, error=openai.APIConnectionError(request=None))
+
+    response = await post_stream(service, "What are your skills?")
+
+    assert "error" not in events(response)
+    assert service.circuit_breaker.stats()["window_failures"] == 1
+    assert service.conversation_store.contains("conv_1")
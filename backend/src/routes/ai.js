@@ -1,5 +1,6 @@
 const express = require('express');
 const axios = require('axios');
+const { aiServiceHeaders } = require('../services/forwarding');
 const router = express.Router();
 
 // AI Service configuration
@@ -24,9 +25,10 @@ router.post('/chat', async (req, res) => {
       context: context || 'portfolio'
     }, {
       timeout: 30000, // 30 second timeout
-      headers: {
-        'Content-Type': 'application/json'
-      }
+      headers: aiServiceHeaders({
+        forwarded: req.headers['x-forwarded-for'],
+        address: req.socket.remoteAddress
+      })
     });
 
     res.json({
@@ -0,0 +1,20 @@
+// Headers that identify the end user to the AI service.
+// The AI service rate-limits per client address and only believes these
+// headers from its trusted proxies (RATE_LIMIT_TRUSTED_PROXIES), which
+// include this backend.
+
+// Append the address we received the request from to the forwarded chain
+const forwardedFor = (header, address) => (header ? `${header}, ${address}` : address);
+
+const aiServiceHeaders = ({ forwarded, address, userId }) => {
+  const headers = {
+    'Content-Type': 'application/json',
+    'X-Forwarded-For': forwardedFor(forwarded, address)
+  };
+  if (userId) {
+    headers['X-User-ID'] = userId;
+  }
+  return headers;
+};
+
+module.exports = { aiServiceHeaders };
@@ -1,5 +1,6 @@
 // Socket.io service for real-time communication
 const axios = require('axios');
+const { aiServiceHeaders } = require('./forwarding');
 
 let io;
 const connectedUsers = new Map();
@@ -59,9 +60,11 @@ const setupSocketHandlers = (socketIO) => {
             user_id: userId
           }, {
             timeout: 30000,
-            headers: {
-              'Content-Type': 'application/json'
-            }
+            headers: aiServiceHeaders({
+              forwarded: socket.handshake.headers['x-forwarded-for'],
+              address: socket.handshake.address,
+              userId
+            })
           });
 
           // Stop typing indicator